@@ -1,2 +1,4 @@
 from .mcu_api import DeviceAPI, SystemState, get_path_to_project
-from .data_api import DataAPI, RawRecording
+from .mcu_api_async import AsyncDeviceAPI
+from .data_api import DataAPI, DecimatedRecording, RawRecording
+from .mcu_pool import DevicePool
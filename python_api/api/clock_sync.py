@@ -0,0 +1,164 @@
+import numpy as np
+from collections import deque
+
+
+class ClockSync:
+    _offset: float
+    _drift: float
+    _ref_device: float
+    _probe: tuple[float, float] | None
+    _bias: float | None
+    _best_rtt: float
+    _window_sec: float
+    _window_start: float
+    _window_min: float
+    _window_device: float
+    _points: deque
+    _slew: float
+    _slew_device: float
+    _slew_sec: float
+
+    def __init__(self, window_sec: float=1., max_windows: int=900, slew_sec: float=1.) -> None:
+        """Class for mapping the device runtime (microsecond counter since boot) onto the host clock (pylsl.local_clock).
+        The offset is initialized with runtime requests (add_probe) and continuously tracked with a robust linear fit
+        of the lower envelope of (host receive time - device time) over the last windows (add_receive). The constant
+        transmission latency of the envelope is removed with the best probe. The step of each refit at the newest received
+        frame is faded out over slew_sec, so that the mapped timestamps stay continuous.
+        :param window_sec:  Float with length of one window of the lower envelope in device time [sec.]
+        :param max_windows: Integer with maximum number of windows used for the linear fit
+        :param slew_sec:    Float with duration in device time over which the mapping converges to a refit [sec.]
+        :return:            None
+        """
+        self._window_sec = window_sec
+        self._slew_sec = slew_sec
+        self._points = deque(maxlen=max_windows)
+        self.reset()
+
+    @property
+    def offset(self) -> float:
+        """Returning the estimated offset between host and device clock at the reference time (host = device + offset) [sec.]"""
+        return self._offset
+
+    @property
+    def drift(self) -> float:
+        """Returning the estimated relative drift between host and device clock [sec./sec.]"""
+        return self._drift
+
+    @property
+    def reference(self) -> float:
+        """Returning the device time of the reference point of offset and drift [sec.]"""
+        return self._ref_device
+
+    @property
+    def rtt(self) -> float:
+        """Returning the smallest round-trip time of all probes [sec.]"""
+        return self._best_rtt
+
+    @property
+    def is_synced(self) -> bool:
+        """Returning True if at least one probe or one complete window was added"""
+        return self._probe is not None or len(self._points) > 0
+
+    def reset(self) -> None:
+        """Resetting the estimation, the device time is used without offset
+        :return:    None
+        """
+        self._offset = 0.
+        self._drift = 0.
+        self._ref_device = 0.
+        self._probe = None
+        self._bias = None
+        self._best_rtt = np.inf
+        self._window_start = -np.inf
+        self._window_min = np.inf
+        self._window_device = 0.
+        self._slew = 0.
+        self._slew_device = 0.
+        self._points.clear()
+
+    def get_parameters(self) -> list[float]:
+        """Returning the actual parameters of the mapping (see get_parameter_names())"""
+        return [self._offset, self._drift, self._ref_device]
+
+    @staticmethod
+    def get_parameter_names() -> list[str]:
+        """Returning the names of the parameters in the order of get_parameters()"""
+        return ['clock_offset', 'clock_drift', 'clock_reference']
+
+    def add_probe(self, device_time: float, host_send: float, host_receive: float) -> None:
+        """Adding a probe from one request of the device runtime, the probe with the smallest round-trip time is used
+        :param device_time:     Float with runtime of the device in the response [sec.]
+        :param host_send:       Float with host time before sending the request [sec.]
+        :param host_receive:    Float with host time after receiving the response [sec.]
+        :return:                None
+        """
+        rtt = host_receive - host_send
+        if rtt < self._best_rtt:
+            self._best_rtt = rtt
+            self._probe = (device_time, 0.5 * (host_send + host_receive) - device_time)
+            self._ref_device, self._offset = self._probe
+            self._bias = None
+            self._slew = 0.
+
+    def add_receive(self, device_time: float, host_time: float) -> None:
+        """Adding an observation from the data stream (device timestamp of the last frame and host time after receiving it)
+        :param device_time:     Float with device timestamp of the newest received frame [sec.]
+        :param host_time:       Float with host time after receiving the frame [sec.]
+        :return:                None
+        """
+        if device_time - self._window_start >= self._window_sec:
+            if np.isfinite(self._window_min):
+                self._points.append((self._window_device, self._window_min))
+                self._fit(device_time)
+            self._window_start = device_time
+            self._window_min = np.inf
+        diff = host_time - device_time
+        if diff < self._window_min:
+            self._window_min = diff
+            self._window_device = device_time
+
+    def _fit(self, device_time: float) -> None:
+        """Robust linear fit of the lower envelope with rejection of windows with large latency, the mapping stays continuous
+        at the device timestamp of the newest received frame"""
+        is_mapped = self._probe is not None or len(self._points) > 1
+        host_time = self.to_host(device_time)
+        self._update_fit()
+        if is_mapped:
+            self._slew = host_time - self._to_host_fit(device_time)
+            self._slew_device = device_time
+
+    def _update_fit(self) -> None:
+        """Updating offset, drift and reference of the linear fit"""
+        if len(self._points) < 3:
+            if self._probe is None:
+                self._ref_device, self._offset = self._points[-1]
+            return
+        points = np.asarray(self._points)
+        x = points[:, 0] - points[-1, 0]
+        y = points[:, 1]
+        slope, intercept = np.polyfit(x, y, deg=1)
+        residual = y - (slope * x + intercept)
+        deviation = 1.4826 * np.median(np.abs(residual - np.median(residual)))
+        mask = residual <= np.median(residual) + 3 * deviation
+        if 3 <= np.count_nonzero(mask) < x.size:
+            slope, intercept = np.polyfit(x[mask], y[mask], deg=1)
+
+        if self._probe is not None and self._bias is None:
+            self._bias = intercept + slope * (self._probe[0] - points[-1, 0]) - self._probe[1]
+        self._offset = intercept - (self._bias if self._bias is not None else 0.)
+        self._ref_device = points[-1, 0]
+        self._drift = slope
+
+    def _to_host_fit(self, device_time: np.ndarray | float) -> np.ndarray | float:
+        """Mapping device timestamps onto the host clock with the linear fit only"""
+        return device_time + self._offset + self._drift * (device_time - self._ref_device)
+
+    def to_host(self, device_time: np.ndarray | float) -> np.ndarray | float:
+        """Mapping device timestamps onto the host clock (linear fit and the fading step of the last refit)
+        :param device_time: Numpy array with device timestamps [sec.]
+        :return:            Numpy array with host timestamps [sec.]
+        """
+        if not self._slew:
+            return self._to_host_fit(device_time)
+        fade = np.clip(1. - (device_time - self._slew_device) / self._slew_sec, 0., 1.)
+        return self._to_host_fit(device_time) + self._slew * fade
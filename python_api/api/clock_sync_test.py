@@ -0,0 +1,59 @@
+import pytest
+import numpy as np
+from .clock_sync import ClockSync
+
+
+def simulate_stream(dut: ClockSync, duration_sec: float, drift: float, offset: float, chunk_rate: float=20., seed: int=0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    device_time = np.arange(1., duration_sec, 1 / chunk_rate)
+    host_time = device_time * (1 + drift) + offset
+    latency = 0.5e-3 + rng.exponential(2e-3, size=device_time.size)
+    for dev, host in zip(device_time, host_time + latency):
+        dut.add_receive(dev, host)
+    return device_time, host_time
+
+
+def test_probe_offset():
+    dut = ClockSync()
+    assert not dut.is_synced
+    dut.add_probe(10., 100.010, 100.014)
+    dut.add_probe(10.5, 100.500, 100.501)
+    assert dut.is_synced
+    assert dut.rtt == pytest.approx(1e-3)
+    assert dut.to_host(10.5) == pytest.approx(100.5005)
+    np.testing.assert_allclose(dut.to_host(np.array([10.5, 11.5])), [100.5005, 101.5005])
+
+
+def test_online_drift_without_probe():
+    dut = ClockSync()
+    device_time, host_time = simulate_stream(dut, 1800., drift=50e-6, offset=1000.)
+    assert dut.drift == pytest.approx(50e-6, abs=1e-6)
+    error = dut.to_host(device_time[-100:]) - host_time[-100:]
+    assert np.max(np.abs(error)) < 1e-3
+
+
+def test_online_drift_with_probe():
+    dut = ClockSync(max_windows=300)
+    dut.add_probe(0.5, 1000.5 - 0.5e-3, 1000.5 + 0.5e-3)
+    device_time, host_time = simulate_stream(dut, 3600., drift=-30e-6, offset=1000. - 0.5 * -30e-6)
+    error = dut.to_host(device_time[-100:]) - host_time[-100:]
+    assert np.max(np.abs(error)) < 0.5e-3
+    assert len(dut.get_parameters()) == len(ClockSync.get_parameter_names())
+
+
+
+def test_continuous_refit():
+    dut = ClockSync()
+    rng = np.random.default_rng(1)
+    device_time = np.arange(1., 120., 0.05)
+    host_time = device_time * (1 + 50e-6) + 1000.
+    steps = list()
+    for dev, host in zip(device_time, host_time + 0.5e-3 + rng.exponential(2e-3, size=device_time.size)):
+        before = dut.to_host(dev)
+        dut.add_receive(dev, host)
+        steps.append(dut.to_host(dev) - before)
+    assert np.max(np.abs(steps[60:])) < 1e-9
+    assert np.max(np.abs(dut.to_host(device_time[-20:]) - host_time[-20:])) < 1e-3
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,8 +1,13 @@
 import h5py
+import json
 import numpy as np
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
 from logging import getLogger, Logger
 from pathlib import Path
+from api.h5_writer import read_time
+from api.raw_log import read_raw_log
 
 
 @dataclass(frozen=True)
@@ -23,6 +28,52 @@ class RawRecording:
     file: str
 
 
+@dataclass(frozen=True)
+class DecimatedRecording:
+    """Data class with a min/max/mean decimation of transient data for plotting (see DataAPI.read_data_overview())
+    Attributes:
+        sampling_rate:  Float with sampling rate [Hz]
+        num_channels:   Integer with number of channels
+        factor:         Integer with number of samples of one point (1 for raw data, less at the end of segments)
+        time:           Numpy array with timestamp of the first sample of each point [sec]
+        min:            Numpy array with minimum of each point with shape (num_channels, num_points)
+        max:            Numpy array with maximum of each point with shape (num_channels, num_points)
+        mean:           Numpy array with mean of each point with shape (num_channels, num_points)
+        type:           String with type of the LSL stream
+        file:           String with path to file
+    """
+    sampling_rate: float
+    num_channels: int
+    factor: int
+    time: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+    type: str
+    file: str
+
+
+@dataclass(frozen=True)
+class RecordingInfo:
+    """Data class with meta information of a recording (without loading the data)
+    Attributes:
+        sampling_rate:  Float with sampling rate [Hz]
+        num_channels:   Integer with number of channels
+        num_samples:    Integer with number of samples
+        duration:       Float with time between first and last sample [sec]
+        dtype:          Numpy datatype of the raw data
+        type:           String with type of the LSL stream
+        file:           String with path to file
+    """
+    sampling_rate: float
+    num_channels: int
+    num_samples: int
+    duration: float
+    dtype: np.dtype
+    type: str
+    file: str
+
+
 class DataAPI:
     _overview: list[Path]
     _prefix_data: str
@@ -30,7 +81,9 @@ class DataAPI:
     _logger: Logger
 
     def __init__(self, path2data: Path | str, data_prefix: str="data", util_prefix: str="util") -> None:
-        """Class for loading and processing the measured DAQ data
+        """Class for loading and processing the measured DAQ data of HDF5 files and raw logs (see RawLogWriter, read with np.memmap),
+        segmented recordings (see lsl_record_stream()) are listed with their manifest (<date>_<time>_<name>_manifest.json)
+        and read as one recording
         :param path2data:   Path or string with path to the folder in which data is saved
         :return:            None
         """
@@ -38,39 +91,109 @@ class DataAPI:
         self._prefix_data = data_prefix
         self._prefix_util = util_prefix
         self._logger = getLogger(__name__)
-        self._overview = [file.absolute() for file in path.glob("*.h5")]
+        manifests = [file.absolute() for file in path.glob("*_manifest.json")]
+        segments = {segment for file in manifests for segment in self._get_segments(file)}
+        files = [file.absolute() for pattern in ("*.h5", "*.rlog") for file in path.glob(pattern)]
+        self._overview = [file for file in files if file not in segments] + manifests
+
+    @staticmethod
+    def _has_prefix(file: Path, prefix: str) -> bool:
+        """Checking if a recording file (<date>_<time>_<name>.h5 or <date>_<time>_<name>_manifest.json) is a recording of the stream
+        prefix, the segments of a recording are only assigned by their manifest (other streams like <prefix>_0 or <prefix>_proc are excluded)"""
+        name = file.stem.split('_', 2)[-1].removesuffix("_manifest")
+        return DataAPI._has_stream_prefix(name, prefix)
+
+    @staticmethod
+    def _has_stream_prefix(name: str, prefix: str) -> bool:
+        """Checking if a stream name is the stream prefix"""
+        return name == prefix
+
+    def _find_stream(self, f: h5py.File, prefix: str) -> str | None:
+        """Returning the name of the group of a stream in a file of lsl_record_streams() (None if there is no such group)"""
+        return next((key for key in f.keys() if isinstance(f[key], h5py.Group) and self._has_stream_prefix(key, prefix)), None)
+
+    @staticmethod
+    def _get_segments(path2file: Path | str) -> list[Path]:
+        """Returning the files of a recording (the segments listed in a manifest or the file itself)"""
+        path = Path(path2file)
+        if path.suffix != ".json":
+            return [path]
+        with open(path, "r") as f:
+            return [path.parent / segment["file"] for segment in json.load(f)["segments"]]
+
+    @staticmethod
+    def _get_num_samples(f: h5py.File | h5py.Group) -> int:
+        """Returning the number of valid samples of a recording file (a file which was not closed contains preallocated
+        samples after the last flushed sample, see attribute 'num_samples' of BufferedH5Writer)"""
+        num = f["time"].shape[0]
+        return min(num, int(f["data"].attrs["num_samples"])) if "num_samples" in f["data"].attrs else num
+
+    @contextmanager
+    def _open_file(self, path2file: Path, prefix: str="") -> Iterator[tuple[dict, object, object, int, h5py.Group | None]]:
+        """Opening a recording file (HDF5 or raw log)
+        :param path2file:   Path to the file
+        :param prefix:      String with prefix of the stream in a file with several streams (see lsl_record_streams())
+        :return:            Tuple with meta information, timestamps (dataset or array, see read_time()), data with shape
+                            (num_samples, num_channels), number of valid samples and group 'pyramid' with the decimation levels
+                            (None if there is no such group, see DecimationPyramid)
+        """
+        if path2file.suffix == ".rlog":
+            attrs, records = read_raw_log(path2file)
+            yield attrs, records['time'], records['data'], records.size, None
+        else:
+            with h5py.File(path2file, "r") as f:
+                self._logger.info(f"Datasets in file: {list(f.keys())}")
+                self._logger.info(f"Meta info: {list(f.attrs.keys())}")
+                group = f
+                if "time" not in f:
+                    stream = self._find_stream(f, prefix)
+                    if stream is None:
+                        raise KeyError(f"File {path2file} has no stream {prefix} - Available: {list(f.keys())}")
+                    group = f[stream]
+                yield dict(group.attrs), group["time"], group["data"], self._get_num_samples(group), group.get("pyramid")
 
     def get_overview_data(self) -> list[Path]:
         """Returning a list with data files in the folder"""
-        return [file for file in self._overview if self._prefix_data in file.name]
+        return [file for file in self._overview if self._has_prefix(file, self._prefix_data)]
 
     def get_file_name_data(self, file_number: int) -> str:
         """Returning the data file name of the corresponding use case"""
         return str(self.get_overview_data()[file_number])
 
     def get_file_name_util(self, file_number: int) -> str:
-        """Returning the optional utilization file name of the corresponding use case"""
+        """Returning the optional utilization file name of the corresponding use case (the utilization can be recorded in another
+        file format or in the same file with lsl_record_streams())"""
         file = self.get_overview_data()[file_number]
-        return str(file.parent / file.name.replace(self._prefix_data, self._prefix_util))
+        if file.suffix == ".h5":
+            with h5py.File(file, "r") as f:
+                if "time" not in f and self._find_stream(f, self._prefix_util) is not None:
+                    return str(file)
+        file_util = file.parent / file.name.replace(self._prefix_data, self._prefix_util)
+        if not file_util.exists() and file.suffix != ".json":
+            file_util = next((file_util.with_suffix(suffix) for suffix in (".h5", ".rlog") if file_util.with_suffix(suffix).exists()), file_util)
+        return str(file_util)
 
-    def _read_file(self, path2file: str) -> RawRecording:
-        """Loading h5-file for further processing
+    def _read_file(self, path2file: str, prefix: str="") -> RawRecording:
+        """Loading h5-file (or all segments of a manifest) for further processing
         :param path2file:   Path with path to file
+        :param prefix:      String with prefix of the stream in a file with several streams (see lsl_record_streams())
         :return:            Class RawRecording with measured meta information, timestamps and raw data
         """
-        with h5py.File(path2file, "r") as f:
-            self._logger.info(f"Datasets in file: {list(f.keys())}")
-            self._logger.info(f"Meta info: {list(f.attrs.keys())}")
-            data = RawRecording(
-                sampling_rate=f.attrs["sampling_rate"],
-                num_channels=f.attrs["channel_count"],
-                time=np.array(f["time"][:] - f["time"][0]),
-                data=np.transpose(f["data"][:]),
-                type=f.attrs["type"],
-                file=path2file
-            )
-            f.close()
-        return data
+        time = list()
+        data = list()
+        for file in self._get_segments(path2file):
+            with self._open_file(file, prefix) as (attrs, ts_dset, data_dset, num, _):
+                time.append(read_time(ts_dset, 0, num))
+                data.append(data_dset[:num])
+        time = np.concatenate(time)
+        return RawRecording(
+            sampling_rate=attrs["sampling_rate"],
+            num_channels=attrs["channel_count"],
+            time=np.array(time - time[0]) if time.size else time,
+            data=np.transpose(np.concatenate(data)),
+            type=attrs["type"],
+            file=path2file
+        )
 
     def read_data_file(self, file_number: int) -> RawRecording:
         """Reading data file
@@ -79,7 +202,140 @@ class DataAPI:
         """
         file = self.get_file_name_data(file_number)
         self._logger.info(f"Read data file: {file}")
-        return self._read_file(file)
+        return self._read_file(file, self._prefix_data)
+
+    def read_data_info(self, file_number: int) -> RecordingInfo:
+        """Reading the meta information of a data file without loading the data
+        :param file_number:     Integer with file number
+        :return:                Class RecordingInfo with meta information
+        """
+        file = self.get_file_name_data(file_number)
+        num_samples = 0
+        time_range = list()
+        for segment in self._get_segments(file):
+            with self._open_file(segment, self._prefix_data) as (attrs, ts_dset, data_dset, num, _):
+                num_samples += num
+                if num:
+                    time_range = [time_range[0] if time_range else float(read_time(ts_dset, 0, 1)[0]), float(read_time(ts_dset, num - 1, num)[0])]
+                dtype = data_dset.dtype
+        return RecordingInfo(
+            sampling_rate=float(attrs["sampling_rate"]),
+            num_channels=int(attrs["channel_count"]),
+            num_samples=num_samples,
+            duration=time_range[1] - time_range[0] if time_range else 0.,
+            dtype=dtype,
+            type=attrs["type"],
+            file=file
+        )
+
+    @staticmethod
+    def _find_time_index(time: h5py.Dataset | np.ndarray, value: float, num: int | None=None) -> int:
+        """Binary search of the first sample with timestamp >= value in the first num samples of a sorted timestamp dataset
+        (reads only single values or chunks of delta-encoded timestamps)"""
+        low, high = 0, time.shape[0] if num is None else num
+        while low < high:
+            mid = (low + high) // 2
+            if read_time(time, mid, mid + 1)[0] < value:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def iter_data_file(self, file_number: int, block_size: int=2**16, time_start: float=0., time_end: float | None=None) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Reading a data file in blocks without loading the whole recording into memory
+        :param file_number:     Integer with file number
+        :param block_size:      Integer with number of samples of each block
+        :param time_start:      Float with start of the time window relative to the first sample [sec]
+        :param time_end:        Float with end of the time window relative to the first sample [sec] (None for end of file)
+        :return:                Iterator with tuple of timestamps relative to the first sample [sec] and data with shape (num_samples, num_channels) of each block
+                                (blocks of segmented recordings end at the segment boundaries)
+        """
+        file = self.get_file_name_data(file_number)
+        self._logger.info(f"Read data file in blocks: {file}")
+        time_first = None
+        for segment in self._get_segments(file):
+            with self._open_file(segment, self._prefix_data) as (_, ts_dset, data_dset, num, _):
+                if not num:
+                    continue
+                if time_first is None:
+                    time_first = float(read_time(ts_dset, 0, 1)[0])
+                idx_start = self._find_time_index(ts_dset, time_first + time_start, num) if time_start > 0. else 0
+                idx_end = self._find_time_index(ts_dset, time_first + time_end, num) if time_end is not None else num
+                for idx in range(idx_start, idx_end, block_size):
+                    idx_stop = min(idx + block_size, idx_end)
+                    yield read_time(ts_dset, idx, idx_stop) - time_first, data_dset[idx:idx_stop, :]
+
+    def read_data_overview(self, file_number: int, num_points: int=2000, time_start: float=0., time_end: float | None=None) -> DecimatedRecording:
+        """Reading a min/max/mean decimation of a data file for plotting a time window with at most num_points points: the coarsest
+        decimation level with at least num_points bins in the window is read (see DecimationPyramid) and combined to num_points,
+        windows with less samples and recordings without decimation levels are read from the raw data
+        :param file_number:     Integer with file number
+        :param num_points:      Integer with maximum number of points (e.g. the width of the plot in pixels)
+        :param time_start:      Float with start of the time window relative to the first sample [sec]
+        :param time_end:        Float with end of the time window relative to the first sample [sec] (None for end of file)
+        :return:                Class DecimatedRecording with timestamps relative to the first sample, minimum, maximum and mean of each point
+        """
+        file = self.get_file_name_data(file_number)
+        self._logger.info(f"Read overview of data file: {file}")
+        # The sample range of the window in each segment selects the level which is available in all segments
+        time_first = None
+        windows = list()
+        factors = None
+        for segment in self._get_segments(file):
+            with self._open_file(segment, self._prefix_data) as (attrs, ts_dset, _, num, pyramid):
+                available = {int(val) for val in pyramid.attrs["factors"]} if pyramid is not None else set()
+                factors = available if factors is None else factors & available
+                if not num:
+                    continue
+                if time_first is None:
+                    time_first = float(read_time(ts_dset, 0, 1)[0])
+                idx_start = self._find_time_index(ts_dset, time_first + time_start, num) if time_start > 0. else 0
+                idx_end = self._find_time_index(ts_dset, time_first + time_end, num) if time_end is not None else num
+                if idx_end > idx_start:
+                    windows.append((segment, idx_start, idx_end))
+        num_window = sum(idx_end - idx_start for _, idx_start, idx_end in windows)
+        factor = max([val for val in factors or () if num_window // val >= num_points], default=1)
+
+        # The number of samples of each bin weights its mean, the last bin of a segment can be partial
+        points = [list(), list(), list(), list(), list()]
+        for segment, idx_start, idx_end in windows:
+            with self._open_file(segment, self._prefix_data) as (_, ts_dset, data_dset, num, pyramid):
+                if factor == 1:
+                    data = data_dset[idx_start:idx_end]
+                    values = (read_time(ts_dset, idx_start, idx_end), data, data, data.astype(np.float32), np.ones(idx_end - idx_start))
+                else:
+                    level = pyramid[str(factor)]
+                    num_bins = level["time"].shape[0]
+                    start, stop = idx_start // factor, min(-(-idx_end // factor), num_bins)
+                    counts = np.full(stop - start, factor)
+                    if stop == num_bins and stop > start:
+                        counts[-1] = min(factor, num - (num_bins - 1) * factor)
+                    values = tuple(level[key][start:stop] for key in ("time", "min", "max", "mean")) + (counts, )
+            for point, value in zip(points, values):
+                point.append(value)
+        num_channels = int(attrs["channel_count"])
+        time = np.concatenate(points[0]) if windows else np.zeros(0)
+        data_min, data_max, data_mean = (np.concatenate(point) if windows else np.zeros((0, num_channels)) for point in points[1:4])
+        counts = np.concatenate(points[4]) if windows else np.zeros(0)
+
+        ratio = max(-(-time.size // num_points), 1)
+        if ratio > 1:
+            starts = np.arange(0, time.size, ratio)
+            time = time[starts]
+            data_min = np.minimum.reduceat(data_min, starts, axis=0)
+            data_max = np.maximum.reduceat(data_max, starts, axis=0)
+            data_mean = np.add.reduceat(data_mean * counts[:, None], starts, axis=0) / np.add.reduceat(counts, starts)[:, None]
+        return DecimatedRecording(
+            sampling_rate=float(attrs["sampling_rate"]),
+            num_channels=num_channels,
+            factor=factor * ratio,
+            time=time - time_first if time.size else time,
+            min=np.transpose(data_min),
+            max=np.transpose(data_max),
+            mean=np.transpose(data_mean),
+            type=attrs["type"],
+            file=file
+        )
 
     def read_utilization_file(self, file_number: int) -> RawRecording:
         """Reading utilization file
@@ -89,6 +345,6 @@ class DataAPI:
         file = self.get_file_name_util(file_number)
         self._logger.info(f"Read util file: {file}")
         if Path(file).exists():
-            return self._read_file(file)
+            return self._read_file(file, self._prefix_util)
         else:
             raise AttributeError(f"File {file} does not exist")
@@ -1,6 +1,11 @@
+import h5py
+import json
 import pytest
 from pathlib import Path
-from .data_api import DataAPI, RawRecording
+import numpy as np
+from .data_api import DataAPI, DecimatedRecording, RawRecording, RecordingInfo
+from .h5_writer import BufferedH5Writer
+from .raw_log import RawLogWriter, convert_raw_log
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -22,6 +27,36 @@ def test_loader_data(path: Path):
     assert data.time.size == data.data.shape[1]
 
 
+def test_read_info(path: Path):
+    dut = DataAPI(path)
+    info = dut.read_data_info(0)
+    data = dut.read_data_file(0)
+    assert type(info) == RecordingInfo
+    assert info.sampling_rate == data.sampling_rate
+    assert info.num_channels == data.num_channels
+    assert info.num_samples == data.time.size
+    assert info.duration == data.time[-1]
+
+
+def test_iter_data_blocks(path: Path):
+    dut = DataAPI(path)
+    data = dut.read_data_file(0)
+    blocks = list(dut.iter_data_file(0, block_size=1000))
+    assert all(block[1].shape == (1000, data.num_channels) for block in blocks[:-1])
+    np.testing.assert_array_equal(np.concatenate([block[0] for block in blocks]), data.time)
+    np.testing.assert_array_equal(np.concatenate([block[1] for block in blocks]).T, data.data)
+
+
+def test_iter_data_window(path: Path):
+    dut = DataAPI(path)
+    data = dut.read_data_file(0)
+    blocks = list(dut.iter_data_file(0, block_size=1000, time_start=2., time_end=5.))
+    time = np.concatenate([block[0] for block in blocks])
+    mask = (data.time >= 2.) & (data.time < 5.)
+    np.testing.assert_array_equal(time, data.time[mask])
+    np.testing.assert_array_equal(np.concatenate([block[1] for block in blocks]).T, data.data[:, mask])
+
+
 def test_loader_util(path: Path):
     dut = DataAPI(path)
     data = dut.read_utilization_file(0)
@@ -36,5 +71,132 @@ def test_loader_util(path: Path):
     assert data.time.size == data.data.shape[1]
 
 
+def write_session(path: Path, num_segments: int=3, num_samples: int=1000) -> None:
+    """Writing a segmented recording like lsl_record_stream() with an unclosed last segment (preallocated samples)"""
+    segments = list()
+    for idx in range(num_segments):
+        index = np.arange(idx * num_samples, (idx + 1) * num_samples)
+        with h5py.File(path / f"20260101_000000_data_{idx:03d}.h5", "w") as f:
+            f.attrs.update(sampling_rate=1000., channel_count=2, type="sensor_data", data_format=4)
+            num_alloc = num_samples + 24 if idx == num_segments - 1 else num_samples
+            time = np.zeros(num_alloc)
+            time[:num_samples] = 100. + index / 1000.
+            data = np.zeros((num_alloc, 2), dtype=np.int32)
+            data[:num_samples] = np.stack([index, -index], axis=1)
+            f.create_dataset("time", data=time)
+            f.create_dataset("data", data=data)
+            f["data"].attrs["num_samples"] = num_samples
+        segments.append({"file": f"20260101_000000_data_{idx:03d}.h5", "sample_start": idx * num_samples, "num_samples": num_samples,
+                         "time_start": 100. + index[0] / 1000., "time_end": 100. + index[-1] / 1000., "is_closed": idx < num_segments - 1})
+    with open(path / "20260101_000000_data_manifest.json", "w") as f:
+        json.dump({"name": "data", "is_complete": False, "segments": segments}, f)
+
+
+def test_read_session(tmp_path: Path):
+    write_session(tmp_path)
+    for stream in ("data_0", "data_1", "data_proc"):
+        (tmp_path / f"20260101_000000_{stream}.h5").touch()
+    dut = DataAPI(tmp_path)
+    assert [file.name for file in dut.get_overview_data()] == ["20260101_000000_data_manifest.json"]
+    data = dut.read_data_file(0)
+    np.testing.assert_array_equal(data.data[0], np.arange(3000))
+    np.testing.assert_allclose(data.time, np.arange(3000) / 1000.)
+    info = dut.read_data_info(0)
+    assert info.num_samples == 3000
+    assert info.duration == pytest.approx(2.999)
+
+    blocks = list(dut.iter_data_file(0, block_size=400, time_start=0.5, time_end=2.5))
+    np.testing.assert_allclose(np.concatenate([block[0] for block in blocks]), np.arange(500, 2500) / 1000.)
+    np.testing.assert_array_equal(np.concatenate([block[1] for block in blocks])[:, 1], -np.arange(500, 2500))
+
+
+def test_read_raw_log(tmp_path: Path):
+    index = np.arange(3000)
+    dut = RawLogWriter(tmp_path / "20260101_000000_data.rlog", 2, np.int16, attrs={"sampling_rate": 1000., "channel_count": 2, "type": "sensor_data"})
+    dut.append(np.stack([index, -index], axis=1).astype(np.int16), 100. + index / 1000.)
+    dut.close()
+    reader = DataAPI(tmp_path)
+    data = reader.read_data_file(0)
+    assert data.data.dtype == np.int16
+    np.testing.assert_array_equal(data.data[1], -index)
+    np.testing.assert_allclose(data.time, index / 1000.)
+    assert reader.read_data_info(0).num_samples == 3000
+    blocks = list(reader.iter_data_file(0, block_size=400, time_start=1., time_end=2.))
+    np.testing.assert_array_equal(np.concatenate([block[1] for block in blocks])[:, 0], np.arange(1000, 2000))
+
+    convert_raw_log(tmp_path / "20260101_000000_data.rlog", tmp_path / "20260101_000000_util.h5")
+    assert reader.get_file_name_util(0).endswith("20260101_000000_util.h5")
+    np.testing.assert_array_equal(reader.read_utilization_file(0).data, data.data)
+
+
+def test_read_overview(tmp_path: Path):
+    index = np.arange(100000)
+    with h5py.File(tmp_path / "20260101_000000_data.h5", "w") as f:
+        f.attrs.update(sampling_rate=1000., channel_count=2, type="sensor_data", data_format=4)
+        writer = BufferedH5Writer(f, 2, np.int32, chunk_size=4096, compression="lzf", decimation=(16, 256))
+        writer.append(np.stack([index, -index], axis=1).astype(np.int32), 100. + index / 1000.)
+        writer.close()
+    dut = DataAPI(tmp_path)
+    data = dut.read_data_overview(0, num_points=200)
+    assert isinstance(data, DecimatedRecording)
+    assert data.factor == 512
+    assert data.min.shape == (2, 196)
+    np.testing.assert_allclose(data.time, np.arange(0, 100000, 512) / 1000.)
+    np.testing.assert_array_equal(data.min[0], np.arange(0, 100000, 512))
+    np.testing.assert_array_equal(data.max[0], np.minimum(np.arange(511, 100000 + 511, 512), 99999))
+    assert data.mean[1, 0] == pytest.approx(-255.5)
+
+    data = dut.read_data_overview(0, num_points=200, time_start=1., time_end=1.5)
+    assert data.factor == 3
+    np.testing.assert_array_equal(data.min[0], np.arange(1000, 1500, 3))
+    np.testing.assert_array_equal(data.max[1], -np.arange(1000, 1500, 3))
+
+
+def test_read_overview_session(tmp_path: Path):
+    write_session(tmp_path)
+    data = DataAPI(tmp_path).read_data_overview(0, num_points=100)
+    assert data.factor == 30
+    np.testing.assert_array_equal(data.min[0], np.arange(0, 3000, 30))
+    np.testing.assert_allclose(data.mean[0], np.arange(0, 3000, 30) + 14.5)
+
+
+def test_read_overview_partial_bins(tmp_path: Path):
+    segments = list()
+    for idx, (start, end) in enumerate([(0, 1000), (1000, 5000)]):
+        index = np.arange(start, end)
+        with h5py.File(tmp_path / f"20260101_000000_data_{idx:03d}.h5", "w") as f:
+            f.attrs.update(sampling_rate=1000., channel_count=2, type="sensor_data", data_format=4)
+            writer = BufferedH5Writer(f, 2, np.int32, chunk_size=1024, decimation=(16, ))
+            writer.append(np.stack([index, index ** 2 % 1000], axis=1).astype(np.int32), 100. + index / 1000.)
+            writer.close()
+        segments.append({"file": f"20260101_000000_data_{idx:03d}.h5", "sample_start": start, "num_samples": end - start})
+    with open(tmp_path / "20260101_000000_data_manifest.json", "w") as f:
+        json.dump({"name": "data", "is_complete": True, "segments": segments}, f)
+    data = DataAPI(tmp_path).read_data_overview(0, num_points=2)
+    assert data.factor == 16 * 157
+    index = np.arange(5000)
+    np.testing.assert_allclose(data.mean[0], [index[:1000 + 1504].mean(), index[1000 + 1504:].mean()])
+    np.testing.assert_allclose(data.mean[1], [(index[:1000 + 1504] ** 2 % 1000).mean(), (index[1000 + 1504:] ** 2 % 1000).mean()], rtol=1e-5)
+
+
+def test_read_unclosed(tmp_path: Path):
+    with h5py.File(tmp_path / "20260101_000000_data.h5", "w") as f:
+        f.attrs.update(sampling_rate=1000., channel_count=2, type="sensor_data", data_format=4)
+        time = np.zeros(1024)
+        time[:1000] = 100. + np.arange(1000) / 1000.
+        data = np.zeros((1024, 2), dtype=np.int32)
+        data[:1000, 0] = np.arange(1000)
+        f.create_dataset("time", data=time)
+        f.create_dataset("data", data=data)
+        f["data"].attrs["num_samples"] = 1000
+    dut = DataAPI(tmp_path)
+    np.testing.assert_array_equal(dut.read_data_file(0).data[0], np.arange(1000))
+    info = dut.read_data_info(0)
+    assert info.num_samples == 1000
+    assert info.duration == pytest.approx(0.999)
+    blocks = list(dut.iter_data_file(0, block_size=300, time_start=0.5))
+    np.testing.assert_array_equal(np.concatenate([block[1] for block in blocks])[:, 0], np.arange(500, 1000))
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
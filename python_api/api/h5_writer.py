@@ -0,0 +1,416 @@
+import numpy as np
+from h5py import Dataset, File, Group
+from math import ceil, log2
+from queue import Queue, Empty
+from threading import Thread
+from time import perf_counter
+
+
+def get_compression_names() -> list[str]:
+    """Returning the names of the available codecs of BufferedH5Writer (built into h5py, combined with the shuffle filter)"""
+    return ['lzf', 'gzip']
+
+
+def encode_time_delta(timestamps: np.ndarray, index: int, last: np.int64, block_size: int) -> np.ndarray:
+    """Delta-encoding of timestamps (lossless difference of the IEEE bit patterns to the previous sample, the first
+    sample of each block of block_size samples is stored without difference for random access)
+    :param timestamps:  Numpy array with timestamps [sec.]
+    :param index:       Integer with index of the first timestamp in the dataset
+    :param last:        Numpy int64 with bit pattern of the timestamp before index (ignored at the begin of a block)
+    :param block_size:  Integer with number of samples of one block
+    :return:            Numpy array with datatype int64 and encoded timestamps
+    """
+    bits = np.ascontiguousarray(timestamps, dtype=np.float64).view(np.int64)
+    delta = np.diff(bits, prepend=np.int64(last))
+    anchor = (-index) % block_size
+    delta[anchor::block_size] = bits[anchor::block_size]
+    return delta
+
+
+def read_time(dset: Dataset | np.ndarray, start: int=0, stop: int | None=None) -> np.ndarray:
+    """Reading timestamps of a recording, delta-encoded timestamps (attribute 'encoding' of the dataset) are decoded
+    :param dset:    Class h5py.Dataset or numpy array with the timestamps
+    :param start:   Integer with index of the first sample
+    :param stop:    Integer with index after the last sample (None for end of dataset)
+    :return:        Numpy array with timestamps [sec.]
+    """
+    stop = dset.shape[0] if stop is None else min(stop, dset.shape[0])
+    if not hasattr(dset, "attrs") or dset.attrs.get("encoding", "") != "delta":
+        return np.asarray(dset[start:stop])
+    if stop <= start:
+        return np.zeros(0)
+    block_size = int(dset.attrs["block_size"])
+    begin = start - start % block_size
+    delta = np.zeros(block_size * ceil((stop - begin) / block_size), dtype=np.int64)
+    delta[:stop - begin] = dset[begin:stop]
+    bits = np.cumsum(delta.reshape(-1, block_size), axis=1, dtype=np.int64).reshape(-1)
+    return bits[start - begin:stop - begin].view(np.float64)
+
+
+def get_chunk_size(sampling_rate: float, chunk_sec: float=0.25, min_size: int=256, max_size: int=65536) -> int:
+    """Returning the number of samples of one HDF5 chunk (power of two for about chunk_sec of the stream)
+    :param sampling_rate:   Float with sampling rate of the stream [Hz]
+    :param chunk_sec:       Float with targeted duration of one chunk [sec.]
+    :param min_size:        Integer with smallest number of samples
+    :param max_size:        Integer with largest number of samples
+    :return:                Integer with number of samples
+    """
+    return int(2 ** ceil(log2(min(max(sampling_rate * chunk_sec, min_size), max_size))))
+
+
+class H5WriteThread:
+    _file: File
+    _flush_sec: float
+    _queue: Queue
+    _thread: Thread
+    _writers: list
+
+    def __init__(self, file: File, flush_sec: float=1.) -> None:
+        """Writer thread of one HDF5 file which writes the blocks of one or more BufferedH5Writer (e.g. one group per
+        stream) and flushes the file for all of them together
+        :param file:        Class h5py.File opened for writing
+        :param flush_sec:   Float with period of flushing the file [sec.]
+        :return:            None
+        """
+        self._file = file
+        self._flush_sec = flush_sec
+        self._writers = list()
+        self._queue = Queue()
+        self._thread = Thread(target=self._thread_write, daemon=True)
+        self._thread.start()
+
+    @property
+    def is_alive(self) -> bool:
+        """Returning True if the writer thread is running"""
+        return self._thread.is_alive()
+
+    def add(self, writer: 'BufferedH5Writer') -> None:
+        """Registering a writer whose number of samples is stored with each flush"""
+        self._writers.append(writer)
+
+    def submit(self, writer: 'BufferedH5Writer', block: tuple[np.ndarray, np.ndarray], num: int) -> None:
+        """Passing a block with num samples of a writer to the writer thread"""
+        self._queue.put((writer, block, num))
+
+    def _thread_write(self) -> None:
+        """Writing the blocks into the datasets and flushing the file periodically"""
+        time_flush = perf_counter()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            writer, block, num = item
+            writer._write_block(block, num)
+            if perf_counter() - time_flush > self._flush_sec:
+                try:
+                    for val in self._writers:
+                        val.data.attrs["num_samples"] = val.num_written
+                    self._file.flush()
+                except Exception as e:
+                    writer._exception = e
+                time_flush = perf_counter()
+
+    def close(self) -> None:
+        """Writing all submitted blocks and stopping the writer thread (the file is not closed)"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def get_decimation_factors() -> tuple[int, ...]:
+    """Returning the default number of samples of one bin of each level of DecimationPyramid"""
+    return 16, 256, 4096
+
+
+class DecimationPyramid:
+    _group: Group
+    _factors: tuple[int, ...]
+    _ratios: list[int]
+    _levels: list[dict[str, Dataset]]
+    _pending: list[tuple[np.ndarray, ...] | None]
+    _buffer: list[list[tuple[np.ndarray, ...]]]
+    _chunk_size: int
+
+    def __init__(self, file: File | Group, num_channels: int, dtype: np.dtype, factors: tuple[int, ...]=get_decimation_factors(),
+                 chunk_size: int=4096, **filters) -> None:
+        """Min/max/mean decimation levels of a recording which are built incrementally from the written samples and stored in the
+        group 'pyramid' next to the dataset 'data', each level is a group named after its factor with the datasets 'time' (first
+        sample of each bin), 'min', 'max' and 'mean' with shape (num_bins, num_channels) and is computed from the previous level,
+        the bins are collected in memory and written in slabs of one HDF5 chunk
+        :param file:            Class h5py.File opened for writing or a group of it
+        :param num_channels:    Integer with number of channels
+        :param dtype:           Numpy datatype of the data (of the datasets 'min' and 'max')
+        :param factors:         Tuple with increasing number of samples of one bin of each level (each a multiple of the previous one)
+        :param chunk_size:      Integer with number of bins of one HDF5 chunk and of one written slab
+        :param filters:         Keyword arguments with filters of the datasets (e.g. compression and shuffle)
+        :return:                None
+        """
+        if not factors or factors[0] < 2 or any(high <= low or high % low for low, high in zip(factors, factors[1:])):
+            raise ValueError(f"Decimation factors {factors} are not increasing multiples of each other")
+        self._factors = tuple(int(factor) for factor in factors)
+        self._ratios = [self._factors[0]] + [high // low for low, high in zip(self._factors, self._factors[1:])]
+        self._group = file.create_group("pyramid")
+        self._group.attrs["factors"] = self._factors
+        self._levels = list()
+        for factor in self._factors:
+            level = self._group.create_group(str(factor))
+            level.attrs["factor"] = factor
+            dsets = dict(time=level.create_dataset("time", (0, ), maxshape=(None, ), dtype=float, chunks=(chunk_size, )))
+            for key, dtype_level in (("min", dtype), ("max", dtype), ("mean", np.float32)):
+                dsets[key] = level.create_dataset(key, (0, num_channels), maxshape=(None, num_channels), dtype=dtype_level,
+                                                  chunks=(chunk_size, num_channels), **filters)
+            self._levels.append(dsets)
+        self._chunk_size = chunk_size
+        self._pending = [None] * len(self._factors)
+        self._buffer = [list() for _ in self._factors]
+
+    @property
+    def factors(self) -> tuple[int, ...]:
+        """Returning the number of samples of one bin of each level"""
+        return self._factors
+
+    def _reduce(self, idx: int, bins: tuple[np.ndarray, ...] | None, is_final: bool) -> tuple[np.ndarray, ...] | None:
+        """Combining the bins of the previous level (or the samples) with the remainder of the last call into the bins of a level
+        :param idx:         Integer with index of the level
+        :param bins:        Tuple with first timestamp, minimum, maximum, sum and number of samples of each bin (None for no new bins)
+        :param is_final:    Boolean for combining the remainder into a partial bin (at the end of the recording)
+        :return:            Tuple with the bins of the level (None if no bin is complete)
+        """
+        pending = self._pending[idx]
+        if bins is None:
+            bins = pending
+        elif pending is not None:
+            bins = tuple(np.concatenate([old, new]) for old, new in zip(pending, bins))
+        if bins is None:
+            return None
+        num = bins[0].size if is_final else bins[0].size - bins[0].size % self._ratios[idx]
+        # The remainder is copied as the samples are in a block which is reused by the writer
+        self._pending[idx] = tuple(np.array(val[num:]) for val in bins) if num < bins[0].size else None
+        if not num:
+            return None
+        starts = np.arange(0, num, self._ratios[idx])
+        return (bins[0][starts], np.minimum.reduceat(bins[1][:num], starts, axis=0), np.maximum.reduceat(bins[2][:num], starts, axis=0),
+                np.add.reduceat(bins[3][:num], starts, axis=0), np.add.reduceat(bins[4][:num], starts))
+
+    def _write(self, idx: int, bins: tuple[np.ndarray, ...] | None=None, is_final: bool=False) -> None:
+        """Collecting the bins of a level and appending them to its datasets once they fill one chunk (or at the end)"""
+        if bins is not None:
+            self._buffer[idx].append((bins[0], bins[1], bins[2], bins[3] / bins[4][:, None]))
+        if not self._buffer[idx] or (not is_final and sum(val[0].size for val in self._buffer[idx]) < self._chunk_size):
+            return
+        dsets = self._levels[idx]
+        values = [np.concatenate(val) for val in zip(*self._buffer[idx])]
+        self._buffer[idx] = list()
+        start = dsets["time"].shape[0]
+        end = start + values[0].size
+        for key, value in zip(("time", "min", "max", "mean"), values):
+            dsets[key].resize(end, axis=0)
+            dsets[key][start:end] = value
+
+    def append(self, data: np.ndarray, timestamps: np.ndarray) -> None:
+        """Appending samples, complete bins are written into the levels and the remainder is kept until the next call
+        :param data:        Numpy array with shape (num_samples, num_channels)
+        :param timestamps:  Numpy array with timestamp of each sample [sec.]
+        :return:            None
+        """
+        bins = (timestamps, data, data, data.astype(np.float64), np.ones(len(timestamps), dtype=np.int64))
+        for idx in range(len(self._factors)):
+            bins = self._reduce(idx, bins, is_final=False)
+            if bins is None:
+                break
+            self._write(idx, bins)
+
+    def close(self) -> None:
+        """Writing the remaining samples as a partial bin at the end of each level"""
+        bins = None
+        for idx in range(len(self._factors)):
+            bins = self._reduce(idx, bins, is_final=True)
+            self._write(idx, bins, is_final=True)
+
+
+class BufferedH5Writer:
+    _file: File | Group
+    _time: object
+    _data: object
+    _chunk_size: int
+    _flush_sec: float
+    _on_write: object
+    _block: tuple[np.ndarray, np.ndarray] | None
+    _num_block: int
+    _num_blocks: int
+    _time_block: float
+    _free: Queue
+    _thread: H5WriteThread
+    _is_owner: bool
+    _num_samples: int
+    _num_written: int
+    _capacity: int
+    _is_delta: bool
+    _time_last: np.int64
+    _pyramid: DecimationPyramid | None
+    _exception: Exception | None
+
+    def __init__(self, file: File | Group, num_channels: int, dtype: np.dtype, chunk_size: int=4096, flush_sec: float=1.,
+                 num_blocks: int=8, on_write=None, compression: str="", thread: H5WriteThread | None=None,
+                 decimation: tuple[int, ...]=()) -> None:
+        """Write-behind recording of a stream into the datasets 'time' and 'data' of a HDF5 file or group: samples are
+        collected in blocks of one HDF5 chunk in memory and written as contiguous slabs by a writer thread, the datasets are
+        preallocated, grow geometrically and are trimmed to the number of samples with close()
+        :param file:            Class h5py.File opened for writing or a group of it
+        :param num_channels:    Integer with number of channels
+        :param dtype:           Numpy datatype of the data
+        :param chunk_size:      Integer with number of samples of one HDF5 chunk and of one block in memory
+        :param flush_sec:       Float with maximum time until samples are written and the file is flushed [sec.]
+        :param num_blocks:      Integer with number of blocks in memory, appending waits for the writer if all blocks are in use
+        :param on_write:        Function called with the timestamp of the last written sample after each written block (None to disable)
+        :param compression:     String with codec of both datasets combined with the shuffle filter (see get_compression_names(), empty to disable),
+                                the timestamps are delta-encoded in each chunk (see encode_time_delta() and read_time())
+        :param thread:          Class H5WriteThread of the file shared with other writers (None for an own writer thread)
+        :param decimation:      Tuple with number of samples of one bin of each min/max/mean level built by the writer thread
+                                (see DecimationPyramid and get_decimation_factors(), empty to disable)
+        :return:                None
+        """
+        if compression and compression not in get_compression_names():
+            raise ValueError(f"Unknown compression {compression} - Available: {get_compression_names()}")
+        filters = dict(compression=compression, shuffle=True) if compression else dict()
+        self._file = file
+        self._chunk_size = chunk_size
+        self._flush_sec = flush_sec
+        self._on_write = on_write
+        self._capacity = 4 * chunk_size
+        self._is_delta = bool(compression)
+        self._time_last = np.int64(0)
+        self._time = file.create_dataset("time", (self._capacity, ), maxshape=(None, ), dtype=np.int64 if self._is_delta else float,
+                                         chunks=(chunk_size, ), **filters)
+        self._data = file.create_dataset("data", (self._capacity, num_channels), maxshape=(None, num_channels), dtype=dtype,
+                                         chunks=(chunk_size, num_channels), **filters)
+        if self._is_delta:
+            self._time.attrs["encoding"] = "delta"
+            self._time.attrs["block_size"] = chunk_size
+        self._pyramid = DecimationPyramid(file, num_channels, dtype, decimation, chunk_size, **filters) if decimation else None
+        self._num_samples = 0
+        self._num_written = 0
+        self._exception = None
+
+        self._num_blocks = num_blocks
+        self._free = Queue()
+        for _ in range(num_blocks):
+            self._free.put((np.zeros(chunk_size), np.zeros((chunk_size, num_channels), dtype=dtype)))
+        self._block = None
+        self._num_block = 0
+        self._time_block = perf_counter()
+        self._is_owner = thread is None
+        self._thread = H5WriteThread(file.file, flush_sec) if thread is None else thread
+        self._thread.add(self)
+
+    @property
+    def time(self) -> object:
+        """Returning the dataset of the timestamps"""
+        return self._time
+
+    @property
+    def data(self) -> object:
+        """Returning the dataset of the data"""
+        return self._data
+
+    @property
+    def num_samples(self) -> int:
+        """Returning the number of appended samples"""
+        return self._num_samples
+
+    @property
+    def num_written(self) -> int:
+        """Returning the number of samples written into the file"""
+        return self._num_written
+
+    def _check_exception(self) -> None:
+        if self._exception is not None:
+            exc, self._exception = self._exception, None
+            raise exc
+
+    def _get_block(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returning a free block, waiting for the writer if all blocks are in use"""
+        while True:
+            try:
+                return self._free.get(timeout=0.5)
+            except Empty:
+                self._check_exception()
+                if not self._thread.is_alive:
+                    raise RuntimeError("Writer thread of the recording is not running")
+
+    def _submit(self) -> None:
+        """Passing the actual block to the writer thread"""
+        if self._num_block:
+            self._thread.submit(self, self._block, self._num_block)
+            self._block = None
+            self._num_block = 0
+
+    def append(self, data: np.ndarray, timestamps: np.ndarray) -> None:
+        """Appending samples (copy), full blocks are written by the writer thread
+        :param data:        Numpy array with shape (num_samples, num_channels)
+        :param timestamps:  Numpy array with timestamp of each sample [sec.]
+        :return:            None
+        """
+        self._check_exception()
+        num = len(timestamps)
+        pos = 0
+        while pos < num:
+            if self._block is None:
+                self._block = self._get_block()
+                self._time_block = perf_counter()
+            size = min(num - pos, self._chunk_size - self._num_block)
+            self._block[0][self._num_block:self._num_block + size] = timestamps[pos:pos + size]
+            self._block[1][self._num_block:self._num_block + size] = data[pos:pos + size]
+            self._num_block += size
+            pos += size
+            if self._num_block == self._chunk_size:
+                self._submit()
+        self._num_samples += num
+        self.poll()
+
+    def poll(self) -> None:
+        """Passing a partial block to the writer thread if its first sample is older than the flush interval"""
+        if self._num_block and perf_counter() - self._time_block > self._flush_sec:
+            self._submit()
+
+    def _write_block(self, block: tuple[np.ndarray, np.ndarray], num: int) -> None:
+        """Writing the first num samples of a block into the datasets (called by the writer thread, compression runs here)"""
+        block_time, block_data = block
+        try:
+            if self._exception is None:
+                end = self._num_written + num
+                if end > self._capacity:
+                    self._capacity = self._chunk_size * ceil(max(end, 2 * self._capacity) / self._chunk_size)
+                    self._time.resize((self._capacity, ))
+                    self._data.resize((self._capacity, self._data.shape[1]))
+                if self._is_delta:
+                    encoded = encode_time_delta(block_time[:num], self._num_written, self._time_last, self._chunk_size)
+                    self._time_last = block_time[num - 1:num].view(np.int64)[0]
+                    self._time[self._num_written:end] = encoded
+                else:
+                    self._time[self._num_written:end] = block_time[:num]
+                self._data[self._num_written:end] = block_data[:num]
+                if self._pyramid is not None:
+                    self._pyramid.append(block_data[:num], block_time[:num])
+                self._num_written = end
+                if self._on_write is not None:
+                    self._on_write(block_time[num - 1])
+        except Exception as e:
+            self._exception = e
+        self._free.put(block)
+
+    def close(self) -> None:
+        """Writing all remaining samples and trimming the datasets to the number of samples (the file is not closed)"""
+        self._submit()
+        if self._is_owner:
+            self._thread.close()
+        else:
+            # All blocks are back in the pool once the shared writer thread has written them
+            for _ in range(self._num_blocks):
+                self._get_block()
+        self._time.resize((self._num_written, ))
+        self._data.resize((self._num_written, self._data.shape[1]))
+        self._data.attrs["num_samples"] = self._num_written
+        if self._pyramid is not None and self._exception is None:
+            self._pyramid.close()
+        self._file.file.flush()
+        self._check_exception()
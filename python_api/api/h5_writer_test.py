@@ -0,0 +1,153 @@
+import h5py
+import pytest
+import numpy as np
+from pathlib import Path
+from time import sleep
+from api.h5_writer import BufferedH5Writer, DecimationPyramid, H5WriteThread, encode_time_delta, get_chunk_size, get_compression_names, read_time
+
+
+def test_chunk_size():
+    assert get_chunk_size(10.) == 256
+    assert get_chunk_size(10000.) == 4096
+    assert get_chunk_size(1e6) == 65536
+
+
+def test_write_small_chunks(tmp_path: Path):
+    written = list()
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        dut = BufferedH5Writer(f, num_channels=3, dtype=np.int16, chunk_size=256, num_blocks=2, on_write=written.append)
+        for pos in range(0, 5000, 10):
+            index = np.arange(pos, pos + 10)
+            dut.append(np.stack([index, -index, index % 7], axis=1).astype(np.int16), index / 1000.)
+        assert dut.num_samples == 5000
+        dut.close()
+        assert dut.num_written == 5000
+        assert f["data"].chunks == (256, 3)
+        assert f["data"].attrs["num_samples"] == 5000
+    with h5py.File(tmp_path / "test.h5", "r") as f:
+        assert f["time"].shape == (5000, )
+        np.testing.assert_array_equal(f["data"][:, 1], -np.arange(5000))
+        np.testing.assert_allclose(f["time"][:], np.arange(5000) / 1000.)
+    assert written[-1] == pytest.approx(4.999)
+    assert len(written) == 20
+
+
+def test_growth(tmp_path: Path):
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        dut = BufferedH5Writer(f, num_channels=1, dtype=np.float32, chunk_size=256)
+        dut.append(np.ones((10000, 1), dtype=np.float32), np.arange(10000.))
+        sleep(0.2)
+        assert f["data"].shape[0] >= 10000
+        assert f["data"].shape[0] % 256 == 0
+        dut.close()
+        assert f["data"].shape == (10000, 1)
+
+
+def test_flush_partial_block(tmp_path: Path):
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        dut = BufferedH5Writer(f, num_channels=2, dtype=np.int32, chunk_size=4096, flush_sec=0.05)
+        dut.append(np.ones((10, 2), dtype=np.int32), np.arange(10.))
+        assert dut.num_written == 0
+        sleep(0.1)
+        dut.poll()
+        sleep(0.1)
+        assert dut.num_written == 10
+        dut.close()
+
+
+def test_writer_exception(tmp_path: Path):
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        dut = BufferedH5Writer(f, num_channels=1, dtype=np.int32, chunk_size=256, on_write=lambda time: 1 / 0)
+        dut.append(np.ones((256, 1), dtype=np.int32), np.arange(256.))
+        with pytest.raises(ZeroDivisionError):
+            dut.close()
+
+
+def test_time_delta():
+    rng = np.random.default_rng(0)
+    time = np.concatenate([1e5 + np.cumsum(rng.uniform(4e-4, 6e-4, 1000)), [np.nan, -1e13, 0., np.inf]])
+    encoded = np.concatenate([encode_time_delta(time[:300], 0, np.int64(0), 256), encode_time_delta(time[300:], 300, time[299:300].view(np.int64)[0], 256)])
+    assert encoded[0] == time[0:1].view(np.int64)[0]
+    assert encoded[512] == time[512:513].view(np.int64)[0]
+
+
+@pytest.mark.parametrize("compression", get_compression_names())
+def test_write_compressed(tmp_path: Path, compression: str):
+    rng = np.random.default_rng(1)
+    time = np.concatenate([1e5 + np.cumsum(rng.uniform(4e-4, 6e-4, 9990)), [np.nan, -1e13, 0., np.inf, 1.] * 2])
+    data = np.cumsum(rng.integers(-3, 4, (10000, 4)), axis=0).astype(np.int32)
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        dut = BufferedH5Writer(f, num_channels=4, dtype=np.int32, chunk_size=256, flush_sec=0., compression=compression)
+        for pos in range(0, 10000, 37):
+            dut.append(data[pos:pos + 37], time[pos:pos + 37])
+            dut.poll()
+        dut.close()
+    with h5py.File(tmp_path / "test.h5", "r") as f:
+        assert f["data"].compression == compression
+        assert f["time"].attrs["encoding"] == "delta"
+        np.testing.assert_array_equal(f["data"][:], data)
+        np.testing.assert_array_equal(read_time(f["time"]).view(np.int64), time.view(np.int64))
+        np.testing.assert_array_equal(read_time(f["time"], 1000, 1300).view(np.int64), time[1000:1300].view(np.int64))
+        assert read_time(f["time"], 5, 5).size == 0
+        assert f["time"].id.get_storage_size() < time.nbytes / 2
+        assert f["data"].id.get_storage_size() < data.nbytes / 2
+
+
+def test_shared_thread(tmp_path: Path):
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        thread = H5WriteThread(f, flush_sec=0.05)
+        fast = BufferedH5Writer(f.create_group("fast"), num_channels=3, dtype=np.int32, chunk_size=256, flush_sec=0.05, thread=thread)
+        slow = BufferedH5Writer(f.create_group("slow"), num_channels=1, dtype=np.float32, chunk_size=256, flush_sec=0.05, thread=thread)
+        for pos in range(0, 3000, 100):
+            fast.append(np.full((100, 3), pos, dtype=np.int32), np.arange(pos, pos + 100) / 1000.)
+            slow.append(np.full((1, 1), pos, dtype=np.float32), np.array([pos / 1000.]))
+        sleep(0.1)
+        slow.poll()
+        sleep(0.1)
+        assert f["slow/data"].attrs["num_samples"] == 30
+        fast.close()
+        slow.close()
+        thread.close()
+    with h5py.File(tmp_path / "test.h5", "r") as f:
+        assert f["fast/data"].shape == (3000, 3)
+        assert f["slow/data"].shape == (30, 1)
+        np.testing.assert_array_equal(f["slow/data"][:, 0], np.arange(0, 3000, 100))
+
+
+def test_unknown_compression(tmp_path: Path):
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        with pytest.raises(ValueError):
+            BufferedH5Writer(f, num_channels=1, dtype=np.int32, compression="zip")
+
+
+def test_decimation_pyramid(tmp_path: Path):
+    rng = np.random.default_rng(0)
+    data = rng.integers(-1000, 1000, size=(10000, 2)).astype(np.int16)
+    time = np.arange(10000) / 1000.
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        dut = BufferedH5Writer(f, num_channels=2, dtype=np.int16, chunk_size=256, decimation=(16, 256))
+        for pos in range(0, 10000, 37):
+            dut.append(data[pos:pos + 37], time[pos:pos + 37])
+        dut.close()
+    with h5py.File(tmp_path / "test.h5", "r") as f:
+        assert tuple(f["pyramid"].attrs["factors"]) == (16, 256)
+        for factor in (16, 256):
+            level = f["pyramid"][str(factor)]
+            num = -(-10000 // factor)
+            assert level["min"].shape == (num, 2)
+            assert level["min"].dtype == np.int16
+            np.testing.assert_array_equal(level["time"][:], time[::factor])
+            np.testing.assert_array_equal(level["min"][:], np.minimum.reduceat(data, np.arange(0, 10000, factor)))
+            np.testing.assert_array_equal(level["max"][:], np.maximum.reduceat(data, np.arange(0, 10000, factor)))
+            np.testing.assert_allclose(level["mean"][-1], data[(num - 1) * factor:].mean(axis=0), rtol=1e-5)
+            np.testing.assert_allclose(level["mean"][0], data[:factor].mean(axis=0), rtol=1e-5)
+
+
+def test_decimation_factors(tmp_path: Path):
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        with pytest.raises(ValueError):
+            DecimationPyramid(f, num_channels=1, dtype=np.int32, factors=(16, 100))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,165 @@
+import os
+from pathlib import Path
+from time import perf_counter
+from psutil import Process, cpu_percent, virtual_memory, NoSuchProcess
+
+
+def get_telemetry_names() -> list[str]:
+    """Returning the names of all available channels of HostTelemetry"""
+    return ['cpu_host', 'ram_host', 'cpu_process', 'rss_process', 'cpu_children', 'cpu_thread_max', 'num_threads', 'disk_write']
+
+
+def get_block_device(path: Path | str) -> str:
+    """Returning the name of the block device which holds a folder (Linux only, e.g. 'sda1')
+    :param path:    Path to the folder
+    :return:        String with name of the block device (empty if not available, e.g. on tmpfs or overlay filesystems)
+    """
+    try:
+        st_dev = os.stat(path).st_dev
+        with open(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}/uevent", "r") as f:
+            for line in f:
+                if line.startswith("DEVNAME="):
+                    return line.strip().split("=", 1)[1]
+    except (OSError, AttributeError):
+        pass
+    return ""
+
+
+class HostTelemetry:
+    _channels: list[str]
+    _process: Process
+    _device: str
+    _time_last: float
+    _cpu_last: float
+    _children: list[Process]
+    _children_last: dict[int, float]
+    _time_scan: float
+    _threads_last: dict[int, float]
+    _threads_cpu: dict[int, float]
+    _disk_last: int
+    __scan_period: float = 1.
+
+    def __init__(self, channels: list[str] | None=None, pid: int=0, path2disk: Path | str="") -> None:
+        """Class for sampling the utilization of the host, of one process and its threads and child processes, and of
+        the disk with low overhead (counters from /proc are read and differentiated between two calls of update())
+        :param channels:    List with names of the channels (see get_telemetry_names(), None for CPU and RAM of the host)
+        :param pid:         Integer with process ID of the observed process (0 for this process)
+        :param path2disk:   Path to the recording folder, the written bytes of its block device are used for 'disk_write'
+                            (if the device is not available, the written bytes of the process and its children are used)
+        :return:            None
+        """
+        self._channels = list(channels) if channels is not None else ['cpu_host', 'ram_host']
+        for name in self._channels:
+            if name not in get_telemetry_names():
+                raise ValueError(f"Unknown telemetry channel {name} - Available: {get_telemetry_names()}")
+        self._process = Process(pid if pid else os.getpid())
+        self._device = get_block_device(path2disk) if path2disk else ""
+        self._children = list()
+        self._children_last = dict()
+        self._time_scan = -self.__scan_period
+        self._threads_last = dict()
+        self._threads_cpu = dict()
+        self._time_last = perf_counter()
+        self._cpu_last = self._get_cpu_time(self._process)
+        self._disk_last = self._get_disk_bytes()
+        cpu_percent(interval=None)
+        self.update()
+
+    @property
+    def channels(self) -> list[str]:
+        """Returning the names of the sampled channels"""
+        return self._channels
+
+    @property
+    def device(self) -> str:
+        """Returning the name of the block device of the recording folder (empty if the written bytes of the process are used)"""
+        return self._device
+
+    @property
+    def thread_cpu(self) -> dict[int, float]:
+        """Returning the CPU utilization of each thread of the process between the last two calls of update() [%]"""
+        return self._threads_cpu
+
+    @staticmethod
+    def _get_cpu_time(process: Process) -> float:
+        times = process.cpu_times()
+        return times.user + times.system
+
+    def _get_children(self) -> list[Process]:
+        """Returning the child processes, the list is only refreshed once per scan period (scanning all processes is expensive)"""
+        if perf_counter() - self._time_scan >= self.__scan_period:
+            self._time_scan = perf_counter()
+            self._children = self._process.children(recursive=True)
+        return self._children
+
+    def _get_disk_bytes(self) -> int:
+        """Returning the written bytes of the block device (sectors of 512 bytes in /proc/diskstats) or of the process tree"""
+        if 'disk_write' not in self._channels:
+            return 0
+        if self._device:
+            with open("/proc/diskstats", "r") as f:
+                for line in f:
+                    fields = line.split()
+                    if fields[2] == self._device:
+                        return 512 * int(fields[9])
+        try:
+            num = self._process.io_counters().write_bytes
+            for child in self._get_children():
+                try:
+                    num += child.io_counters().write_bytes
+                except NoSuchProcess:
+                    continue
+            return num
+        except AttributeError:
+            return 0
+
+    def _get_children_cpu(self, duration: float) -> float:
+        """Returning the summed CPU utilization of all child processes [%], new children are counted from the next call"""
+        cpu = dict()
+        for child in self._get_children():
+            try:
+                cpu[child.pid] = self._get_cpu_time(child)
+            except NoSuchProcess:
+                continue
+        delta = sum(val - self._children_last[pid] for pid, val in cpu.items() if pid in self._children_last)
+        self._children_last = cpu
+        return 100 * delta / duration
+
+    def _get_threads_cpu(self, duration: float) -> float:
+        """Updating the CPU utilization of each thread and returning the largest one [%]"""
+        cpu = {thread.id: thread.user_time + thread.system_time for thread in self._process.threads()}
+        self._threads_cpu = {tid: 100 * (val - self._threads_last[tid]) / duration for tid, val in cpu.items() if tid in self._threads_last}
+        self._threads_last = cpu
+        return max(self._threads_cpu.values(), default=0.)
+
+    def update(self) -> list[float]:
+        """Sampling all channels, the utilization is averaged since the last call
+        :return:    List with values of all channels (CPU in %, RAM in %, RSS in MB, disk write in bytes/s)
+        """
+        time_now = perf_counter()
+        duration = max(time_now - self._time_last, 1e-6)
+        self._time_last = time_now
+        values = list()
+        for name in self._channels:
+            match name:
+                case 'cpu_host':
+                    values.append(cpu_percent(interval=None))
+                case 'ram_host':
+                    values.append(virtual_memory().percent)
+                case 'cpu_process':
+                    cpu = self._get_cpu_time(self._process)
+                    values.append(100 * (cpu - self._cpu_last) / duration)
+                    self._cpu_last = cpu
+                case 'rss_process':
+                    values.append(self._process.memory_info().rss / 2**20)
+                case 'cpu_children':
+                    values.append(self._get_children_cpu(duration))
+                case 'cpu_thread_max':
+                    values.append(self._get_threads_cpu(duration))
+                case 'num_threads':
+                    values.append(float(self._process.num_threads()))
+                case 'disk_write':
+                    num = self._get_disk_bytes()
+                    values.append(max(num - self._disk_last, 0) / duration)
+                    self._disk_last = num
+        return [float(val) for val in values]
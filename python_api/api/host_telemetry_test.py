@@ -0,0 +1,51 @@
+import pytest
+from pathlib import Path
+from threading import Thread
+from time import perf_counter, sleep
+from api.host_telemetry import HostTelemetry, get_block_device, get_telemetry_names
+
+
+def busy_loop(duration_sec: float) -> None:
+    time_end = perf_counter() + duration_sec
+    while perf_counter() < time_end:
+        pass
+
+
+def test_default_channels():
+    dut = HostTelemetry()
+    assert dut.channels == ['cpu_host', 'ram_host']
+    values = dut.update()
+    assert len(values) == 2
+    assert all(0. <= val <= 100. for val in values)
+
+
+def test_unknown_channel():
+    with pytest.raises(ValueError):
+        HostTelemetry(['cpu_gpu'])
+
+
+def test_process_and_threads():
+    dut = HostTelemetry(['cpu_process', 'rss_process', 'cpu_thread_max', 'num_threads'])
+    thread = Thread(target=busy_loop, args=(0.5, ))
+    thread.start()
+    sleep(0.1)
+    dut.update()
+    sleep(0.3)
+    cpu_process, rss, cpu_thread, num_threads = dut.update()
+    thread.join()
+    assert cpu_process > 50.
+    assert cpu_thread > 50.
+    assert max(dut.thread_cpu.values()) == cpu_thread
+    assert rss > 1.
+    assert num_threads >= 2
+
+
+def test_disk_write(tmp_path: Path):
+    assert isinstance(get_block_device(tmp_path), str)
+    dut = HostTelemetry(['disk_write'], path2disk=tmp_path)
+    assert dut.update()[0] >= 0.
+    assert len(get_telemetry_names()) == 8
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,4 +1,8 @@
+import os
 from logging import Logger, getLogger
+from select import select
+from threading import Condition, Event, Thread
+from time import perf_counter, sleep
 from serial import (
     Serial,
     PARITY_NONE,
@@ -8,23 +12,248 @@ from serial import (
 from serial.tools import list_ports
 
 
+def get_comport_names(usb_vid: int) -> list[str]:
+    """Returning the COM Port names of all addressable devices
+    :param usb_vid: USB VID
+    :return:        List with COM port names with matched VIP und PID properties (sorted by name)
+    """
+    available_ports = list_ports.comports()
+    return sorted([port.device for port in available_ports if port.vid == usb_vid and (port.pid == 0x000A or port.pid == 0x0009)])
+
+
 def get_comport_name(usb_vid: int) -> str:
     """Returning the COM Port name of the addressable devices
     :param usb_vid: USB VID
     :return:        String with COM port name with matched VIP und PID properties
     """
-    available_ports = list_ports.comports()
-    list_right_com = [port.device for port in available_ports if port.vid == usb_vid and (port.pid == 0x000A or port.pid == 0x0009)]
+    list_right_com = get_comport_names(usb_vid)
     if len(list_right_com) == 0:
         raise ConnectionError(f"No COM Port with right USB found - Please adapt the VID and PID values {[[port.name, port.vid, port.pid] for port in list_ports.comports()]}")
     return list_right_com[0]
 
 
+def split_batch_responses(data: list[bytes], sizes: list[int], received: bytes, head_index: int) -> list[bytes]:
+    """Demultiplexing the responses of several commands which were sent in one transmission by their head byte
+    :param data:        List with converted commands
+    :param sizes:       List with number of response bytes for each command (0 if no response is expected)
+    :param received:    Bytes with all received responses
+    :param head_index:  Integer with position of the head byte in a command (number of data bytes)
+    :return:            List with response of each command in the same order as data (empty bytes for no response)
+    """
+    if len(received) != sum(sizes):
+        raise TimeoutError(f"Received {len(received)} of {sum(sizes)} bytes of the responses")
+    pending = dict()
+    for idx, (command, size) in enumerate(zip(data, sizes)):
+        if size > 0:
+            pending.setdefault(command[head_index], []).append(idx)
+
+    responses = [bytes() for _ in data]
+    pos = 0
+    while pos < len(received):
+        head = received[pos]
+        if not pending.get(head):
+            raise ValueError(f"Unexpected response with head {head} in {received}")
+        idx = pending[head].pop(0)
+        responses[idx] = received[pos:pos + sizes[idx]]
+        pos += sizes[idx]
+    if any(pending.values()):
+        raise TimeoutError(f"Missing responses for heads {[head for head, idx in pending.items() if idx]}")
+    return responses
+
+
+class ReceiveRing:
+    _buffer: bytearray
+    _view: memoryview
+    _size: int
+    _num_written: int
+    _num_read: int
+    _num_full: int
+    _cond: Condition
+
+    def __init__(self, size: int) -> None:
+        """Preallocated byte ring buffer for one writer (serial reader thread) and one reader (decoder thread)
+        :param size:    Integer with size of the ring buffer in bytes
+        :return:        None
+        """
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._size = size
+        self._cond = Condition()
+        self.reset()
+
+    @property
+    def size(self) -> int:
+        """Returning the size of the ring buffer in bytes"""
+        return self._size
+
+    @property
+    def num_available(self) -> int:
+        """Returning the number of bytes which are ready for reading"""
+        return self._num_written - self._num_read
+
+    @property
+    def num_full(self) -> int:
+        """Returning how often the writer has found the ring buffer completely filled"""
+        return self._num_full
+
+    def reset(self) -> None:
+        """Resetting the read and write position of the ring buffer
+        :return:    None
+        """
+        with self._cond:
+            self._num_written = 0
+            self._num_read = 0
+            self._num_full = 0
+            self._cond.notify_all()
+
+    def get_write_view(self, max_bytes: int, timeout: float) -> memoryview:
+        """Returning a contiguous free region of the ring buffer for writing new data into it
+        :param max_bytes:   Integer with maximum number of bytes of the region
+        :param timeout:     Float with maximum waiting time for free space [sec.]
+        :return:            Memoryview on the free region (empty if the ring buffer is still full)
+        """
+        with self._cond:
+            if self._num_written - self._num_read >= self._size:
+                self._num_full += 1
+                self._cond.wait_for(lambda: self._num_written - self._num_read < self._size, timeout=timeout)
+            free = self._size - (self._num_written - self._num_read)
+        start = self._num_written % self._size
+        return self._view[start:start + min(free, self._size - start, max_bytes)]
+
+    def commit_write(self, num: int) -> None:
+        """Publishing the number of bytes which are written into the region from get_write_view"""
+        if num > 0:
+            with self._cond:
+                self._num_written += num
+                self._cond.notify_all()
+
+    def get_read_view(self, max_bytes: int, timeout: float, min_bytes: int=1) -> memoryview:
+        """Returning a contiguous region of the ring buffer with received data (zero-copy)
+        :param max_bytes:   Integer with maximum number of bytes of the region
+        :param timeout:     Float with maximum waiting time for new data [sec.]
+        :param min_bytes:   Integer with number of bytes to wait for (less bytes are returned after timeout)
+        :return:            Memoryview on the received data (empty if no data is available), release it with commit_read
+        """
+        min_bytes = max(1, min(min_bytes, max_bytes, self._size))
+        with self._cond:
+            if self._num_written - self._num_read < min_bytes:
+                self._cond.wait_for(lambda: self._num_written - self._num_read >= min_bytes, timeout=timeout)
+            available = self._num_written - self._num_read
+        start = self._num_read % self._size
+        return self._view[start:start + min(available, self._size - start, max_bytes)]
+
+    def commit_read(self, num: int) -> None:
+        """Releasing the number of bytes from the region of get_read_view for overwriting"""
+        if num > 0:
+            with self._cond:
+                self._num_read += num
+                self._cond.notify_all()
+
+
+class AdaptiveReadSize:
+    _frame_size: int
+    _latency_sec: float
+    _min_frames: int
+    _max_frames: int
+    _smoothing: float
+    _rate: float
+    _backlog: int
+    _num_read: int
+    _time_last: float | None
+
+    def __init__(self, frame_size: int, latency_sec: float=0.02, min_frames: int=1, max_frames: int=4096, smoothing: float=0.2) -> None:
+        """Policy for sizing the reads of a continuous data stream, the read size follows the arrival rate of the data
+        so that one read collects the data of the latency target and the backlog of the input is drained at once
+        :param frame_size:  Integer with number of bytes of one frame (all sizes are multiples of it)
+        :param latency_sec: Float with target of the waiting time for one read [sec.]
+        :param min_frames:  Integer with minimum number of frames for one read
+        :param max_frames:  Integer with maximum number of frames for one read
+        :param smoothing:   Float with weight of the newest rate estimation in the exponential moving average
+        :return:            None
+        """
+        self._frame_size = frame_size
+        self._latency_sec = latency_sec
+        self._min_frames = max(1, min_frames)
+        self._max_frames = max(self._min_frames, max_frames)
+        self._smoothing = smoothing
+        self.reset()
+
+    @property
+    def latency_sec(self) -> float:
+        """Returning the target of the waiting time for one read [sec.]"""
+        return self._latency_sec
+
+    @property
+    def rate(self) -> float:
+        """Returning the estimated arrival rate of the data [bytes/sec.]"""
+        return self._rate
+
+    @property
+    def backlog(self) -> int:
+        """Returning the number of bytes which are waiting in the input after the last read"""
+        return self._backlog
+
+    @property
+    def num_read(self) -> int:
+        """Returning the number of bytes of the last read"""
+        return self._num_read
+
+    @property
+    def min_bytes(self) -> int:
+        """Returning the number of bytes to wait for in the next read (data of the latency target)"""
+        num_frames = round(self._rate * self._latency_sec / self._frame_size)
+        return self._frame_size * min(max(num_frames, self._min_frames), self._max_frames)
+
+    @property
+    def max_bytes(self) -> int:
+        """Returning the maximum number of bytes to take in the next read (drains the backlog)"""
+        num_frames = max(self.min_bytes, self._backlog) // self._frame_size
+        return self._frame_size * min(max(num_frames, self._min_frames), self._max_frames)
+
+    def reset(self, rate: float=0.) -> None:
+        """Resetting the policy
+        :param rate:    Float with initial arrival rate of the data [bytes/sec.], e.g. from the sampling rate
+        :return:        None
+        """
+        self._rate = rate
+        self._backlog = 0
+        self._num_read = 0
+        self._time_last = None
+
+    def update(self, num_read: int, backlog: int, time: float | None=None) -> None:
+        """Updating the estimation of the arrival rate after one read
+        :param num_read:    Integer with number of bytes of the read
+        :param backlog:     Integer with number of bytes which are still waiting in the input after the read
+        :param time:        Float with time of the read [sec.] (None for actual time)
+        :return:            None
+        """
+        time = perf_counter() if time is None else time
+        if self._time_last is not None and time > self._time_last:
+            arrival = max(0, num_read + backlog - self._backlog)
+            self._rate += self._smoothing * (arrival / (time - self._time_last) - self._rate)
+        self._time_last = time
+        self._backlog = backlog
+        self._num_read = num_read
+
+    def get_parameters(self) -> list[float]:
+        """Returning the actual parameters of the policy (see get_parameter_names())"""
+        return [float(self.min_bytes), float(self._num_read), float(self._backlog)]
+
+    @staticmethod
+    def get_parameter_names() -> list[str]:
+        """Returning the names of the parameters in the order of get_parameters()"""
+        return ['read_target_bytes', 'read_bytes', 'read_backlog_bytes']
+
+
 class InterfaceSerial:
     __logger: Logger
     __device: Serial
     __BYTES_HEAD: int
     __BYTES_DATA: int
+    __timeout: float
+    __ring: ReceiveRing | None = None
+    __reader: Thread | None = None
+    __reader_event: Event
 
     def __init__(self, com_name: str, baud: int=115200, num_bytes_head: int=1, num_bytes_data: int=2, timeout: float=1.) -> None:
         """Class for interacting with the USB serial devices
@@ -36,6 +265,8 @@ class InterfaceSerial:
         self.__logger = getLogger(__name__)
         self.__BYTES_HEAD = num_bytes_head
         self.__BYTES_DATA = num_bytes_data
+        self.__timeout = timeout
+        self.__reader_event = Event()
         self.__device = Serial(
                 port=com_name,
                 baudrate=baud,
@@ -69,10 +300,120 @@ class InterfaceSerial:
         """Return True if the device is open, False otherwise"""
         return self.__device.is_open
 
+    @property
+    def is_reader_active(self) -> bool:
+        """Returning True if the dedicated reader thread is receiving into the ring buffer"""
+        return self.__reader is not None and self.__reader.is_alive()
+
+    @property
+    def timeout(self) -> float:
+        """Returning the timeout for waiting on data of the reader thread [sec.]"""
+        return self.__timeout
+
+    @timeout.setter
+    def timeout(self, value: float) -> None:
+        self.__timeout = value
+
+    @property
+    def in_waiting(self) -> int:
+        """Returning the number of received bytes which are not read yet (ring buffer and input buffer of the port)"""
+        num = self.__device.in_waiting if self.__device.is_open else 0
+        if self.is_reader_active:
+            num += self.__ring.num_available
+        return num
+
+    @property
+    def ring(self) -> ReceiveRing | None:
+        """Returning the receive ring buffer of the reader thread (None if reader mode was never started)"""
+        return self.__ring
+
     def read(self, no_bytes: int) -> bytes:
         """Read content from device"""
+        if self.is_reader_active:
+            view = self.__ring.get_read_view(no_bytes, self.__timeout)
+            data = bytes(view)
+            self.__ring.commit_read(len(view))
+            return data
         return self.__device.read(no_bytes)
 
+    def read_view(self, max_bytes: int, min_bytes: int=1) -> memoryview:
+        """Returning received data from the ring buffer of the reader thread without copying it
+        :param max_bytes:   Integer with maximum number of bytes to get
+        :param min_bytes:   Integer with number of bytes to wait for (less bytes are returned after the timeout)
+        :return:            Memoryview on the received bytes, must be released with release_view() after processing
+        """
+        return self.__ring.get_read_view(max_bytes, self.__timeout, min_bytes)
+
+    def release_view(self, num: int) -> None:
+        """Releasing the number of processed bytes from read_view() in the ring buffer"""
+        self.__ring.commit_read(num)
+
+    def start_reader(self, ring_size: int=2**20, chunk_size: int=2**14) -> None:
+        """Starting a dedicated thread which receives all data from the device into a preallocated ring buffer
+        :param ring_size:   Integer with size of the ring buffer in bytes
+        :param chunk_size:  Integer with maximum number of bytes per read call
+        :return:            None
+        """
+        if self.is_reader_active:
+            self.stop_reader()
+        if self.__ring is None or self.__ring.size != ring_size:
+            self.__ring = ReceiveRing(ring_size)
+        else:
+            self.__ring.reset()
+        self.__reader_event.set()
+        self.__reader = Thread(target=self.__thread_reader, args=(chunk_size, ), daemon=True)
+        self.__reader.start()
+
+    def stop_reader(self, quiet_sec: float=0., max_sec: float=1.) -> None:
+        """Stopping the reader thread and discarding all unread data
+        :param quiet_sec:   Float with time without receiving any byte until the device is regarded as silent [sec.], bytes which
+                            are still in flight (e.g. after stopping the DAQ) are discarded until then (0 to discard only received bytes)
+        :param max_sec:     Float with maximum time for waiting on the silence of the device [sec.]
+        :return:            None
+        """
+        self.__reader_event.clear()
+        if self.__reader is not None:
+            self.__reader.join(timeout=4 * self.__timeout)
+            self.__reader = None
+        if not self.__device.is_open:
+            return
+        time_quiet = perf_counter()
+        time_end = time_quiet + max_sec
+        while perf_counter() - time_quiet < quiet_sec and perf_counter() < time_end:
+            num = self.__device.in_waiting
+            if num:
+                self.__device.read(num)
+                time_quiet = perf_counter()
+            else:
+                sleep(min(quiet_sec / 4, 1e-3))
+        self.__device.reset_input_buffer()
+
+    def __read_into(self, view: memoryview, fileno: int | None) -> int:
+        if fileno is None:
+            num = max(1, min(self.__device.in_waiting, len(view)))
+            return self.__device.readinto(view[:num])
+        ready = select([fileno], [], [], min(self.__timeout, 0.1))[0]
+        if not ready:
+            return 0
+        try:
+            return os.readv(fileno, [view])
+        except BlockingIOError:
+            return 0
+
+    def __thread_reader(self, chunk_size: int) -> None:
+        try:
+            fileno = self.__device.fileno() if hasattr(os, 'readv') else None
+        except (AttributeError, NotImplementedError):
+            fileno = None
+        while self.__reader_event.is_set():
+            try:
+                view = self.__ring.get_write_view(chunk_size, min(self.__timeout, 0.1))
+                if len(view):
+                    self.__ring.commit_write(self.__read_into(view, fileno))
+            except Exception as e:
+                self.__logger.error(f"Serial reader stopped: {e}")
+                self.__reader_event.clear()
+
     def write(self, data: bytes) -> None:
         """Write content to device without feedback"""
         self.__device.write(data)
@@ -82,6 +423,15 @@ class InterfaceSerial:
         num = self.__device.write(data)
         return self.__device.read(num if size <= 0 else size)
 
+    def write_wfb_batch(self, data: list[bytes], sizes: list[int]) -> list[bytes]:
+        """Write several commands in one transmission and demultiplex the responses by their head byte
+        :param data:    List with converted commands (see convert())
+        :param sizes:   List with number of response bytes for each command (0 if no response is expected)
+        :return:        List with response of each command in the same order as data (empty bytes for no response)
+        """
+        self.__device.write(b''.join(data))
+        return split_batch_responses(data, sizes, self.__device.read(sum(sizes)), self.__BYTES_DATA)
+
     def write_wfb_lf(self, data: bytes) -> bytes:
         """Write all information to device (unlimited bytes until LF)"""
         self.__device.write(data)
@@ -108,4 +458,6 @@ class InterfaceSerial:
 
     def close(self) -> None:
         """Closing a connection to device"""
+        if self.is_reader_active:
+            self.stop_reader()
         self.__device.close()
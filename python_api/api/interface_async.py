@@ -0,0 +1,181 @@
+import asyncio
+import os
+from logging import Logger, getLogger
+from serial import (
+    Serial,
+    PARITY_NONE,
+    STOPBITS_ONE,
+    EIGHTBITS
+)
+from api.interface import split_batch_responses
+
+
+class AsyncInterfaceSerial:
+    __logger: Logger
+    __device: Serial
+    __com_name: str
+    __baud: int
+    __BYTES_HEAD: int
+    __BYTES_DATA: int
+    __timeout: float
+    __loop: asyncio.AbstractEventLoop | None = None
+    __buffer: bytearray
+    __output: bytearray
+    __received: asyncio.Event | None = None
+    __lock: asyncio.Lock | None = None
+    __stream: asyncio.Queue | None = None
+
+    def __init__(self, com_name: str, baud: int=115200, num_bytes_head: int=1, num_bytes_data: int=2, timeout: float=1.) -> None:
+        """Class for interacting with the USB serial devices on an asyncio event loop (non-blocking, POSIX event loops only)
+        :param com_name:        String with name of the COM port to the device
+        :param baud:            Integer with BAUDRATE for the communication between host and device
+        :param num_bytes_head:  Number of bytes head, implemented on Pico
+        :param num_bytes_data:  Number of bytes data, implemented on Pico
+        :param timeout:         Float with timeout for waiting on responses [sec.]
+        """
+        self.__logger = getLogger(__name__)
+        self.__com_name = com_name
+        self.__baud = baud
+        self.__BYTES_HEAD = num_bytes_head
+        self.__BYTES_DATA = num_bytes_data
+        self.__timeout = timeout
+        self.__buffer = bytearray()
+        self.__output = bytearray()
+        self.__device = Serial(
+            baudrate=baud,
+            parity=PARITY_NONE,
+            stopbits=STOPBITS_ONE,
+            bytesize=EIGHTBITS,
+            xonxoff=False,
+            rtscts=False,
+            dsrdtr=False,
+            timeout=0
+        )
+        self.__device.port = com_name
+
+    @property
+    def total_num_bytes(self) -> int:
+        """Returning the total number of bytes for each transmission"""
+        return self.__BYTES_DATA + self.__BYTES_HEAD
+
+    @property
+    def num_bytes(self) -> int:
+        """Returning the number of data bytes in each transmission"""
+        return self.__BYTES_DATA
+
+    @property
+    def is_streaming(self) -> bool:
+        """Returning True if all received data is routed into the stream queue"""
+        return self.__stream is not None
+
+    def convert(self, head: int, data: int) -> bytes:
+        """Converting head and data into the byte order of a transmission"""
+        transmit = data.to_bytes(self.__BYTES_DATA, 'little')
+        transmit += head.to_bytes(self.__BYTES_HEAD, 'little')
+        return transmit
+
+    def is_open(self) -> bool:
+        """Return True if the device is open, False otherwise"""
+        return self.__device.is_open
+
+    async def open(self) -> None:
+        """Starting a connection to device and registering it on the running event loop"""
+        if self.__device.is_open:
+            self.close()
+        self.__device.open()
+        self.__loop = asyncio.get_running_loop()
+        self.__received = asyncio.Event()
+        self.__lock = asyncio.Lock()
+        self.__buffer.clear()
+        self.__output.clear()
+        os.set_blocking(self.__device.fileno(), False)
+        self.__loop.add_reader(self.__device.fileno(), self.__on_readable)
+
+    def close(self) -> None:
+        """Closing a connection to device"""
+        if self.__device.is_open:
+            if self.__loop is not None:
+                self.__loop.remove_reader(self.__device.fileno())
+                self.__loop.remove_writer(self.__device.fileno())
+            self.__device.close()
+        self.__output.clear()
+        self.stop_stream()
+
+    def __on_readable(self) -> None:
+        try:
+            data = self.__device.read(max(1, self.__device.in_waiting))
+        except Exception as e:
+            self.__logger.error(f"Reading from {self.__com_name} failed: {e}")
+            return
+        if not data:
+            return
+        if self.__stream is not None:
+            self.__stream.put_nowait(data)
+        else:
+            self.__buffer += data
+            self.__received.set()
+
+    def __on_writable(self) -> None:
+        try:
+            del self.__output[:os.write(self.__device.fileno(), self.__output)]
+        except BlockingIOError:
+            pass
+        if self.__output:
+            self.__loop.add_writer(self.__device.fileno(), self.__on_writable)
+        else:
+            self.__loop.remove_writer(self.__device.fileno())
+
+    def write(self, data: bytes) -> None:
+        """Write content to device without feedback (non-blocking, bytes which the port does not take at once are sent
+        by the event loop as soon as the port is writable)"""
+        is_pending = len(self.__output) > 0
+        self.__output += data
+        if not is_pending:
+            self.__on_writable()
+
+    async def read(self, no_bytes: int) -> bytes:
+        """Reading a number of bytes from device, raises TimeoutError if not all bytes are received in time (the received
+        bytes are kept for the next read)"""
+        async with asyncio.timeout(self.__timeout):
+            while len(self.__buffer) < no_bytes:
+                self.__received.clear()
+                await self.__received.wait()
+        data = bytes(self.__buffer[:no_bytes])
+        del self.__buffer[:no_bytes]
+        return data
+
+    async def write_wfb(self, data: bytes, size: int=0) -> bytes:
+        """Write all information to device and await the response (specific bytes)"""
+        async with self.__lock:
+            self.write(data)
+            return await self.read(len(data) if size <= 0 else size)
+
+    async def write_wfb_batch(self, data: list[bytes], sizes: list[int]) -> list[bytes]:
+        """Write several commands in one transmission and demultiplex the responses by their head byte
+        :param data:    List with converted commands (see convert())
+        :param sizes:   List with number of response bytes for each command (0 if no response is expected)
+        :return:        List with response of each command in the same order as data (empty bytes for no response)
+        """
+        async with self.__lock:
+            self.write(b''.join(data))
+            received = await self.read(sum(sizes))
+        return split_batch_responses(data, sizes, received, self.__BYTES_DATA)
+
+    def start_stream(self) -> asyncio.Queue:
+        """Routing all received data into a queue instead of the response buffer (e.g. during DAQ)
+        :return:    Queue with received bytes, None is put into it when the stream is stopped
+        """
+        self.__stream = asyncio.Queue()
+        if self.__buffer:
+            self.__stream.put_nowait(bytes(self.__buffer))
+            self.__buffer.clear()
+        return self.__stream
+
+    def stop_stream(self) -> None:
+        """Stopping the routing into the stream queue and discarding all unread data"""
+        if self.__stream is not None:
+            self.__stream.put_nowait(None)
+            self.__stream = None
+        if self.__device.is_open:
+            self.__device.reset_input_buffer()
+        self.__buffer.clear()
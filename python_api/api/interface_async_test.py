@@ -0,0 +1,62 @@
+import asyncio
+import os
+import pytest
+import tty
+from time import perf_counter
+from .interface_async import AsyncInterfaceSerial
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+def test_read_timeout_keeps_partial_response():
+    async def run() -> bytes:
+        dut = AsyncInterfaceSerial(com_name=os.ttyname(slave), timeout=0.1)
+        await dut.open()
+        os.write(master, bytes([1, 2]))
+        with pytest.raises(TimeoutError):
+            await dut.read(3)
+        os.write(master, bytes([3]))
+        rslt = await dut.read(3)
+        dut.close()
+        return rslt
+
+    master, slave = os.openpty()
+    try:
+        assert asyncio.run(run()) == bytes([1, 2, 3])
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+def test_write_without_blocking():
+    async def run() -> tuple[float, bytes]:
+        dut = AsyncInterfaceSerial(com_name=os.ttyname(slave), timeout=0.1)
+        await dut.open()
+        pattern = bytes(range(256)) * 2**10
+        time_start = perf_counter()
+        dut.write(pattern)
+        duration = perf_counter() - time_start
+        received = bytearray()
+        while len(received) < len(pattern):
+            await asyncio.sleep(0.001)
+            try:
+                received += os.read(master, 2**16)
+            except BlockingIOError:
+                pass
+        dut.close()
+        return duration, bytes(received) == pattern
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    try:
+        duration, is_equal = asyncio.run(run())
+        assert duration < 0.05
+        assert is_equal
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
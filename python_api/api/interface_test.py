@@ -0,0 +1,149 @@
+import os
+import pytest
+from threading import Thread
+from time import sleep
+from .interface import AdaptiveReadSize, ReceiveRing, InterfaceSerial, split_batch_responses
+
+
+def test_ring_write_read():
+    dut = ReceiveRing(16)
+    view = dut.get_write_view(10, 0.)
+    assert len(view) == 10
+    view[:] = bytes(range(10))
+    dut.commit_write(10)
+    assert dut.num_available == 10
+
+    rslt = dut.get_read_view(4, 0.)
+    assert bytes(rslt) == bytes(range(4))
+    dut.commit_read(4)
+    assert dut.num_available == 6
+
+
+def test_ring_wrap_around():
+    dut = ReceiveRing(16)
+    dut.commit_write(len(dut.get_write_view(12, 0.)))
+    dut.commit_read(len(dut.get_read_view(12, 0.)))
+
+    view = dut.get_write_view(10, 0.)
+    assert len(view) == 4
+    view[:] = b'abcd'
+    dut.commit_write(4)
+    view = dut.get_write_view(10, 0.)
+    assert len(view) == 10
+    view[:4] = b'efgh'
+    dut.commit_write(4)
+
+    assert bytes(dut.get_read_view(16, 0.)) == b'abcd'
+    dut.commit_read(4)
+    assert bytes(dut.get_read_view(16, 0.)) == b'efgh'
+
+
+def test_ring_full():
+    dut = ReceiveRing(8)
+    dut.commit_write(len(dut.get_write_view(8, 0.)))
+    assert len(dut.get_write_view(8, 0.)) == 0
+    assert dut.num_full == 1
+    assert len(dut.get_read_view(8, 0.)) == 8
+
+
+def test_ring_min_bytes():
+    dut = ReceiveRing(64)
+    dut.commit_write(len(dut.get_write_view(10, 0.)))
+    assert len(dut.get_read_view(64, 0.01, min_bytes=20)) == 10
+    dut.commit_write(len(dut.get_write_view(10, 0.)))
+    assert len(dut.get_read_view(64, 0.01, min_bytes=20)) == 20
+
+
+def test_adaptive_read_size_follows_rate():
+    dut = AdaptiveReadSize(frame_size=15, latency_sec=0.02, smoothing=0.5)
+    dut.reset(rate=15 * 100.)
+    assert dut.min_bytes == 15 * 2
+    for idx in range(1, 20):
+        dut.update(num_read=15 * 200, backlog=0, time=0.02 * idx)
+    assert dut.rate == pytest.approx(15 * 10e3, rel=1e-3)
+    assert dut.min_bytes == 15 * 200
+    assert dut.max_bytes == 15 * 200
+
+
+def test_adaptive_read_size_backlog():
+    dut = AdaptiveReadSize(frame_size=15, latency_sec=0.02, max_frames=1000)
+    dut.reset(rate=15 * 1000.)
+    dut.update(num_read=15 * 20, backlog=15 * 500 + 7, time=0.)
+    assert dut.min_bytes == 15 * 20
+    assert dut.max_bytes == 15 * 500
+    dut.update(num_read=15 * 20, backlog=15 * 5000, time=0.02)
+    assert dut.max_bytes == 15 * 1000
+    assert dut.get_parameters()[2] == 15 * 5000
+    assert len(dut.get_parameters()) == len(AdaptiveReadSize.get_parameter_names())
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+def test_reader_thread():
+    master, slave = os.openpty()
+    dut = InterfaceSerial(com_name=os.ttyname(slave), timeout=0.1)
+    dut.start_reader(ring_size=1024)
+    assert dut.is_reader_active
+
+    pattern = bytes(range(256)) * 3
+    os.write(master, pattern)
+    rslt = b''
+    for _ in range(50):
+        view = dut.read_view(1024)
+        rslt += bytes(view)
+        dut.release_view(len(view))
+        if len(rslt) >= len(pattern):
+            break
+        sleep(0.01)
+    assert rslt == pattern
+
+    dut.stop_reader()
+    assert not dut.is_reader_active
+    dut.close()
+    os.close(master)
+    os.close(slave)
+
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+def test_stop_reader_drain():
+    master, slave = os.openpty()
+    dut = InterfaceSerial(com_name=os.ttyname(slave), timeout=0.05)
+    dut.start_reader(ring_size=1024)
+
+    def send_late_frames() -> None:
+        for _ in range(15):
+            os.write(master, bytes([0xA0, 1, 2]))
+            sleep(0.01)
+    sender = Thread(target=send_late_frames)
+    sender.start()
+    dut.stop_reader(quiet_sec=0.05)
+    assert not sender.is_alive()
+    os.write(master, bytes([7, 8, 9]))
+    assert dut.read(3) == bytes([7, 8, 9])
+    sender.join()
+    dut.close()
+    os.close(master)
+    os.close(slave)
+
+
+def test_split_batch_responses():
+    data = [bytes([0, 0, 1]), bytes([0, 0, 5]), bytes([0, 0, 2])]
+    assert split_batch_responses(data, [3, 0, 2], bytes([2, 9, 1, 7, 8]), 2) == [bytes([1, 7, 8]), bytes(), bytes([2, 9])]
+    with pytest.raises(ValueError):
+        split_batch_responses(data, [3, 0, 2], bytes([3, 9, 1, 7, 8]), 2)
+    with pytest.raises(TimeoutError):
+        split_batch_responses(data, [3, 0, 2], bytes([2, 9, 1, 7]), 2)
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+def test_write_wfb_batch_truncated():
+    master, slave = os.openpty()
+    dut = InterfaceSerial(com_name=os.ttyname(slave), timeout=0.05)
+    os.write(master, bytes([1, 0, 0, 2, 0]))
+    with pytest.raises(TimeoutError):
+        dut.write_wfb_batch([dut.convert(1, 0), dut.convert(2, 0)], [3, 3])
+    dut.close()
+    os.close(master)
+    os.close(slave)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,12 +1,16 @@
+import json
 import numpy as np
+from dataclasses import dataclass, asdict
 from logging import getLogger, Logger
-from h5py import File
+from h5py import File, Group
 from datetime import datetime
 from pathlib import Path
-from time import sleep
+from time import perf_counter, sleep
 from tqdm import tqdm
-from threading import Event, Thread, Lock
-from psutil import cpu_percent, virtual_memory
+from threading import Event, Thread
+import os
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
 from pylsl import (
     StreamInfo,
     StreamInlet,
@@ -15,11 +19,21 @@ from pylsl import (
     cf_int16,
     cf_int32,
     cf_float32,
-    proc_threadsafe
+    cf_double64,
+    cf_int8,
+    cf_int64,
+    proc_threadsafe,
+    local_clock
 )
-from queue import Queue, Empty
+from queue import Empty, Queue
 from vispy import app, scene
-from api.data_api import DataAPI, RawRecording
+from api.data_api import DataAPI
+from api.h5_writer import BufferedH5Writer, H5WriteThread, get_chunk_size
+from api.host_telemetry import HostTelemetry
+from api.mcu_frame import get_sequence_deltas, classify_sequence_deltas
+from api.mock_waveform import generate_waveform, get_waveform_names
+from api.raw_log import RawLogWriter
+from api.shm_ring import SharedRing, SharedRingReader
 
 
 class RingBuffer:
@@ -59,26 +73,241 @@ class RingBuffer:
         return self._data0
 
 
+class ThreadCounter:
+    num_beats: int
+    num_samples: int
+    num_chunks: int
+    time_last: float
+
+    def __init__(self) -> None:
+        """Monotonic counters of one worker thread, they are only written by the worker itself (no lock on the hot path)
+        and only read by the watchdog
+        :return:    None
+        """
+        self.num_beats = 0
+        self.num_samples = 0
+        self.num_chunks = 0
+        self.time_last = perf_counter()
+
+    def beat(self, is_active: bool=True) -> None:
+        """Signaling that the thread is alive and working
+        :param is_active:   False if the thread is alive but not working (e.g. the stream has no consumers)
+        :return:            None
+        """
+        if is_active:
+            self.num_beats += 1
+            self.time_last = perf_counter()
+
+    def count(self, num_samples: int, is_active: bool=True) -> None:
+        """Signaling the heartbeat and counting one processed chunk (empty chunks are not counted)
+        :param num_samples: Integer with number of samples of the chunk
+        :param is_active:   False if the thread is alive but not working (e.g. the stream has no consumers)
+        :return:            None
+        """
+        if num_samples:
+            self.num_samples += num_samples
+            self.num_chunks += 1
+        self.beat(is_active)
+
+
+class ProcessCounter(ThreadCounter):
+    _values: object
+
+    def __init__(self) -> None:
+        """Monotonic counters of one worker process in shared memory (same interface as ThreadCounter), they are only
+        written by the worker process itself and only read by the watchdog in the main process
+        :return:    None
+        """
+        self._values = get_context('spawn').RawArray('d', 4)
+        super().__init__()
+
+    @property
+    def num_beats(self) -> int:
+        return int(self._values[0])
+
+    @num_beats.setter
+    def num_beats(self, value: int) -> None:
+        self._values[0] = value
+
+    @property
+    def num_samples(self) -> int:
+        return int(self._values[1])
+
+    @num_samples.setter
+    def num_samples(self, value: int) -> None:
+        self._values[1] = value
+
+    @property
+    def num_chunks(self) -> int:
+        return int(self._values[2])
+
+    @num_chunks.setter
+    def num_chunks(self, value: int) -> None:
+        self._values[2] = value
+
+    @property
+    def time_last(self) -> float:
+        return self._values[3]
+
+    @time_last.setter
+    def time_last(self, value: float) -> None:
+        self._values[3] = value
+
+
+class LatencyHistogram:
+    _values: object
+    _buffer: np.ndarray
+    __edges: np.ndarray = np.logspace(-5, 2, 71)
+
+    def __init__(self, use_process: bool=False) -> None:
+        """Histogram of the latency of one stage with logarithmic bins from 10 us to 100 s (10 bins per decade), it is
+        only written by the worker itself and can be read at any time (in shared memory for worker processes)
+        :param use_process: If true, the histogram is allocated in shared memory for a worker process
+        :return:            None
+        """
+        self._values = get_context('spawn').RawArray('d', self.__edges.size + 4) if use_process else None
+        self._buffer = self._get_buffer()
+
+    def __getstate__(self) -> dict:
+        """Returning the state for a worker process (the numpy view is rebuilt on the shared memory)"""
+        state = self.__dict__.copy()
+        state['_buffer'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._buffer = self._get_buffer()
+
+    def _get_buffer(self) -> np.ndarray:
+        """Returning the buffer [num, sum, max, counts of each bin]"""
+        return np.frombuffer(self._values, dtype=np.float64) if self._values is not None else np.zeros(self.__edges.size + 4)
+
+    @staticmethod
+    def get_edges() -> np.ndarray:
+        """Returning the upper edges of the bins [sec.], the last bin has no upper edge"""
+        return LatencyHistogram.__edges.copy()
+
+    @property
+    def num(self) -> int:
+        """Returning the number of added latency values"""
+        return int(self._buffer[0])
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Returning the number of latency values in each bin"""
+        return self._buffer[3:].astype(np.int64)
+
+    def add(self, latency: np.ndarray | float) -> None:
+        """Adding latency values
+        :param latency: Float or numpy array with latency values [sec.]
+        :return:        None
+        """
+        latency = np.atleast_1d(np.asarray(latency, dtype=np.float64))
+        if not latency.size:
+            return
+        self._buffer[3:] += np.bincount(np.searchsorted(self.__edges, latency), minlength=self.__edges.size + 1)
+        self._buffer[0] += latency.size
+        self._buffer[1] += latency.sum()
+        self._buffer[2] = max(self._buffer[2], latency.max())
+
+    def get_percentile(self, percentile: float) -> float:
+        """Returning the upper estimate of a percentile from the bins (limited to the maximum)
+        :param percentile:  Float with percentile [%]
+        :return:            Float with latency [sec.] (NaN if empty)
+        """
+        if not self.num:
+            return np.nan
+        pos = int(np.searchsorted(np.cumsum(self._buffer[3:]), percentile / 100 * self._buffer[0]))
+        upper = self.__edges[pos] if pos < self.__edges.size else np.inf
+        return float(min(upper, self._buffer[2]))
+
+    def get_statistics(self, name: str) -> 'LatencyStatistics':
+        """Returning the summary of the histogram
+        :param name:    String with name of the stage
+        :return:        Class LatencyStatistics
+        """
+        return LatencyStatistics(
+            name=name,
+            num_chunks=self.num,
+            mean_sec=float(self._buffer[1] / self.num) if self.num else np.nan,
+            p50_sec=self.get_percentile(50.),
+            p99_sec=self.get_percentile(99.),
+            max_sec=float(self._buffer[2]) if self.num else np.nan
+        )
+
+
+@dataclass(frozen=True)
+class LatencyStatistics:
+    """Dataclass with the latency of one stage, i.e. the age of the newest sample of each chunk (host time at the end
+    of the stage minus timestamp of the sample)
+    Attributes:
+        name:               String with name of the stage (function and stream name)
+        num_chunks:         Integer with number of measured chunks
+        mean_sec:           Float with mean latency [sec.]
+        p50_sec:            Float with median latency [sec.]
+        p99_sec:            Float with 99th percentile of the latency [sec.]
+        max_sec:            Float with largest latency [sec.]
+    """
+    name: str
+    num_chunks: int
+    mean_sec: float
+    p50_sec: float
+    p99_sec: float
+    max_sec: float
+
+
+@dataclass(frozen=True)
+class ThreadStatistics:
+    """Dataclass with the throughput of one worker thread between two checks of the watchdog
+    Attributes:
+        name:               String with name of the thread (function and stream name)
+        samples_per_sec:    Float with number of processed samples per second
+        chunks_per_sec:     Float with number of processed chunks per second
+        chunk_size:         Float with mean number of samples per chunk
+        age_sec:            Float with time since the last activity of the thread [sec.]
+        is_active:          Boolean if the thread has signaled a heartbeat since the last check
+    """
+    name: str
+    samples_per_sec: float
+    chunks_per_sec: float
+    chunk_size: float
+    age_sec: float
+    is_active: bool
+
+
 class ThreadLSL:
     _logger: Logger
-    _event: Event
-    _lock: Lock
-    _thread: list[Thread]
-    _exception: Queue
-    _thread_active: list[int]
+    _event: object
+    _thread: list[Thread | BaseProcess]
+    _names: list[str]
+    _is_process: list[bool]
+    _exception: object
+    _counters: list[ThreadCounter]
+    _snapshot: list[tuple[int, int, int]]
+    _time_snapshot: float
+    _statistics: list[ThreadStatistics]
+    _latency: list[LatencyHistogram]
+    _rings: list[SharedRing]
     _is_active: bool
     _num_missed: int=0
 
     def __init__(self) -> None:
-        """Class for managing all threads for the LSL data processing
+        """Class for managing all threads for the LSL data processing, stages can also run in own processes (see register)
         :return:    None
         """
         self._logger = getLogger(__name__)
         self._event = Event()
-        self._lock = Lock()
         self._exception = Queue()
+        self._rings = list()
         self._release_threads()
 
+    def __getstate__(self) -> dict:
+        """Returning the state for starting a stage in an own process (without thread and process handles)"""
+        state = self.__dict__.copy()
+        state['_thread'] = list()
+        state['_rings'] = list()
+        return state
+
     @property
     def is_alive(self) -> bool:
         """Returning the state of all threads if they are alive"""
@@ -92,41 +321,151 @@ class ThreadLSL:
         """Returning the state of the thread handler if DAQ is running"""
         return self._event.is_set() and self._is_active
 
-    def register(self, func, args) -> None:
-        """Registering a thread with custom instruction
-        :param func:    Function object for further processing in own thread
-        :param args:    Arguments of the object for starting it
+    @property
+    def statistics(self) -> list[ThreadStatistics]:
+        """Returning the throughput of each registered thread from the last check of the watchdog"""
+        return self._statistics
+
+    @property
+    def latency(self) -> list[LatencyStatistics]:
+        """Returning the actual latency of each registered stage (empty after stop)"""
+        return [hist.get_statistics(name) for name, hist in zip(self._names, self._latency)]
+
+    def get_stream_backlog(self, name: str) -> int:
+        """Returning the number of samples of a stream which are pushed but not yet recorded (queue depth between the
+        streaming stage and lsl_record_stream of the stream or lsl_record_streams with the stream as first stream, 0 if one of both is not registered)
+        :param name:    String with name of the stream
+        :return:        Integer with number of samples
+        """
+        producer = [idx for idx, val in enumerate(self._names) if val.startswith('lsl_stream_') and val.endswith(f"({name})")]
+        consumer = [idx for idx, val in enumerate(self._names) if val in (f"lsl_record_stream({name})", f"lsl_record_streams({name})")]
+        if not producer or not consumer or consumer[0] >= len(self._counters):
+            return 0
+        return max(0, self._counters[producer[0]].num_samples - self._counters[consumer[0]].num_samples)
+
+    def save_latency(self, path: Path | str) -> None:
+        """Saving the latency of all stages with their histograms as JSON file
+        :param path:    Path to the JSON file
         :return:        None
         """
+        stages = [asdict(stats) | {"counts": hist.counts.tolist()} for stats, hist in zip(self.latency, self._latency)]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"edges": LatencyHistogram.get_edges().tolist(), "stages": stages}, f, indent=2)
+
+    def register(self, func, args, kwargs: dict | None=None, use_process: bool=False) -> None:
+        """Registering a thread with custom instruction
+        :param func:        Function object for further processing in own thread
+        :param args:        Arguments of the object for starting it (at least stim_idx and name of the stage)
+        :param kwargs:      Dictionary with keyword arguments of the object for starting it (None for no keyword arguments)
+        :param use_process: If true, the function runs in an own process with own interpreter (function and arguments
+                            must be picklable, e.g. the recording, plotting, utilization, mock and file stages of this class)
+        :return:            None
+        """
+        kwargs = dict() if kwargs is None else kwargs
         if not len(self._thread):
             self._thread = [Thread(target=self._thread_watchdog_heartbeat, args=())]
-        self._thread.append(Thread(target=func, args=args))
+        if use_process:
+            self._thread.append(get_context('spawn').Process(target=self._run_process, args=(func, args, kwargs), daemon=True))
+        else:
+            self._thread.append(Thread(target=func, args=args, kwargs=kwargs))
+        self._names.append(f"{func.__name__}({args[1]})" if len(args) > 1 and isinstance(args[1], str) else func.__name__)
+        self._is_process.append(use_process)
+
+    def register_subthread(self, name: str, use_process: bool=False) -> int:
+        """Registering the heartbeat counter and latency of a thread which is started by a registered stage itself (e.g. the
+        data pulling of lsl_plot_stream), it is checked by the watchdog like a stage
+        :param name:        String with name of the thread in the statistics
+        :param use_process: If true, the stage which starts the thread runs in an own process (see register)
+        :return:            Integer with array index of the thread to write into heartbeat feedback array
+        """
+        self._names.append(name)
+        self._is_process.append(use_process)
+        return len(self._names) - 1
 
     def start(self) -> None:
         """
         Starting all threads including heartbeat watchdog in own thread
         :return:    None
         """
-        self._thread_active = list()
         if len(self._thread) < 2:
             raise AssertionError("No threads registered")
         else:
-            self._thread_active = [False for _ in self._thread[1:]]
+            self._counters = [ProcessCounter() if use_process else ThreadCounter() for use_process in self._is_process]
+            self._latency = [LatencyHistogram(use_process) for use_process in self._is_process]
+            self._snapshot = list()
+            self._time_snapshot = perf_counter()
+            self._statistics = list()
             self._num_missed = 0
             self._is_active = True
+            self._create_events(any(isinstance(p, BaseProcess) for p in self._thread))
             self._event.set()
             for idx, p in enumerate(self._thread):
                 p.start()
             sleep(0.2)
 
-    def stop(self) -> None:
+    def stop(self, path2latency: Path | str | None=None) -> None:
         """Stopping all threads and waiting for shutdown all threads
-        :return:        None
+        :param path2latency:    Path to a JSON file for saving the latency of all stages (None to disable, see save_latency())
+        :return:                None
         """
         self._event.clear()
         for p in self._thread:
-            p.join(timeout=1.)
+            p.join(timeout=1. if isinstance(p, Thread) else 4.)
+            if isinstance(p, BaseProcess) and p.is_alive():
+                self._logger.warning(f"Process {p.name} is not finished and will be terminated")
+                p.terminate()
+        if path2latency is not None:
+            self.save_latency(path2latency)
         self._release_threads()
+        for ring in self._rings:
+            ring.close()
+        self._rings = list()
+
+    def create_ring(self, name: str, channel_num: int, sampling_rate: float, buffer_sec: float=10., dtype: np.dtype=np.int32,
+                    channel_type: int=cf_int32, lsl_type: str='sensor_data') -> str:
+        """Creating a ring buffer in shared memory for passing a stream directly from the acquisition (lsl_stream_data)
+        to the recording and plotting stages of this host without LSL, the ring buffer is removed with stop()
+        :param name:            String with name of the stream
+        :param channel_num:     Integer with number of channels
+        :param sampling_rate:   Floating value with sampling rate in Hz
+        :param buffer_sec:      Floating value with length of the ring buffer [sec.], slower readers lose older samples (overrun)
+        :param dtype:           Numpy datatype of the data
+        :param channel_type:    Integer with LSL channel format of the stream
+        :param lsl_type:        String with type of the stream
+        :return:                String with name of the ring buffer for attaching to it
+        """
+        ring = SharedRing.create(
+            name=f"lsl_{name}_{os.getpid()}",
+            num_channels=channel_num,
+            capacity=max(2**12, int(buffer_sec * sampling_rate)),
+            dtype=dtype,
+            sampling_rate=sampling_rate,
+            channel_format=channel_type,
+            stream_type=lsl_type
+        )
+        self._rings.append(ring)
+        return ring.name
+
+    def _create_events(self, use_process: bool) -> None:
+        """Creating the running event and the exception queue, the shared primitives of the spawn context are only
+        used if a stage runs in an own process (slower is_set() due to the shared lock, exceptions must be picklable)
+        :param use_process: If true, the primitives are shared with the processes
+        :return:            None
+        """
+        if use_process:
+            self._event = get_context('spawn').Event()
+            self._exception = get_context('spawn').Queue()
+        elif not isinstance(self._event, Event):
+            self._event = Event()
+            self._exception = Queue()
+
+    def _run_process(self, func, args, kwargs) -> None:
+        """Running a stage in an own process and forwarding an unhandled exception to the main process"""
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            self._exception.put(e)
 
     def check_exception(self) -> None:
         """Function for checking if any exception information is available from any thread, and return it
@@ -150,9 +489,9 @@ class ThreadLSL:
                 self.check_exception()
                 sleep(1.)
             else:
-                raise RuntimeError(f"One thread is shutdown [{self._is_active}] - {self._thread_active}")
+                raise RuntimeError(f"One thread is shutdown [{self._is_active}] - {self._statistics}")
 
-    def _establish_lsl_outlet(self, idx: int, lsl_name: str, lsl_type: str,  sampling_rate: float, channel_num: int, channel_type: int=cf_int16) -> tuple[StreamOutlet, StreamInfo]:
+    def _establish_lsl_outlet(self, idx: int, lsl_name: str, lsl_type: str,  sampling_rate: float, channel_num: int, channel_type: int=cf_int16, channel_names: list[str] | None=None, wait_for_consumers: bool=True) -> tuple[StreamOutlet, StreamInfo]:
         info = StreamInfo(
             name=lsl_name,
             type=lsl_type,
@@ -161,13 +500,46 @@ class ThreadLSL:
             channel_format=channel_type,
             source_id=f"{lsl_name}_uid"
         )
+        if channel_names is not None:
+            channels = info.desc().append_child("channels")
+            for label in channel_names:
+                channels.append_child("channel").append_child_value("label", label)
         outlet = StreamOutlet(info)
-        while not outlet.wait_for_consumers(timeout=30.0):
-            with self._lock:
-                self._thread_active[idx] = True
+        while wait_for_consumers and not outlet.wait_for_consumers(timeout=30.0):
+            self._counters[idx].beat()
             sleep(0.25)
         return outlet, info
 
+    @staticmethod
+    def _get_channel_names(info: StreamInfo) -> list[str]:
+        """Returning the channel labels from the description of a stream (empty list if not available)"""
+        names = list()
+        channel = info.desc().child("channels").child("channel")
+        while not channel.empty():
+            names.append(channel.child_value("label"))
+            channel = channel.next_sibling()
+        return names
+
+    @staticmethod
+    def _push_chunk_numpy(outlet: StreamOutlet, data: np.ndarray, timestamps: np.ndarray, pushthrough: bool=True) -> None:
+        """Pushing a chunk with one timestamp per sample from numpy arrays (the data is passed without conversion into Python lists)
+        :param outlet:      Class StreamOutlet to push into
+        :param data:        Numpy array with shape (num_samples, channel_num), converted into the datatype of the channel format
+                            (no copy for the matching datatype, e.g. np.int32 for cf_int32)
+        :param timestamps:  Numpy array with timestamp of each sample [sec.]
+        :param pushthrough: Whether to push the chunk through to the receivers instead of buffering it
+        :return:            None
+        """
+        data = np.ascontiguousarray(data, dtype=ThreadLSL._get_numpy_datatype(outlet.channel_format))
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if data.ndim != 2 or data.shape[0] != timestamps.size:
+            raise ValueError(f"Shape of data {data.shape} does not match with {timestamps.size} timestamps")
+        if data.shape[1] != outlet.channel_count:
+            raise ValueError(f"Data with {data.shape[1]} channels does not match with {outlet.channel_count} channels of the outlet")
+        if not timestamps.size:
+            return
+        outlet.push_chunk(data, timestamps.tolist(), pushthrough)
+
     @staticmethod
     def _establish_lsl_inlet(name: str) -> StreamInlet:
         info = resolve_bypred(
@@ -189,17 +561,44 @@ class ThreadLSL:
     def _release_threads(self) -> None:
         self._logger.debug(f"Empty thread")
         self._thread = []
-        self._thread_active = []
+        self._names = []
+        self._is_process = []
+        self._counters = []
+        self._latency = []
+        self._snapshot = []
+        self._statistics = []
         self._is_active = False
 
+    def _update_statistics(self) -> bool:
+        """Calculating the throughput of all threads since the last call from their counters
+        :return:    Boolean if all threads have signaled a heartbeat since the last call
+        """
+        time_now = perf_counter()
+        duration = max(time_now - self._time_snapshot, 1e-9)
+        snapshot = [(counter.num_beats, counter.num_samples, counter.num_chunks) for counter in self._counters]
+        statistics = list()
+        for idx, (counter, new) in enumerate(zip(self._counters, snapshot)):
+            old = self._snapshot[idx] if idx < len(self._snapshot) else (0, 0, 0)
+            num_chunks = new[2] - old[2]
+            statistics.append(ThreadStatistics(
+                name=self._names[idx] if idx < len(self._names) else str(idx),
+                samples_per_sec=(new[1] - old[1]) / duration,
+                chunks_per_sec=num_chunks / duration,
+                chunk_size=(new[1] - old[1]) / num_chunks if num_chunks else 0.,
+                age_sec=time_now - counter.time_last,
+                is_active=new[0] != old[0]
+            ))
+        self._snapshot = snapshot
+        self._time_snapshot = time_now
+        self._statistics = statistics
+        return all(stats.is_active for stats in statistics)
+
     def _thread_watchdog_heartbeat(self) -> None:
         while self._event.is_set():
             check_alive = all([thread.is_alive() for thread in self._thread[1:]])
             try:
-                with self._lock:
-                    checker = all(self._thread_active)
-                    for i, _ in enumerate(self._thread_active):
-                        self._thread_active[i] = False
+                checker = self._update_statistics()
+                self._logger.debug(f"Thread statistics: {self._statistics}")
                 if check_alive and checker:
                     self._num_missed = 0
                 else:
@@ -207,28 +606,30 @@ class ThreadLSL:
                 if self._num_missed >= 5:
                     self._is_active = False
             except Exception as e:
-                with self._lock:
-                    self._exception.put(e)
+                self._exception.put(e)
             sleep(2.)
 
     def _thread_dummy(self, stime_idx: int) -> None:
         while self._event.is_set():
             try:
-                with self._lock:
-                    self._thread_active[stime_idx] = True
+                self._counters[stime_idx].beat()
                 sleep(0.1)
             except Exception as e:
-                with self._lock:
-                    self._exception.put(e)
+                self._exception.put(e)
 
-    def lsl_stream_mock(self, stim_idx: int, name: str, channel_num: int=2, sampling_rate: float=200.) -> None:
-        """Process for starting a Lab Streaming Layer (LSL) to mock the DAQ hardware with random data
+    def lsl_stream_mock(self, stim_idx: int, name: str, channel_num: int=2, sampling_rate: float=200., waveform: str='sinusoid', chunk_sec: float=0.01) -> None:
+        """Process for starting a Lab Streaming Layer (LSL) to mock the DAQ hardware with generated waveforms,
+        chunks are pushed on a deadline schedule (local_clock) with the nominal timestamp of each sample
         :param stim_idx:        Integer with array index to write into heartbeat feedback array
         :param name:            String with name of the LSL stream (must match with recording process)
         :param channel_num:     Channel number to start stream from
         :param sampling_rate:   Floating value with sampling rate in Hz
+        :param waveform:        String with waveform of the data (see api.mock_waveform.get_waveform_names())
+        :param chunk_sec:       Float with period of pushing one chunk [sec.]
         :return:                None
         """
+        if waveform not in get_waveform_names():
+            raise ValueError(f"Unknown waveform {waveform} - Available: {get_waveform_names()}")
         outlet = self._establish_lsl_outlet(
             idx=stim_idx,
             lsl_name=name,
@@ -238,86 +639,157 @@ class ThreadLSL:
             channel_type=cf_int16
         )[0]
 
-        ite_num = 0
-        chck_num = np.random.randint(low=10, high=int(0.5 * sampling_rate))
+        rng = np.random.default_rng()
+        num_chunk = max(1, int(chunk_sec * sampling_rate))
+        num_max = max(num_chunk, int(sampling_rate))
+        num_sent = 0
+        time_start = local_clock()
         while self._event.is_set():
             try:
+                # Deadline of the next chunk
+                deadline = time_start + (num_sent + num_chunk) / sampling_rate
+                wait = deadline - local_clock()
+                if wait > 0:
+                    sleep(wait)
+                num_due = min(int((local_clock() - time_start) * sampling_rate) - num_sent, num_max)
+                if num_due <= 0:
+                    continue
                 # Heartbeat
-                if ite_num >= chck_num:
-                    ite_num = 0
-                    with self._lock:
-                        self._thread_active[stim_idx] = outlet.have_consumers()
-                else:
-                    ite_num += 1
+                self._counters[stim_idx].count(num_due, outlet.have_consumers())
                 # Process data
-                outlet.push_sample(
-                    x=np.random.randint(low=-2**15, high=2**15, size=channel_num).tolist(),
-                    timestamp=0.0,
-                    pushthrough=True
+                sample_index = np.arange(num_sent, num_sent + num_due)
+                self._push_chunk_numpy(
+                    outlet=outlet,
+                    data=generate_waveform(waveform, sample_index, sampling_rate, channel_num, rng),
+                    timestamps=time_start + sample_index / sampling_rate
                 )
-                sleep(1 / sampling_rate)
+                num_sent += num_due
+                self._latency[stim_idx].add(local_clock() - time_start - (num_sent - 1) / sampling_rate)
             except Exception as e:
-                with self._lock:
-                    self._exception.put(e)
+                self._exception.put(e)
+
+    @staticmethod
+    def _get_numpy_datatype(channel_format: int) -> np.dtype:
+        """Returning the numpy datatype of a numeric LSL channel format (see _get_channel_format())"""
+        datatypes = {cf_int8: np.int8, cf_int16: np.int16, cf_int32: np.int32, cf_int64: np.int64, cf_float32: np.float32, cf_double64: np.float64}
+        if channel_format not in datatypes:
+            raise ValueError(f"Channel format {channel_format} is not supported for pushing numpy arrays")
+        return np.dtype(datatypes[channel_format])
 
-    def lsl_stream_file(self, stim_idx: int, name: str, path2data: str, file_index: int=0, prefix: str= 'data') -> None:
-        """Process for starting a Lab Streaming Layer (LSL) to stream the file content into the DAQ system by mocking the DAQ hardware
+    @staticmethod
+    def _get_channel_format(dtype: np.dtype) -> tuple[int, np.dtype]:
+        """Returning the LSL channel format and the numpy datatype for pushing data of a recorded datatype"""
+        match np.dtype(dtype).kind, np.dtype(dtype).itemsize:
+            case ('i' | 'u', 1):
+                return cf_int8, np.dtype(np.int8)
+            case ('i' | 'u', 2):
+                return cf_int16, np.dtype(np.int16)
+            case ('i' | 'u', 4):
+                return cf_int32, np.dtype(np.int32)
+            case ('i' | 'u', 8):
+                return cf_int64, np.dtype(np.int64)
+            case ('f', 4):
+                return cf_float32, np.dtype(np.float32)
+            case ('f', 8):
+                return cf_double64, np.dtype(np.float64)
+            case _:
+                raise ValueError(f"Datatype {dtype} is not supported for streaming")
+
+    def lsl_stream_file(self, stim_idx: int, name: str, path2data: str, file_index: int=0, prefix: str= 'data', speed: float=1.,
+                        do_loop: bool=True, time_start: float=0., time_end: float | None=None, chunk_sec: float=0.01) -> None:
+        """Process for starting a Lab Streaming Layer (LSL) to stream the file content into the DAQ system by mocking the DAQ hardware,
+        the file is read in blocks and pushed in chunks on a deadline schedule (local_clock)
         :param stim_idx:        Integer with array index to write into heartbeat feedback array
         :param name:            String with name of the LSL stream (must match with recording process)
         :param path2data:       Path to folder with pre-recorded data files
         :param file_index:      Number of the file in the folder to process
         :param prefix:          Prefix of the data file to find
+        :param speed:           Float with replay speed relative to real time (e.g. 10. for 10x, 0. for as fast as possible with the
+                                time of pushing as timestamps)
+        :param do_loop:         If true, the replay is repeated until the threads are stopped, otherwise the thread only signals its
+                                heartbeat after one replay until the threads are stopped
+        :param time_start:      Float with start of the replayed time window relative to the first sample [sec]
+        :param time_end:        Float with end of the replayed time window relative to the first sample [sec] (None for end of file)
+        :param chunk_sec:       Float with period of pushing one chunk in real time [sec.]
         :return:                None
         """
         path0 = Path(path2data)
         if not path0.exists():
             raise AttributeError("File is not available")
-        data: RawRecording = DataAPI(path2data=path0, data_prefix=prefix).read_data_file(file_index)
+        reader = DataAPI(path2data=path0, data_prefix=prefix)
+        info = reader.read_data_info(file_index)
+        channel_type, dtype = self._get_channel_format(info.dtype)
 
         outlet = self._establish_lsl_outlet(
             idx=stim_idx,
             lsl_name=name,
             lsl_type='mock_file_daq',
-            sampling_rate=float(data.sampling_rate),
-            channel_num=int(data.num_channels),
-            channel_type=cf_int16
+            sampling_rate=info.sampling_rate,
+            channel_num=info.num_channels,
+            channel_type=channel_type
         )[0]
 
+        is_paced = speed > 0.
+        time_scale = 1 / speed if is_paced else 1.
+        num_chunk = max(1, int(chunk_sec * info.sampling_rate * (speed if speed > 0. else 1e3)))
+        time_offset = local_clock()
         while self._event.is_set():
             try:
-                for stime, sdata in zip(data.time, data.data.T):
+                time_last = None
+                for stime, sdata in reader.iter_data_file(file_index, max(num_chunk, 2**16), time_start, time_end):
+                    sdata = sdata.astype(dtype, copy=False)
+                    for idx in range(0, stime.size, num_chunk):
+                        if not self._event.is_set():
+                            break
+                        if is_paced:
+                            timestamps = time_offset + (stime[idx:idx + num_chunk] - time_start) * time_scale
+                            wait = timestamps[-1] - local_clock()
+                            if wait > 0:
+                                sleep(wait)
+                        else:
+                            # Unpaced samples are stamped with the push time, spread over the time since the last push
+                            timestamps = np.linspace(time_offset, local_clock(), stime[idx:idx + num_chunk].size + 1)[1:]
+                            time_offset = timestamps[-1]
+                        # Heartbeat
+                        self._counters[stim_idx].count(timestamps.size, outlet.have_consumers())
+                        # Process data
+                        self._push_chunk_numpy(outlet, sdata[idx:idx + num_chunk], timestamps)
+                        self._latency[stim_idx].add(local_clock() - timestamps[-1])
+                        time_last = timestamps[-1]
                     if not self._event.is_set():
                         break
-                    # Heartbeat
-                    with self._lock:
-                        self._thread_active[stim_idx] = outlet.have_consumers()
-                    # Process data
-                    outlet.push_sample(
-                        x=sdata.tolist(),
-                        timestamp=stime,
-                        pushthrough=True
-                    )
-                    sleep(1 / data.sampling_rate)
+                if not do_loop or time_last is None:
+                    break
+                if is_paced:
+                    time_offset = max(time_last + time_scale / info.sampling_rate, local_clock())
             except Exception as e:
-                with self._lock:
-                    self._exception.put(e)
+                self._exception.put(e)
+                return
+        # Heartbeat after a single replay, the stage ends with the other threads
+        while self._event.is_set():
+            self._counters[stim_idx].beat()
+            sleep(0.1)
 
-    def lsl_stream_data(self, stim_idx: int, name: str, daq_func, channel_num: int, sampling_rate: float) -> None:
+    def lsl_stream_data(self, stim_idx: int, name: str, daq_func, channel_num: int, sampling_rate: float, ring_name: str="") -> None:
         """Process for starting a Lab Streaming Layer (LSL) to process the data stream from DAQ system
         :param stim_idx:        Integer with array index to write into heartbeat feedback array
         :param name:            String with name of the LSL stream (must match with recording process)
-        :param daq_func:        Function to get data from DAQ device (returned list)
+        :param daq_func:        Function to get data from DAQ device (returned list, in batch mode also numpy arrays with datatype np.int32 and timestamps)
         :param channel_num:     Channel number to start stream from
         :param sampling_rate:   Floating value with sampling rate in Hz
+        :param ring_name:       String with name of a ring buffer from create_ring() to write the data in addition to LSL (empty to disable),
+                                the stream starts without waiting for LSL consumers
         :return:                None
         """
+        ring = SharedRing.attach(ring_name) if ring_name else None
         outlet = self._establish_lsl_outlet(
             idx=stim_idx,
             lsl_name=name,
             lsl_type='sensor_data',
             sampling_rate=sampling_rate,
             channel_num=channel_num,
-            channel_type=cf_int32
+            channel_type=cf_int32,
+            wait_for_consumers=ring is None
         )[0]
 
         use_batch_mode = 'batch' in daq_func.__name__
@@ -329,16 +801,21 @@ class ThreadLSL:
                     if len(data) != len(tb):
                         continue
                     # Heartbeat
-                    with self._lock:
-                        self._thread_active[stim_idx] = outlet.have_consumers()
-                    outlet.push_chunk(
-                        x=data,
-                        timestamp=tb,
-                        pushthrough=True
-                    )
+                    self._counters[stim_idx].count(len(data), ring is not None or outlet.have_consumers())
+                    if ring is not None and len(data):
+                        ring.write(np.asarray(data, dtype=ring.dtype), np.asarray(tb, dtype=np.float64))
+                    if isinstance(data, np.ndarray):
+                        self._push_chunk_numpy(outlet, data, tb)
+                    else:
+                        outlet.push_chunk(
+                            x=data,
+                            timestamp=tb,
+                            pushthrough=True
+                        )
+                    if len(tb):
+                        self._latency[stim_idx].add(local_clock() - tb[-1])
                 except Exception as e:
-                    with self._lock:
-                        self._exception.put(e)
+                    self._exception.put(e)
         else:
             while self._event.is_set():
                 try:
@@ -347,142 +824,454 @@ class ThreadLSL:
                     if not data or tb is None:
                         continue
                     # Heartbeat
-                    with self._lock:
-                        self._thread_active[stim_idx] = outlet.have_consumers()
+                    self._counters[stim_idx].count(1, ring is not None or outlet.have_consumers())
+                    if ring is not None:
+                        ring.write(np.asarray([data], dtype=ring.dtype), np.asarray([tb], dtype=np.float64))
                     outlet.push_sample(
                         x=data,
                         timestamp=tb,
                         pushthrough=True
                     )
+                    self._latency[stim_idx].add(local_clock() - tb)
                 except Exception as e:
-                    with self._lock:
-                        self._exception.put(e)
+                    self._exception.put(e)
+        if ring is not None:
+            ring.mark_closed()
+            ring.close()
 
-    def lsl_stream_util(self, stim_idx: int, name: str, sampling_rate: float=2.) -> None:
-        """Process for starting a Lab Streaming Layer (LSL) to process the utilization of the host computer
+    def lsl_stream_util(self, stim_idx: int, name: str, sampling_rate: float=2., channels: list[str] | None=None, pid: int=0,
+                        path2disk: Path | str="", sources: dict | None=None) -> None:
+        """Process for starting a Lab Streaming Layer (LSL) to process the utilization of the host computer (see HostTelemetry)
         :param stim_idx:        Integer with array index to write into heartbeat feedback array
         :param name:            String with name of the LSL stream (must match with recording process)
-        :param sampling_rate:   Float with sampling rate for determining the sampling rate
+        :param sampling_rate:   Float with sampling rate for determining the sampling rate (max. 50 Hz)
+        :param channels:        List with names of the telemetry channels (see get_telemetry_names(), None for CPU and RAM of the host)
+        :param pid:             Integer with process ID of the observed process (0 for the process of this stage)
+        :param path2disk:       Path to the recording folder for the written bytes of its disk (channel 'disk_write')
+        :param sources:         Dictionary with name and function without arguments of further channels (e.g. serial backlog),
+                                only for stages in a thread
         :return:                None
         """
-        if sampling_rate > 2.:
-            raise ValueError("Please reduce sampling rate lower than 2.0 Hz")
+        if sampling_rate > 50.:
+            raise ValueError("Please reduce sampling rate lower than 50.0 Hz")
+        telemetry = HostTelemetry(channels, pid, path2disk)
+        sources = sources if sources is not None else dict()
 
         outlet = self._establish_lsl_outlet(
             idx=stim_idx,
             lsl_name=name,
             lsl_type='utilization',
             sampling_rate=sampling_rate,
-            channel_num=2,
-            channel_type=cf_float32
+            channel_num=len(telemetry.channels) + len(sources),
+            channel_type=cf_float32,
+            channel_names=telemetry.channels + list(sources.keys())
         )[0]
 
+        # Sampling on a deadline schedule, the telemetry is averaged over the real time between two samples
+        time_next = perf_counter()
         while self._event.is_set():
             try:
-                with self._lock:
-                    self._thread_active[stim_idx] = outlet.have_consumers()
+                time_next += 1 / sampling_rate
+                wait = time_next - perf_counter()
+                if wait > 0:
+                    sleep(wait)
+                else:
+                    time_next = perf_counter()
+                self._counters[stim_idx].count(1, outlet.have_consumers())
                 outlet.push_sample(
-                    x=[cpu_percent(), virtual_memory().percent],
+                    x=telemetry.update() + [float(func()) for func in sources.values()],
+                    timestamp=0.0,
+                    pushthrough=True
+                )
+            except Exception as e:
+                self._exception.put(e)
+
+    def lsl_stream_metrics(self, stim_idx: int, name: str, metrics_func, channel_names: list[str], sampling_rate: float=10.) -> None:
+        """Process for starting a Lab Streaming Layer (LSL) to publish metrics of the data processing (e.g. counters of the decoder)
+        :param stim_idx:        Integer with array index to write into heartbeat feedback array
+        :param name:            String with name of the LSL stream (must match with recording process)
+        :param metrics_func:    Function returning a list with actual value of each metric
+        :param channel_names:   List with names of the metrics (in the same order as metrics_func)
+        :param sampling_rate:   Float with update rate of the metrics [Hz]
+        :return:                None
+        """
+        outlet = self._establish_lsl_outlet(
+            idx=stim_idx,
+            lsl_name=name,
+            lsl_type='metrics',
+            sampling_rate=sampling_rate,
+            channel_num=len(channel_names),
+            channel_type=cf_double64,
+            channel_names=channel_names
+        )[0]
+
+        while self._event.is_set():
+            try:
+                self._counters[stim_idx].count(1, outlet.have_consumers())
+                outlet.push_sample(
+                    x=metrics_func(),
                     timestamp=0.0,
                     pushthrough=True
                 )
                 sleep(1 / sampling_rate)
             except Exception as e:
-                with self._lock:
-                    self._exception.put(e)
+                self._exception.put(e)
+
+    @staticmethod
+    def _get_h5_format(data_format: int) -> str:
+        """Returning the numpy datatype of a LSL channel format for recording"""
+        match data_format:
+            case 1: #cf_float32
+                return "float32"
+            case 2: #cf_double64
+                return "float64"
+            case 4:  # cf_int32
+                return "int32"
+            case 5:  # cf_int16
+                return "int16"
+            case 6:  # cf_int8
+                return "int8"
+            case 7:  # cf_int64
+                return "int64"
+            case _:
+                raise ValueError(f"Unsupported LSL datatype format {data_format} for recording")
+
+    @staticmethod
+    def _write_manifest(path2file: Path, manifest: dict) -> None:
+        """Writing the manifest of a segmented recording atomically (a crash leaves the previous version)"""
+        path2temp = path2file.with_suffix(".tmp")
+        with open(path2temp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path2temp, path2file)
+
+    def _open_record_source(self, name: str, ring_name: str="") -> tuple[object, dict]:
+        """Opening the source of a recorded stream (LSL inlet or reader of a ring buffer)
+        :return:    Tuple with source (pull_chunk() like StreamInlet) and dictionary with meta information of the recording
+        """
+        if ring_name:
+            source = SharedRingReader(SharedRing.attach(ring_name), from_start=True)
+            attrs = {
+                "sampling_rate": source.ring.sampling_rate,
+                "channel_count": source.ring.num_channels,
+                "type": source.ring.stream_type,
+                "creation_date": datetime.today().strftime('%Y-%m-%d'),
+                "data_format": source.ring.channel_format
+            }
+        else:
+            source = self._establish_lsl_inlet(name)
+            # Extract meta
+            attrs = {
+                "sampling_rate": source.info().nominal_srate(),
+                "channel_count": source.info().channel_count(),
+                "type": source.info().type(),
+                "creation_date": datetime.today().strftime('%Y-%m-%d'),
+                "data_format": source.info().channel_format()
+            }
+            channel_names = self._get_channel_names(source.info())
+            if channel_names:
+                attrs["channel_names"] = channel_names
+        return source, attrs
 
-    def lsl_record_stream(self, stim_idx: int, name: str, path2save: Path | str) -> None:
-        """Function for recording and saving the data pushed on LSL stream
+    @staticmethod
+    def _create_recording(group: File | Group, attrs: dict, num_channels: int, dtype: np.dtype, chunk_size: int, flush_sec: float,
+                          compression: str, on_write, use_gaps: bool, thread: H5WriteThread | None=None,
+                          decimation: tuple[int, ...]=()) -> tuple[BufferedH5Writer, object]:
+        """Writing the meta information and creating the datasets and writer of a recorded stream in a HDF5 file or group
+        :return:    Tuple with class BufferedH5Writer and dataset 'gaps' (None if use_gaps is False)
+        """
+        for key, value in attrs.items():
+            group.attrs[key] = value
+        writer = BufferedH5Writer(file=group, num_channels=num_channels, dtype=dtype, chunk_size=chunk_size, flush_sec=flush_sec,
+                                  on_write=on_write, compression=compression, thread=thread, decimation=decimation)
+        writer.time.attrs["unit"] = "s"
+        writer.data.attrs["unit"] = ""
+        gap_dset = None
+        if use_gaps:
+            gap_dset = group.create_dataset("gaps", (0, 3), maxshape=(None, 3), dtype=float)
+            gap_dset.attrs["columns"] = ["sample", "time", "delta"]
+            gap_dset.attrs["num_lost"] = 0
+        return writer, gap_dset
+
+    @staticmethod
+    def _append_gaps(gap_dset, index: np.ndarray, timestamps: np.ndarray, offset: int, last_index: int) -> int:
+        """Appending the gaps of an 8-bit sequence counter to the dataset 'gaps'
+        :param gap_dset:    Dataset 'gaps' with columns sample, time and delta
+        :param index:       Numpy array with sequence counter of each sample
+        :param timestamps:  Numpy array with timestamp of each sample
+        :param offset:      Integer with sample index of the first sample in the recording
+        :param last_index:  Integer with last sequence counter of the previous chunk (-1 for the first chunk)
+        :return:            Integer with last sequence counter of this chunk
+        """
+        deltas = get_sequence_deltas(index, last_index)
+        pos = np.flatnonzero(deltas != 1)
+        if pos.size:
+            gaps = np.stack([offset + pos, timestamps[pos], deltas[pos]], axis=1)
+            num = len(gap_dset)
+            gap_dset.resize((num + pos.size, 3))
+            gap_dset[num:, :] = gaps
+            gap_dset.attrs["num_lost"] += classify_sequence_deltas(deltas[pos])[0]
+        return int(index[-1])
+
+    def _open_recording(self, path2file: Path, attrs: dict, num_channels: int, dtype: np.dtype, chunk_size: int, flush_sec: float,
+                        compression: str, on_write, use_gaps: bool, backend: str="h5",
+                        decimation: tuple[int, ...]=()) -> tuple[File | None, BufferedH5Writer | RawLogWriter, object]:
+        """Creating a recording file with meta information, datasets and writer
+        :return:    Tuple with class h5py.File (None for a raw log), class BufferedH5Writer or RawLogWriter and dataset 'gaps'
+                    (None if use_gaps is False or for a raw log)
+        """
+        if backend == "raw":
+            writer = RawLogWriter(path2file, num_channels=num_channels, dtype=dtype, attrs=attrs, capacity=max(16 * chunk_size, 2**12),
+                                  sync_sec=flush_sec, on_write=on_write)
+            return None, writer, None
+        f = File(path2file, "w")
+        writer, gap_dset = self._create_recording(f, attrs, num_channels, dtype, chunk_size, flush_sec, compression, on_write, use_gaps,
+                                                  decimation=decimation)
+        f.flush()
+        return f, writer, gap_dset
+
+    def lsl_record_stream(self, stim_idx: int, name: str, path2save: Path | str, seq_channel: int=-1, ring_name: str="",
+                          chunk_size: int=0, flush_sec: float=1., compression: str="", segment_sec: float=0., segment_mb: float=0.,
+                          backend: str="h5", decimation: tuple[int, ...]=(), time_start: str="") -> None:
+        """Function for recording and saving the data pushed on LSL stream (write-behind in blocks, see BufferedH5Writer)
         :param stim_idx:            Integer with array index to write into heartbeat feedback array
         :param name:                String with name of the LSL stream in order to catch it
         :param path2save:           Path to save the data (if it is a string, it will be auto-converted)
+        :param seq_channel:         Integer with channel of an 8-bit sequence counter, gaps are marked in dataset 'gaps' (-1 to disable)
+        :param ring_name:           String with name of a ring buffer from create_ring() to read the stream from shared memory instead of LSL
+                                    (empty to disable), overwritten samples are stored in the file attribute 'num_overrun'
+        :param chunk_size:          Integer with number of samples of one HDF5 chunk and of one written block (0 for about 0.25 sec. of the stream)
+        :param flush_sec:           Float with maximum time until received samples are written and the file is flushed [sec.]
+        :param compression:         String with codec of the datasets (e.g. 'lzf', see get_compression_names(), empty to disable), the compression
+                                    runs in the writer thread and the timestamps are delta-encoded (read them with DataAPI or read_time())
+        :param segment_sec:         Float with duration after which the recording continues in a new segment file [sec.] (0 to disable)
+        :param segment_mb:          Float with file size after which the recording continues in a new segment file [MB] (0 to disable),
+                                    segments are saved as <time>_<name>_<number>.h5 (.rlog) and listed in <time>_<name>_manifest.json
+                                    (sample 'gaps' are counted within each segment)
+        :param backend:             String with file format: 'h5' for HDF5 or 'raw' for an append-only raw log <time>_<name>.rlog with lowest
+                                    overhead (see RawLogWriter, without compression and gap detection, convert it with convert_raw_log())
+        :param decimation:          Tuple with number of samples of one bin of each min/max/mean level which are stored in the group 'pyramid'
+                                    for overview plots (e.g. (16, 256, 4096), see DecimationPyramid and DataAPI.read_data_overview(), empty to disable)
+        :param time_start:          String with date and time of the file names (<date>_<time>, empty for the time of starting the recording)
         :return: None
         """
+        if backend not in ("h5", "raw"):
+            raise ValueError(f"Unknown recording backend {backend} - Available: ['h5', 'raw']")
+        if backend == "raw" and compression:
+            raise ValueError("Raw logs are not compressed, use convert_raw_log() with compression")
+        if backend == "raw" and decimation:
+            raise ValueError("Raw logs have no decimation levels, use convert_raw_log() with decimation")
         path = Path(path2save) if type(path2save) == str else path2save
-        inlet = self._establish_lsl_inlet(name)
-        # Extract meta
-        channels = inlet.info().channel_count()
-        sampling_rate = inlet.info().nominal_srate()
-        sys_type = inlet.info().type()
-        data_format = inlet.info().channel_format()
-        time = datetime.today().strftime('%Y%m%d_%H%M%S')
+        source, attrs = self._open_record_source(name, ring_name)
+        channels, sampling_rate, sys_type, data_format = attrs["channel_count"], attrs["sampling_rate"], attrs["type"], attrs["data_format"]
+        time = time_start if time_start else datetime.today().strftime('%Y%m%d_%H%M%S')
+
+        if not path.is_dir():
+            path.mkdir(parents=True, exist_ok=True)
+        if backend == "raw":
+            attrs["seq_channel"] = seq_channel
+        dtype = np.dtype(self._get_h5_format(data_format))
+        suffix = ".rlog" if backend == "raw" else ".h5"
+        is_segmented = segment_sec > 0. or segment_mb > 0.
+        manifest = {"name": name, "sampling_rate": float(sampling_rate), "channel_count": int(channels), "type": sys_type,
+                    "data_format": int(data_format), "segment_sec": segment_sec, "segment_mb": segment_mb, "is_complete": False, "segments": []}
+        path2manifest = path.absolute() / f"{time}_{name}_manifest.json"
+
+        def open_segment() -> tuple[File | None, BufferedH5Writer | RawLogWriter, object]:
+            file_name = f"{time}_{name}_{len(manifest['segments']):03d}{suffix}" if is_segmented else f"{time}_{name}{suffix}"
+            segment = self._open_recording(
+                path2file=path.absolute() / file_name,
+                attrs=attrs,
+                num_channels=channels,
+                dtype=dtype,
+                chunk_size=chunk_size if chunk_size > 0 else get_chunk_size(sampling_rate),
+                flush_sec=flush_sec,
+                compression=compression,
+                on_write=lambda time_last: self._latency[stim_idx].add(local_clock() - time_last),
+                use_gaps=seq_channel >= 0,
+                backend=backend,
+                decimation=decimation
+            )
+            if is_segmented:
+                sample_start = sum(entry["num_samples"] for entry in manifest["segments"])
+                manifest["segments"].append({"file": file_name, "sample_start": sample_start, "num_samples": 0,
+                                             "time_start": None, "time_end": None, "is_closed": False})
+                self._write_manifest(path2manifest, manifest)
+            return segment
+
+        def close_segment(writer: BufferedH5Writer | RawLogWriter, time_range: list) -> None:
+            try:
+                writer.close()
+            finally:
+                if is_segmented:
+                    manifest["segments"][-1].update(num_samples=writer.num_written, time_start=time_range[0], time_end=time_range[1], is_closed=True)
+                    self._write_manifest(path2manifest, manifest)
+
+        f, writer, gap_dset = open_segment()
+        time_range = [None, None]
+        time_segment = perf_counter()
+        last_index = -1
+        max_samples = int(sampling_rate / 50) if sampling_rate > 500. else 10
+        while self._event.is_set():
+            try:
+                data_buf, ts_buf = source.pull_chunk(
+                    max_samples=max_samples,
+                    timeout=10e-3
+                )
+                if not len(ts_buf):
+                    writer.poll()
+                    continue
+                else:
+                    # Switching between two chunks, the samples of this chunk are the first of the new segment
+                    if writer.num_samples and ((segment_sec > 0. and perf_counter() - time_segment >= segment_sec) or
+                                               (segment_mb > 0. and (writer.num_bytes if f is None else os.path.getsize(f.filename)) >= segment_mb * 2**20)):
+                        try:
+                            close_segment(writer, time_range)
+                        finally:
+                            if f is not None:
+                                f.close()
+                            f, writer, gap_dset = open_segment()
+                            time_range = [None, None]
+                            time_segment = perf_counter()
+                    self._counters[stim_idx].count(len(ts_buf))
+                    idx = writer.num_samples
+                    data_buf = np.asarray(data_buf)
+                    ts_buf = np.asarray(ts_buf)
+                    writer.append(data_buf, ts_buf)
+                    time_range = [float(ts_buf[0]) if time_range[0] is None else time_range[0], float(ts_buf[-1])]
+                    if gap_dset is not None:
+                        last_index = self._append_gaps(gap_dset, data_buf[:, seq_channel], ts_buf, idx, last_index)
+            except Exception as e:
+                self._exception.put(e)
+        if ring_name:
+            (writer.attrs if f is None else f.attrs)["num_overrun"] = source.num_overrun
+            manifest["num_overrun"] = source.num_overrun
+            if source.num_overrun:
+                self._logger.warning(f"Recording of {name} has lost {source.num_overrun} samples due to overrun of the ring buffer")
+            source.ring.close()
+        try:
+            close_segment(writer, time_range)
+        except Exception as e:
+            self._exception.put(e)
+        if f is not None:
+            f.close()
+        if is_segmented:
+            manifest["is_complete"] = True
+            self._write_manifest(path2manifest, manifest)
+
+    def lsl_record_streams(self, stim_idx: int, name: str, path2save: Path | str, seq_channel: int=-1, ring_name: str="",
+                           chunk_size: int=0, flush_sec: float=1., compression: str="", streams: tuple[str, ...]=(),
+                           decimation: tuple[int, ...]=(), time_start: str="") -> None:
+        """Function for recording several streams into one HDF5 file <time>_<name>.h5 with one group per stream (datasets and
+        meta information like lsl_record_stream()), all groups are written by one writer thread which flushes the file for
+        all streams together (see H5WriteThread)
+        :param stim_idx:            Integer with array index to write into heartbeat feedback array
+        :param name:                String with name of the first stream (e.g. the DAQ data), only its samples are counted in the statistics
+        :param path2save:           Path to save the data (if it is a string, it will be auto-converted)
+        :param seq_channel:         Integer with channel of an 8-bit sequence counter of the first stream, gaps are marked in its dataset 'gaps' (-1 to disable)
+        :param ring_name:           String with name of a ring buffer from create_ring() to read the first stream from shared memory instead of LSL
+                                    (empty to disable), overwritten samples are stored in the group attribute 'num_overrun'
+        :param chunk_size:          Integer with number of samples of one HDF5 chunk and of one written block (0 for about 0.25 sec. of each stream)
+        :param flush_sec:           Float with maximum time until received samples are written and the file is flushed [sec.]
+        :param compression:         String with codec of the datasets (e.g. 'lzf', see get_compression_names(), empty to disable)
+        :param streams:             Tuple with names of the further LSL streams (e.g. 'util' and 'metrics')
+        :param decimation:          Tuple with number of samples of one bin of each min/max/mean level of the first stream (empty to disable)
+        :param time_start:          String with date and time of the file name (<date>_<time>, empty for the time of starting the recording)
+        :return: None
+        """
+        path = Path(path2save) if type(path2save) == str else path2save
+        names = [name, *streams]
+        sources = [self._open_record_source(stream, ring_name if idx == 0 else "") for idx, stream in enumerate(names)]
+        time = time_start if time_start else datetime.today().strftime('%Y%m%d_%H%M%S')
 
         if not path.is_dir():
             path.mkdir(parents=True, exist_ok=True)
         with File(path.absolute() / f"{time}_{name}.h5", "w") as f:
-            f.attrs["sampling_rate"] = sampling_rate
-            f.attrs["channel_count"] = channels
-            f.attrs["type"] = sys_type
+            f.attrs["streams"] = names
             f.attrs["creation_date"] = datetime.today().strftime('%Y-%m-%d')
-            f.attrs["data_format"] = data_format
-            ts_dset = f.create_dataset("time", (0,), maxshape=(None,), dtype=float)
-            ts_dset.attrs["unit"] = "s"
-            match data_format:
-                case 1: #cf_float32
-                    format_h5 = "float32"
-                case 2: #cf_double64
-                    format_h5 = "float64"
-                case 3: #cf_string
-                    format_h5 = "string"
-                case 4:  # cf_int32
-                    format_h5 = "int32"
-                case 5:  # cf_int16
-                    format_h5 = "uint16"
-                case 6:  # cf_int8
-                    format_h5 = "uint8"
-                case 7:  # cf_int64
-                    format_h5 = "int64"
-                case _:
-                    raise ValueError(f"Unknown LSL datatype format")
-            data_dset = f.create_dataset("data", (0, channels), maxshape=(None, channels), dtype=format_h5)
-            ts_dset.attrs["unit"] = ""
+            thread = H5WriteThread(f, flush_sec)
+            writers = list()
+            gap_dsets = list()
+            max_samples = list()
+            for idx, (stream, (_, attrs)) in enumerate(zip(names, sources)):
+                sampling_rate = attrs["sampling_rate"]
+                writer, gap_dset = self._create_recording(
+                    group=f.create_group(stream),
+                    attrs=attrs,
+                    num_channels=attrs["channel_count"],
+                    dtype=np.dtype(self._get_h5_format(attrs["data_format"])),
+                    chunk_size=chunk_size if chunk_size > 0 else get_chunk_size(sampling_rate),
+                    flush_sec=flush_sec,
+                    compression=compression,
+                    on_write=(lambda time_last: self._latency[stim_idx].add(local_clock() - time_last)) if idx == 0 else None,
+                    use_gaps=idx == 0 and seq_channel >= 0,
+                    thread=thread,
+                    decimation=decimation if idx == 0 else ()
+                )
+                writers.append(writer)
+                gap_dsets.append(gap_dset)
+                max_samples.append(int(sampling_rate / 50) if sampling_rate > 500. else 10)
             f.flush()
 
-            process_list = [i for i in range(channels)]
-            cnt_flush = 0
-            max_samples = int(sampling_rate / 50) if sampling_rate > 500. else 10
+            last_index = -1
             while self._event.is_set():
                 try:
-                    data_buf, ts_buf = inlet.pull_chunk(
-                        max_samples=max_samples,
-                        timeout=10e-3
-                    )
-                    if not data_buf:
-                        continue
-                    else:
-                        with self._lock:
-                            self._thread_active[stim_idx] = True
-                        idx = len(ts_dset)
-                        new = len(ts_buf)
-                        ts_dset.resize((idx + new,))
-                        data_dset.resize((idx + new, channels))
-                        ts_dset[idx:idx + new] = ts_buf
-                        data_dset[idx:idx + new, :] = np.asarray(data_buf)[:, process_list]
-                        if cnt_flush == 3:
-                            f.flush()
-                            cnt_flush = 0
-                        else:
-                            cnt_flush += 1
+                    num_first = 0
+                    is_received = False
+                    # The first stream paces the loop, the further streams are polled without waiting
+                    for idx, (source, _) in enumerate(sources):
+                        data_buf, ts_buf = source.pull_chunk(max_samples=max_samples[idx], timeout=10e-3 if idx == 0 else 0.)
+                        if not len(ts_buf):
+                            writers[idx].poll()
+                            continue
+                        is_received = True
+                        data_buf = np.asarray(data_buf)
+                        ts_buf = np.asarray(ts_buf)
+                        if idx == 0:
+                            num_first = len(ts_buf)
+                            if gap_dsets[0] is not None:
+                                last_index = self._append_gaps(gap_dsets[0], data_buf[:, seq_channel], ts_buf, writers[0].num_samples, last_index)
+                        writers[idx].append(data_buf, ts_buf)
+                    if is_received:
+                        self._counters[stim_idx].count(num_first)
                 except Exception as e:
                     self._exception.put(e)
-            f.close()
+            for writer in writers:
+                try:
+                    writer.close()
+                except Exception as e:
+                    self._exception.put(e)
+            thread.close()
+            if ring_name:
+                source = sources[0][0]
+                f[name].attrs["num_overrun"] = source.num_overrun
+                if source.num_overrun:
+                    self._logger.warning(f"Recording of {name} has lost {source.num_overrun} samples due to overrun of the ring buffer")
+                source.ring.close()
 
     def lsl_plot_stream(
-            self, stim_idx: int, name: str, window_length: float = 10., update_rate: float = 12.
+            self, stim_idx: int, name: str, window_length: float = 10., update_rate: float = 12., ring_name: str = "",
+            pull_idx: int = -1
     ) -> None:
         """Function for LSL to enable live plotting of the incoming results using VisPy
         :param stim_idx:        Integer with array index to write into heartbeat feedback array
         :param name:            String with name of the LSL stream to get data
         :param window_length:   Floating value with length of time window for plotting in seconds
         :param update_rate:     Floating value with update rate of the LSL datastream
+        :param ring_name:       String with name of a ring buffer from create_ring() to read the stream from shared memory instead of LSL (empty to disable)
+        :param pull_idx:        Integer with array index of the thread pulling the data into the plot (see register_subthread(), -1 to disable)
         :return:                None
         """
         line_color = ['red', 'green', 'blue', 'lime']
         mode_util = 'util' in name
-        inlet = self._establish_lsl_inlet(name)
-        # --- Extract meta
-        channels = inlet.info().channel_count()
-        sampling_rate = inlet.info().nominal_srate()
+        if ring_name:
+            source = SharedRingReader(SharedRing.attach(ring_name))
+            channels = source.ring.num_channels
+            sampling_rate = source.ring.sampling_rate
+        else:
+            source = self._establish_lsl_inlet(name)
+            # --- Extract meta
+            channels = source.info().channel_count()
+            sampling_rate = source.info().nominal_srate()
         if sampling_rate > 4500.:
             raise AttributeError(f"Sampling rate {sampling_rate} is too high")
         # --- Build ring buffer and update func
@@ -528,46 +1317,50 @@ class ThreadLSL:
             font_size=8
         )
 
+        time_newest, time_rendered = 0., 0.
+
         def update_plot_data():
-            nonlocal buffer_lsl
+            nonlocal buffer_lsl, time_newest
             while self._event.is_set():
                 try:
-                    samples, _ = inlet.pull_chunk(
+                    samples, timestamps = source.pull_chunk(
                         max_samples=max_samples,
                         timeout=10e-3
                     )
-                    if not samples:
+                    if not len(samples):
                         continue
                     else:
-                        with self._lock:
-                            self._thread_active[stim_idx+1] = True
                         for sample in samples:
                             for ch, value in enumerate(sample):
                                 buffer_lsl[ch].append(value)
+                        time_newest = timestamps[-1]
+                        if pull_idx >= 0:
+                            self._counters[pull_idx].count(len(samples))
+                            self._latency[pull_idx].add(local_clock() - time_newest)
                 except Exception as e:
-                    with self._lock:
-                        self._exception.put(e)
+                    self._exception.put(e)
 
         def update_plot_canvas(events):
-            nonlocal buffer_gpu
-            if not self._event.is_set():
-                app.quit()
-            if not self._is_active:
+            nonlocal buffer_gpu, time_rendered
+            if not self._event.is_set() or not thread_pull.is_alive():
                 status_text.text = "LSL: DEAD"
                 status_text.color = 'red'
+            if not self._event.is_set():
+                app.quit()
             buffer_gpu = buffer_lsl
             for curve, buffer0 in zip(curves, buffer_gpu):
                 curve.set_data(buffer0.get_data())
+            if time_newest > time_rendered:
+                time_rendered = time_newest
+                self._latency[stim_idx].add(local_clock() - time_rendered)
 
         def update_on_fps(fps):
-            with self._lock:
-                self._thread_active[stim_idx] = fps > 0
+            self._counters[stim_idx].beat(fps > 0)
             fps_text.text = f"FPS: {fps:.1f}"
 
         # --- Starting the process
-        self.register(func=update_plot_data, args=())
-        self._thread_active.extend([0])
-        self._thread[-1].start()
+        thread_pull = Thread(target=update_plot_data, args=(), daemon=True)
+        thread_pull.start()
         canvas.measure_fps(callback=update_on_fps)
         app.Timer(
             interval=1/update_rate,
@@ -575,3 +1368,4 @@ class ThreadLSL:
             start=True
         )
         app.run()
+        thread_pull.join(timeout=1.)
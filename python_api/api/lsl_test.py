@@ -1,14 +1,23 @@
+import json
+import h5py
 import pytest
 import numpy as np
 from pathlib import Path
 from shutil import rmtree
+from threading import Event, Thread
 from time import sleep
 
-from api import get_path_to_project
+from pylsl import StreamInfo, StreamInlet, StreamOutlet, cf_int32, local_clock, resolve_byprop
+from api import DataAPI, get_path_to_project
 from api.lsl import (
+    LatencyHistogram,
     RingBuffer,
+    ThreadCounter,
     ThreadLSL
 )
+from api.host_telemetry import get_telemetry_names
+from api.mock_waveform import check_counter
+from api.raw_log import convert_raw_log, read_raw_log
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -39,6 +48,30 @@ def test_ringbuffer_with_timestamp():
         dut.append_with_timestamp(idx, idx+1)
 
 
+def test_push_chunk_numpy():
+    outlet = StreamOutlet(StreamInfo('push_numpy', 'sensor_data', 3, 1000., cf_int32, 'push_numpy'))
+    inlet = StreamInlet(resolve_byprop('name', 'push_numpy', timeout=5.)[0])
+    inlet.open_stream(timeout=5.)
+    sleep(0.5)
+
+    data = np.arange(300, dtype=np.int32).reshape(100, 3)
+    timestamps = 10. + 1e-3 * np.arange(100)
+    ThreadLSL._push_chunk_numpy(outlet, data, timestamps)
+    ThreadLSL._push_chunk_numpy(outlet, data[:0], timestamps[:0])
+    with pytest.raises(ValueError):
+        ThreadLSL._push_chunk_numpy(outlet, data, timestamps[:-1])
+    with pytest.raises(ValueError):
+        ThreadLSL._push_chunk_numpy(outlet, np.zeros((100, 4), dtype=np.int32), timestamps)
+    ThreadLSL._push_chunk_numpy(outlet, data.astype(np.int16), timestamps + 0.1)
+
+    rslt, tb = inlet.pull_chunk(timeout=2., max_samples=200)
+    if len(tb) < 200:
+        rslt_next, tb_next = inlet.pull_chunk(timeout=2., max_samples=200 - len(tb))
+        rslt, tb = rslt + rslt_next, tb + tb_next
+    np.testing.assert_array_equal(rslt, np.concatenate([data, data]))
+    np.testing.assert_allclose(np.array(tb) + inlet.time_correction(), np.concatenate([timestamps, timestamps + 0.1]), atol=1e-3)
+
+
 def test_thread_init():
     dut = ThreadLSL()
     assert dut.is_alive == False
@@ -57,10 +90,11 @@ def test_thread_register_and_start():
 
     assert dut.is_running == False
     dut.start()
+    assert isinstance(dut._event, Event)
     for ite in range(10):
         sleep(0.5)
         assert dut.is_running == True
-        print(ite, dut._is_active, dut._thread_active)
+        print(ite, dut._is_active, dut.statistics)
         dut.check_exception()
     dut.stop()
     assert dut.is_running == False
@@ -82,7 +116,7 @@ def test_thread_register_and_abort():
         for ite in range(10):
             sleep(0.5)
             dut.check_exception()
-            print(ite, dut._is_active, dut._thread_active)
+            print(ite, dut._is_active, dut.statistics)
             if ite > 5:
                 dut.stop()
                 while dut._is_active:
@@ -108,12 +142,258 @@ def test_thread_register_and_start_multiple():
     for ite in range(10):
         sleep(0.5)
         assert dut.is_running == True
-        print(ite, dut._is_active, dut._thread_active)
+        print(ite, dut._is_active, dut.statistics)
         dut.check_exception()
     dut.stop()
     assert dut.is_running == False
 
 
+def run_with_subthread(dut: ThreadLSL, stim_idx: int, sub_idx: int) -> None:
+    sub = Thread(target=dut._thread_dummy, args=(sub_idx, ))
+    sub.start()
+    dut._thread_dummy(stim_idx)
+    sub.join()
+
+
+def test_thread_register_subthread():
+    dut = ThreadLSL()
+    sub_idx = dut.register_subthread('dummy_sub')
+    dut.register(func=run_with_subthread, args=(dut, sub_idx + 1, sub_idx))
+    dut.register(func=dut._thread_dummy, args=(2, ))
+    dut.start()
+    sleep(2.5)
+    stats = dut.statistics
+    dut.stop()
+    assert [val.name for val in stats] == ['dummy_sub', 'run_with_subthread', '_thread_dummy']
+    assert all(val.is_active for val in stats)
+
+
+def test_latency_histogram():
+    dut = LatencyHistogram()
+    assert np.isnan(dut.get_percentile(50.))
+    dut.add(np.full(99, 1e-3))
+    dut.add(0.5)
+    stats = dut.get_statistics('stage')
+    assert stats.num_chunks == 100
+    assert stats.mean_sec == pytest.approx(0.99e-3 + 5e-3)
+    assert stats.p50_sec == pytest.approx(1e-3, rel=0.26)
+    assert stats.p99_sec == pytest.approx(1e-3, rel=0.26)
+    assert stats.max_sec == 0.5
+    assert dut.get_percentile(100.) == 0.5
+    assert dut.counts.sum() == 100
+    assert dut.counts.size == LatencyHistogram.get_edges().size + 1
+
+
+def test_thread_counter():
+    dut = ThreadCounter()
+    dut.count(10)
+    dut.count(0)
+    dut.count(5, is_active=False)
+    assert (dut.num_beats, dut.num_samples, dut.num_chunks) == (2, 15, 2)
+
+
+def test_thread_statistics():
+    dut = ThreadLSL()
+    path2data = get_path_to_project("temp_data")
+    dut.register(func=dut.lsl_stream_mock, args=(0, 'mock_stats', 2, 1000.))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'mock_stats', path2data))
+    dut.start()
+    dut.wait_for_seconds(5.)
+    stats = dut.statistics
+    dut.stop()
+
+    assert [val.name for val in stats] == ['lsl_stream_mock(mock_stats)', 'lsl_record_stream(mock_stats)']
+    for val in stats:
+        assert val.is_active
+        assert val.samples_per_sec == pytest.approx(1000., rel=0.1)
+        assert val.chunk_size > 1
+        assert val.age_sec < 1.
+
+
+def test_process_stages(tmp_path: Path):
+    dut = ThreadLSL()
+    dut.register(func=dut.lsl_stream_mock, args=(0, 'mock_proc', 2, 1000., 'ramp'))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'mock_proc', tmp_path), use_process=True)
+    dut.start()
+    assert not isinstance(dut._event, Event)
+    dut.wait_for_seconds(5.)
+    stats = dut.statistics
+    dut.check_exception()
+    dut.stop()
+
+    assert stats[1].name == 'lsl_record_stream(mock_proc)'
+    assert stats[1].is_active
+    assert stats[1].samples_per_sec == pytest.approx(1000., rel=0.1)
+    files = list(tmp_path.glob("*_mock_proc.h5"))
+    assert len(files) == 1
+    with h5py.File(files[0], "r") as f:
+        assert f["data"].shape[0] > 3000
+        assert f["data"].dtype == np.int16
+        assert f["data"][:].min() < -2**14
+        assert f["time"].shape[0] == f["data"].shape[0]
+
+
+class CounterBatch:
+    def __init__(self, sampling_rate: float) -> None:
+        self.sampling_rate = sampling_rate
+        self.index = 0
+        self.time_start = local_clock()
+
+    def read_batch(self) -> tuple[np.ndarray, np.ndarray]:
+        sleep(0.01)
+        num = int((local_clock() - self.time_start) * self.sampling_rate) - self.index
+        index = np.arange(self.index, self.index + num)
+        self.index += num
+        return np.stack([index % 256, index, -index], axis=1).astype(np.int32), self.time_start + index / self.sampling_rate
+
+
+@pytest.mark.parametrize("use_process", [False, True])
+def test_ring_fanout(tmp_path: Path, use_process: bool):
+    dut = ThreadLSL()
+    daq = CounterBatch(2000.)
+    ring_name = dut.create_ring('ring_data', 3, 2000.)
+    dut.register(func=dut.lsl_stream_data, args=(0, 'ring_data', daq.read_batch, 3, 2000., ring_name))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'ring_data', tmp_path, 0, ring_name), use_process=use_process)
+    dut.start()
+    external = pull_stream('ring_data', 2.)[0]
+    dut.wait_for_seconds(2.)
+    stats = dut.statistics
+    latency = dut.latency
+    dut.check_exception()
+    dut.stop(tmp_path / "latency.json")
+
+    assert external.shape[1] == 3
+    assert stats[0].is_active
+    assert stats[1].samples_per_sec == pytest.approx(2000., rel=0.1)
+    files = list(tmp_path.glob("*_ring_data.h5"))
+    assert len(files) == 1
+    with h5py.File(files[0], "r") as f:
+        data = f["data"][:]
+        assert f.attrs["num_overrun"] == 0
+        assert f.attrs["sampling_rate"] == 2000.
+        assert f.attrs["type"] == "sensor_data"
+        assert f["gaps"].shape[0] == 0
+    assert data.shape[0] > 6000
+    np.testing.assert_array_equal(data[:, 1], np.arange(data.shape[0]))
+    assert [val.name for val in latency] == ['lsl_stream_data(ring_data)', 'lsl_record_stream(ring_data)']
+    assert all(val.num_chunks > 0 and val.p99_sec < 0.5 for val in latency)
+    with open(tmp_path / "latency.json") as f:
+        report = json.load(f)
+    assert len(report["stages"]) == 2
+    assert sum(report["stages"][1]["counts"]) == report["stages"][1]["num_chunks"] > 0
+
+
+def test_ring_record_compressed(tmp_path: Path):
+    dut = ThreadLSL()
+    daq = CounterBatch(2000.)
+    ring_name = dut.create_ring('ring_comp', 3, 2000.)
+    dut.register(func=dut.lsl_stream_data, args=(0, 'ring_comp', daq.read_batch, 3, 2000., ring_name))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'ring_comp', tmp_path), kwargs=dict(seq_channel=0, ring_name=ring_name, compression='lzf'))
+    dut.start()
+    dut.wait_for_seconds(2.)
+    dut.check_exception()
+    dut.stop()
+
+    with h5py.File(next(tmp_path.glob("*_ring_comp.h5")), "r") as f:
+        assert f["data"].compression == 'lzf'
+        assert f["time"].attrs["encoding"] == "delta"
+    rslt = DataAPI(tmp_path, data_prefix='ring_comp').read_data_file(0)
+    assert rslt.time.size > 3000
+    np.testing.assert_array_equal(rslt.data[1], np.arange(rslt.time.size))
+    np.testing.assert_allclose(rslt.time, np.arange(rslt.time.size) / 2000., atol=1e-9)
+
+
+def test_ring_record_decimation(tmp_path: Path):
+    dut = ThreadLSL()
+    daq = CounterBatch(2000.)
+    ring_name = dut.create_ring('ring_dec', 3, 2000.)
+    dut.register(func=dut.lsl_stream_data, args=(0, 'ring_dec', daq.read_batch, 3, 2000., ring_name))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'ring_dec', tmp_path),
+                 kwargs=dict(seq_channel=0, ring_name=ring_name, flush_sec=0.1, compression='lzf', segment_sec=0.5, decimation=(16, 256)))
+    dut.start()
+    dut.wait_for_seconds(2.5)
+    dut.check_exception()
+    dut.stop()
+
+    reader = DataAPI(tmp_path, data_prefix='ring_dec')
+    num = reader.read_data_info(0).num_samples
+    rslt = reader.read_data_overview(0, num_points=10)
+    assert rslt.factor >= 256
+    assert rslt.time.size <= 10
+    assert rslt.min[1, 0] == 0 and rslt.max[1, -1] == num - 1
+    assert np.all(np.diff(rslt.min[1]) > 0) and np.all(np.diff(rslt.min[1]) <= rslt.factor)
+
+
+@pytest.mark.parametrize("segment_sec, segment_mb", [(0.5, 0.), (0., 0.02)])
+def test_ring_record_segments(tmp_path: Path, segment_sec: float, segment_mb: float):
+    dut = ThreadLSL()
+    daq = CounterBatch(2000.)
+    ring_name = dut.create_ring('ring_seg', 3, 2000.)
+    dut.register(func=dut.lsl_stream_data, args=(0, 'ring_seg', daq.read_batch, 3, 2000., ring_name))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'ring_seg', tmp_path),
+                 kwargs=dict(seq_channel=0, ring_name=ring_name, flush_sec=0.1, segment_sec=segment_sec, segment_mb=segment_mb))
+    dut.start()
+    dut.wait_for_seconds(2.5)
+    dut.check_exception()
+    dut.stop()
+
+    with open(next(tmp_path.glob("*_ring_seg_manifest.json")), "r") as f:
+        manifest = json.load(f)
+    segments = manifest["segments"]
+    assert manifest["is_complete"]
+    assert manifest["num_overrun"] == 0
+    assert len(segments) >= 3
+    assert all(val["is_closed"] and val["num_samples"] > 0 for val in segments)
+    assert [val["sample_start"] for val in segments[1:]] == list(np.cumsum([val["num_samples"] for val in segments[:-1]]))
+    assert all(val0["time_end"] < val1["time_start"] for val0, val1 in zip(segments[:-1], segments[1:]))
+    assert len(list(tmp_path.glob("*_ring_seg_*.h5"))) == len(segments)
+
+    rslt = DataAPI(tmp_path, data_prefix='ring_seg').read_data_file(0)
+    assert rslt.time.size == sum(val["num_samples"] for val in segments)
+    np.testing.assert_array_equal(rslt.data[1], np.arange(rslt.time.size))
+
+
+@pytest.mark.parametrize("use_process", [False, True])
+def test_ring_record_raw(tmp_path: Path, use_process: bool):
+    dut = ThreadLSL()
+    daq = CounterBatch(2000.)
+    ring_name = dut.create_ring('ring_raw', 3, 2000.)
+    dut.register(func=dut.lsl_stream_data, args=(0, 'ring_raw', daq.read_batch, 3, 2000., ring_name))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'ring_raw', tmp_path),
+                 kwargs=dict(seq_channel=0, ring_name=ring_name, flush_sec=0.1, backend='raw'), use_process=use_process)
+    dut.start()
+    dut.wait_for_seconds(2.)
+    latency = dut.latency
+    dut.check_exception()
+    dut.stop()
+
+    attrs, records = read_raw_log(next(tmp_path.glob("*_ring_raw.rlog")))
+    assert attrs["sampling_rate"] == 2000.
+    assert attrs["num_overrun"] == 0
+    assert records.size > 3000
+    np.testing.assert_array_equal(records['data'][:, 1], np.arange(records.size))
+    assert latency[1].num_chunks > 0
+
+    path = convert_raw_log(next(tmp_path.glob("*_ring_raw.rlog")))
+    with h5py.File(path, "r") as f:
+        assert f["gaps"].shape[0] == 0
+        assert f.attrs["type"] == "sensor_data"
+    rslt = DataAPI(tmp_path, data_prefix='ring_raw')
+    assert len(rslt.get_overview_data()) == 2
+    np.testing.assert_array_equal(rslt.read_data_file(0).data, rslt.read_data_file(1).data)
+
+
+def test_process_exception(tmp_path: Path):
+    dut = ThreadLSL()
+    dut.register(func=dut._thread_dummy, args=(0, ))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'not_available', tmp_path), use_process=True)
+    dut.start()
+    sleep(4.)
+    with pytest.raises(ValueError):
+        dut.check_exception()
+    dut.stop()
+
+
 def test_thread_utilization():
     dut = ThreadLSL()
     path2data = get_path_to_project("temp_data")
@@ -128,6 +408,66 @@ def test_thread_utilization():
     assert dut.is_running == False
 
 
+def test_thread_telemetry(tmp_path: Path):
+    dut = ThreadLSL()
+    sources = {'constant': lambda: 7., 'backlog': lambda: dut.get_stream_backlog('mock_tele')}
+    dut.register(func=dut.lsl_stream_util, args=(0, 'util_tele', 20., get_telemetry_names(), 0, tmp_path, sources))
+    dut.register(func=dut.lsl_record_stream, args=(1, 'util_tele', tmp_path))
+    dut.register(func=dut.lsl_stream_mock, args=(2, 'mock_tele', 2, 1000.))
+    dut.register(func=dut.lsl_record_stream, args=(3, 'mock_tele', tmp_path))
+    dut.start()
+    dut.wait_for_seconds(3.)
+    backlog = dut.get_stream_backlog('mock_tele')
+    dut.check_exception()
+    dut.stop()
+
+    assert 0 <= backlog < 500
+    with h5py.File(list(tmp_path.glob("*_util_tele.h5"))[0], "r") as f:
+        assert list(f.attrs["channel_names"]) == get_telemetry_names() + ['constant', 'backlog']
+        data = f["data"][:]
+    assert data.shape[0] == pytest.approx(20. * 4., rel=0.3)
+    assert all(data[:, -2] == 7.)
+    assert all(data[:, -1] < 500)
+
+
+@pytest.mark.parametrize("use_process", [False, True])
+def test_record_streams(tmp_path: Path, use_process: bool):
+    dut = ThreadLSL()
+    daq = CounterBatch(2000.)
+    ring_name = dut.create_ring('ring_multi', 3, 2000.)
+    sources = {'backlog': lambda: dut.get_stream_backlog('ring_multi')}
+    dut.register(func=dut.lsl_stream_data, args=(0, 'ring_multi', daq.read_batch, 3, 2000., ring_name))
+    dut.register(func=dut.lsl_stream_util, args=(1, 'util_multi', 20., None, 0, "", sources))
+    dut.register(func=dut.lsl_record_streams, args=(2, 'ring_multi', tmp_path),
+                 kwargs=dict(seq_channel=0, ring_name=ring_name, flush_sec=0.2, compression='lzf', streams=('util_multi', )), use_process=use_process)
+    dut.start()
+    dut.wait_for_seconds(2.5)
+    stats = dut.statistics
+    backlog = dut.get_stream_backlog('ring_multi')
+    dut.check_exception()
+    dut.stop()
+
+    assert stats[2].name == 'lsl_record_streams(ring_multi)'
+    assert stats[2].samples_per_sec == pytest.approx(2000., rel=0.1)
+    assert 0 <= backlog < 1000
+    files = list(tmp_path.glob("*_ring_multi.h5"))
+    assert len(files) == 1
+    with h5py.File(files[0], "r") as f:
+        assert list(f.attrs["streams"]) == ['ring_multi', 'util_multi']
+        assert f["ring_multi"].attrs["num_overrun"] == 0
+        assert f["ring_multi/gaps"].shape[0] == 0
+        assert f["util_multi"].attrs["type"] == "utilization"
+        assert list(f["util_multi"].attrs["channel_names"]) == ['cpu_host', 'ram_host', 'backlog']
+        assert f["util_multi/data"].shape[0] == pytest.approx(20. * 3.5, rel=0.4)
+        assert "gaps" not in f["util_multi"]
+
+    reader = DataAPI(tmp_path, data_prefix='ring_multi', util_prefix='util_multi')
+    data = reader.read_data_file(0)
+    np.testing.assert_array_equal(data.data[1], np.arange(data.time.size))
+    assert reader.get_file_name_util(0) == str(files[0].absolute())
+    assert reader.read_utilization_file(0).num_channels == 3
+
+
 def test_thread_mock_random():
     dut = ThreadLSL()
     channel_num = 4
@@ -147,6 +487,86 @@ def test_thread_mock_random():
     assert dut.is_running == False
 
 
+def test_thread_mock_deadline_high_rate():
+    dut = ThreadLSL()
+    sample_rate = 50e3
+    dut.register(func=dut.lsl_stream_mock, args=(0, 'mock_fast', 2, sample_rate, 'counter'))
+    dut.start()
+    inlet = StreamInlet(resolve_byprop('name', 'mock_fast', timeout=5.)[0])
+    inlet.open_stream(timeout=5.)
+
+    data, tb = list(), list()
+    time_end = local_clock() + 3.
+    while local_clock() < time_end:
+        chunk, ts = inlet.pull_chunk(timeout=0.1, max_samples=int(sample_rate), dest_obj=None)
+        if ts:
+            data.append(np.asarray(chunk, dtype=np.int16))
+            tb.extend(ts)
+    time_stop = local_clock()
+    dut.stop()
+
+    data = np.concatenate(data)
+    tb = np.array(tb)
+    assert check_counter(data) == (0, 0, 0)
+    np.testing.assert_allclose(np.diff(tb), 1 / sample_rate, atol=1e-6)
+    assert tb.size / (time_stop - tb[0]) == pytest.approx(sample_rate, rel=0.05)
+    assert time_stop - tb[-1] < 0.1
+
+
+def write_counter_recording(path: Path, sampling_rate: float, num_samples: int) -> np.ndarray:
+    data = np.stack([np.arange(num_samples) % 256, np.arange(num_samples), -np.arange(num_samples)], axis=1).astype(np.int32)
+    with h5py.File(path / "20260101_120000_replay.h5", "w") as f:
+        f.attrs["sampling_rate"] = sampling_rate
+        f.attrs["channel_count"] = 3
+        f.attrs["type"] = "sensor_data"
+        f.attrs["data_format"] = 4
+        f.create_dataset("time", data=100. + np.arange(num_samples) / sampling_rate)
+        f.create_dataset("data", data=data)
+    return data
+
+
+def pull_stream(name: str, duration_sec: float) -> tuple[np.ndarray, np.ndarray]:
+    inlet = StreamInlet(resolve_byprop('name', name, timeout=5.)[0])
+    inlet.open_stream(timeout=5.)
+    data, tb = list(), list()
+    time_end = local_clock() + duration_sec
+    while local_clock() < time_end:
+        chunk, ts = inlet.pull_chunk(timeout=0.1, max_samples=100000)
+        if ts:
+            data.append(np.asarray(chunk))
+            tb.extend(ts)
+    return np.concatenate(data), np.array(tb)
+
+
+def test_thread_replay_file_speed(tmp_path: Path):
+    reference = write_counter_recording(tmp_path, 2000., 8000)
+    dut = ThreadLSL()
+    dut.register(func=dut.lsl_stream_file, args=(0, 'replay', tmp_path, 0, 'replay', 10., False))
+    dut.start()
+    data, tb = pull_stream('replay', 2.)
+    dut.wait_for_seconds(2.)
+    assert dut.is_alive
+    dut.stop()
+
+    np.testing.assert_array_equal(data, reference)
+    np.testing.assert_allclose(np.diff(tb), 1 / 20e3, atol=1e-6)
+
+
+def test_thread_replay_file_window_loop(tmp_path: Path):
+    reference = write_counter_recording(tmp_path, 2000., 8000)
+    dut = ThreadLSL()
+    dut.register(func=dut.lsl_stream_file, args=(0, 'replay_loop', tmp_path, 0, 'replay', 0., True, 1., 2.))
+    dut.start()
+    data, tb = pull_stream('replay_loop', 1.)
+    time_end = local_clock()
+    dut.stop()
+
+    assert data.shape[0] > 3 * 2000
+    np.testing.assert_array_equal(data[:4000], np.concatenate([reference[2000:4000]] * 2))
+    assert np.all(np.diff(tb) > 0)
+    assert tb[-1] <= time_end
+
+
 def test_thread_mock_file():
     dut = ThreadLSL()
     path2save = get_path_to_project("temp_data")
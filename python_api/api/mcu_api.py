@@ -1,13 +1,23 @@
+import json
+import os
 from dataclasses import dataclass
+from datetime import datetime
 from logging import getLogger, Logger
+from pathlib import Path
 from time import sleep
+import h5py
 import numpy as np
+from pylsl import local_clock
 
 from api.interface import (
     get_comport_name,
+    AdaptiveReadSize,
     InterfaceSerial
 )
-from api.lsl import ThreadLSL
+from api.clock_sync import ClockSync
+from api.host_telemetry import get_telemetry_names
+from api.lsl import LatencyStatistics, ThreadLSL
+from api.mcu_frame import FrameDecoder, FrameStatistics, get_daq_frame_datatype
 from api.mcu_conv import (
     _convert_pin_state,
     _convert_system_state,
@@ -59,14 +69,20 @@ class SystemState:
 
 class DeviceAPI:
     __device: InterfaceSerial
+    __decoder: FrameDecoder
+    __clock: ClockSync
+    __read_policy: AdaptiveReadSize
     __threads: ThreadLSL
+    __path2latency: str | None = None
+    __recording: tuple[str, str, str] | None = None
     __logger: Logger
     __timeout_default: float = 10.
-    __num_batch_data: int = 20
     __num_bytes_data: int = 15
     __sampling_rate: float = 4.
     __usb_vid: int = 0x2E8A
     # PID of RP2350 = 0x0009 and RP2040 = 0x000A
+    _response_size: dict[int, int] = {0: 3, 2: 3, 3: 3, 4: 3, 5: 9, 6: 3, 7: 3}
+    # Number of response bytes for each command head (others without response)
 
     def __init__(self, com_name: str="AUTOCOM", timeout: float=1.) -> None:
         """Init. of the device with name and baudrate of the device
@@ -75,6 +91,9 @@ class DeviceAPI:
         """
         self.__logger = getLogger(__name__)
         self.__threads = ThreadLSL()
+        self.__decoder = FrameDecoder(dtype=self._thread_frame_datatype, head=0xA0, tail=0xFF, sequence='index')
+        self.__clock = ClockSync()
+        self.__read_policy = AdaptiveReadSize(frame_size=self.__num_bytes_data)
         self.__timeout_default = timeout
         self.__device = InterfaceSerial(
             com_name=com_name if com_name != "AUTOCOM" else get_comport_name(usb_vid=self.__usb_vid),
@@ -98,6 +117,16 @@ class DeviceAPI:
             data=self.__device.convert(head, data),
         )
 
+    def execute_batch(self, commands: list[tuple[int, int]]) -> list[bytes]:
+        """Sending a batch of commands in one transmission and collecting all responses (pipelined RPC)
+        :param commands:    List with tuples of (head, data) for each command, see usb_cmd_t in firmware/callbacks/rpc_callbacks.c
+        :return:            List with raw response of each command (empty bytes for commands without response)
+        """
+        return self.__device.write_wfb_batch(
+            data=[self.__device.convert(head, data) for head, data in commands],
+            sizes=[self._response_size.get(head, 0) for head, _ in commands]
+        )
+
     @property
     def total_num_bytes(self) -> int:
         """Returning the total number of bytes for each transmission"""
@@ -108,6 +137,21 @@ class DeviceAPI:
         """Boolean for checking if serial communication is open and used"""
         return self.__device.is_open()
 
+    @property
+    def daq_statistics(self) -> FrameStatistics:
+        """Returning the counters of the DAQ frame decoder (decoded, lost, duplicated and out-of-order frames, resync events, discarded bytes)"""
+        return self.__decoder.statistics
+
+    @property
+    def daq_latency(self) -> list[LatencyStatistics]:
+        """Returning the latency of each DAQ stage (age of the newest sample after pushing, recording and plotting), it is saved in '<time>_<name>_latency.json' at stop"""
+        return self.__threads.latency
+
+    @property
+    def clock(self) -> ClockSync:
+        """Returning the mapping of the device runtime onto the host clock (used for the DAQ timestamps)"""
+        return self.__clock
+
     @property
     def is_daq_running(self) -> bool:
         """Returning if DAQ is still running"""
@@ -143,63 +187,93 @@ class DeviceAPI:
                 raise ValueError(f"Get: {ret}")
         return self.__device.deserialize_string(val, do_padding)
 
+    @staticmethod
+    def _check_response(ret: bytes, head: int) -> bytes:
+        if not ret or ret[0] != head:
+            raise ValueError(f"Get: {ret}")
+        return ret
+
+    @staticmethod
+    def _decode_system_clock_khz(ret: bytes) -> int:
+        return 10 * int.from_bytes(DeviceAPI._check_response(ret, 0x02)[1:], byteorder='little', signed=False)
+
+    @staticmethod
+    def _decode_system_state(ret: bytes) -> str:
+        return _convert_system_state(DeviceAPI._check_response(ret, 0x03)[-1])
+
+    @staticmethod
+    def _decode_pin_state(ret: bytes) -> str:
+        return _convert_pin_state(ret[-1])
+
+    @staticmethod
+    def _decode_runtime_sec(ret: bytes) -> float:
+        return 1e-6 * int.from_bytes(DeviceAPI._check_response(ret, 0x05)[1:], byteorder='little', signed=False)
+
+    @staticmethod
+    def _decode_firmware_version(ret: bytes) -> str:
+        ret = DeviceAPI._check_response(ret, 0x06)
+        return f"{ret[1]}.{ret[2]}"
+
+    @staticmethod
+    def _decode_temp_mcu(ret: bytes) -> float:
+        ret = DeviceAPI._check_response(ret, 0x07)
+        return _convert_rp2_temp_value(int.from_bytes(ret[1:], signed=False, byteorder='little'))
+
     def _get_system_clock_khz(self) -> int:
         """Returning the system clock of the device in kHz"""
-        ret = self.__write_with_feedback(2, 0)
-        if ret[0] != 0x02:
-            raise ValueError(f"Get: {ret}")
-        return 10 * int.from_bytes(ret[1:], byteorder='little', signed=False)
+        return self._decode_system_clock_khz(self.__write_with_feedback(2, 0))
 
     def _get_system_state(self) -> str:
         """Retuning the System State"""
-        ret = self.__write_with_feedback(3, 0)
-        if ret[0] != 0x03:
-            raise ValueError(f"Get: {ret}")
-        return _convert_system_state(ret[-1])
+        return self._decode_system_state(self.__write_with_feedback(3, 0))
 
     def _get_pin_state(self) -> str:
         """Retuning the Pin States"""
-        ret = self.__write_with_feedback(4, 0)
-        return _convert_pin_state(ret[-1])
+        return self._decode_pin_state(self.__write_with_feedback(4, 0))
 
     def _get_runtime_sec(self) -> float:
         """Returning the execution runtime of the device after last reset
         :return:    Float value with runtime in seconds
         """
-        ret = self.__write_with_feedback(5, 0, size=9)
-        if ret[0] != 0x05:
-            raise ValueError(f"Get: {ret}")
-        return 1e-6 * int.from_bytes(ret[1:], byteorder='little', signed=False)
+        return self._decode_runtime_sec(self.__write_with_feedback(5, 0, size=9))
 
     def _get_firmware_version(self) -> str:
         """Returning the firmware version of the device
         :return:    String with firmware version
         """
-        ret = self.__write_with_feedback(6, 0)
-        if ret[0] != 0x06:
-            raise ValueError(f"Get: {ret}")
-        return f"{ret[1]}.{ret[2]}"
+        return self._decode_firmware_version(self.__write_with_feedback(6, 0))
 
     def _get_temp_mcu(self) -> float:
         """Returning the temperature of the device in Celsius
         :return:    Float value with temperature in Celsius
         """
-        ret = self.__write_with_feedback(7, 0)
-        if ret[0] != 0x07:
-            raise ValueError(f"Get: {ret}")
-        return _convert_rp2_temp_value(int.from_bytes(ret[1:], signed=False, byteorder='little'))
+        return self._decode_temp_mcu(self.__write_with_feedback(7, 0))
+
+    def sync_clock(self, num_probes: int=16) -> float:
+        """Aligning the device runtime to the host clock (pylsl.local_clock) with several runtime requests (done in start_daq),
+        during DAQ the offset and drift are tracked online with the received frames
+        :param num_probes:  Integer with number of runtime requests (the one with the smallest round-trip time is used)
+        :return:            Float with offset between host and device clock [sec.]
+        """
+        self.__clock.reset()
+        for _ in range(num_probes):
+            host_send = local_clock()
+            runtime = self._get_runtime_sec()
+            self.__clock.add_probe(runtime, host_send, local_clock())
+        return self.__clock.offset
 
     def get_state(self) -> SystemState:
-        """Returning the state of the system
+        """Returning the state of the system (all requests are pipelined in one transmission)
         :return:    Class SystemState with information about pin state, system state and actual runtime of the system
         """
+        ret = self.execute_batch([(4, 0), (3, 0), (5, 0), (2, 0), (6, 0), (7, 0)])
         return SystemState(
-            pins=self._get_pin_state(),
-            system=self._get_system_state(),
-            runtime=self._get_runtime_sec(),
-            clock=self._get_system_clock_khz(),
-            firmware=self._get_firmware_version(),
-            temp=self._get_temp_mcu()
+            pins=self._decode_pin_state(ret[0]),
+            system=self._decode_system_state(ret[1]),
+            runtime=self._decode_runtime_sec(ret[2]),
+            clock=self._decode_system_clock_khz(ret[3]),
+            firmware=self._decode_firmware_version(ret[4]),
+            temp=self._decode_temp_mcu(ret[5])
         )
 
     def enable_led(self) -> None:
@@ -222,83 +296,192 @@ class DeviceAPI:
 
     @property
     def _thread_frame_datatype(self) -> np.dtype:
-        return np.dtype([
-            ('head', 'u1'),  # 1 Byte unsigned
-            ('index', 'u1'),  # 1 Byte unsigned
-            ('timestamp', '<u8'),  # 8 Byte unsigned
-            ('c0', '<u2'),  # 2 Byte signed short
-            ('c1', '<u2'),  # 2 Byte signed short
-            ('tail', 'u1'),  # 1 Byte unsigned
-        ])
+        return get_daq_frame_datatype()
 
     def _thread_read_frame(self) -> tuple[list, float]:
         """Entpacken der Informationen aus dem USB Protokoll (siehe C-Datei: src/daq_sample.c in der Firmware)"""
         try:
-            frame = self.__device.read(self.__num_bytes_data)
-            if not frame:
-                raise Exception
-            frames = np.frombuffer(frame, dtype=self._thread_frame_datatype)
-            mask = (frames['head'] == 0xA0) | (frames['tail'] == 0xFF)
-            frames = frames[mask]
+            frames = self.__decoder.decode(self.__device.read(self.__num_bytes_data))
             if frames.size > 0:
-                timestamps = float(1e-6 * frames['timestamp'])
-                data = [int(frames['index']), int(frames['c0']), int(frames['c1'])]
+                runtime = 1e-6 * float(frames['timestamp'][-1])
+                self.__clock.add_receive(runtime, local_clock())
+                timestamps = float(self.__clock.to_host(runtime))
+                data = [int(frames['index'][-1]), int(frames['c0'][-1]), int(frames['c1'][-1])]
                 return data, timestamps
             else:
                 raise Exception
         except Exception:
             return [], None
 
-    def _thread_read_batch(self) -> tuple[list[list], list[float]]:
-        """Entpacken der Informationen aus dem USB Protokoll (siehe C-Datei: src/daq_sample.c in der Firmware)"""
+    def _thread_read_batch(self) -> tuple[np.ndarray, np.ndarray]:
+        """Entpacken der Informationen aus dem USB Protokoll (siehe C-Datei: src/daq_sample.c in der Firmware)
+        :return:    Tuple with numpy array of the channels [index, c0, c1] (np.int32, shape (num_frames, 3)) and numpy array with host timestamps
+        """
         try:
-            batch = self.__device.read(self.__num_batch_data)
-            if not batch:
-                raise Exception
-            frames = np.frombuffer(batch, dtype=self._thread_frame_datatype)
-            mask = (frames['head'] == 0xA0) | (frames['tail'] == 0xFF)
-            frames = frames[mask]
-            if frames.size > 0:
-                timestamps = (frames['timestamp'] * 1e-6).tolist()
-                data = np.stack([frames['index'], frames['c0'], frames['c1']], axis=1).tolist()
-                return data, timestamps
-            else:
-                raise Exception
+            view = self.__device.read_view(self.__read_policy.max_bytes, self.__read_policy.min_bytes)
+            time_receive = local_clock()
+            try:
+                self.__read_policy.update(len(view), self.__device.in_waiting - len(view), time_receive)
+                frames = self.__decoder.decode(view)
+                if frames.size > 0:
+                    runtime = frames['timestamp'] * 1e-6
+                    self.__clock.add_receive(float(runtime[-1]), time_receive)
+                    return self._get_batch_data(frames), self.__clock.to_host(runtime)
+                else:
+                    raise Exception
+            finally:
+                self.__device.release_view(len(view))
         except Exception:
-            return [], []
-
-    def start_daq(self, do_plot: bool=False, window_sec: float= 30., track_util: bool=False, folder_name: str="data") -> None:
+            return np.zeros((0, 3), dtype=np.int32), np.zeros((0, ))
+
+    @staticmethod
+    def _get_batch_data(frames: np.ndarray) -> np.ndarray:
+        """Converting decoded DAQ frames into the channels [index, c0, c1] (np.int32, shape (num_frames, 3))"""
+        data = np.empty((frames.size, 3), dtype=np.int32)
+        data[:, 0] = frames['index']
+        data[:, 1] = frames['c0']
+        data[:, 2] = frames['c1']
+        return data
+
+    def _get_daq_metrics(self) -> list[float]:
+        """Returning the actual values of all DAQ metrics (see _get_daq_metrics_names())"""
+        return self.__decoder.statistics.to_list() + self.__clock.get_parameters() + self.__read_policy.get_parameters()
+
+    @staticmethod
+    def _get_daq_metrics_names() -> list[str]:
+        """Returning the names of all DAQ metrics"""
+        return FrameStatistics.get_names() + ClockSync.get_parameter_names() + AdaptiveReadSize.get_parameter_names()
+
+    def start_daq(self, do_plot: bool=False, window_sec: float= 30., track_util: bool=False, folder_name: str="data", name: str="data", track_metrics: bool=False, latency_sec: float=0.02, use_processes: bool=False, use_ring: bool=True, util_rate: float=2., compression: str="", segment_sec: float=0., segment_mb: float=0., backend: str="h5", single_file: bool=False, decimation: tuple[int, ...]=()) -> None:
         """Changing the state of the DAQ with starting it
-        :param do_plot:     True to plot the data in real-time
-        :param window_sec:  Floating value with window length [in seconds] for live plotting
-        :param track_util:  If true, the utilization (CPU / RAM) of the host computer will be tracked during recording session
-        :param folder_name: String with folder name to save data in project folder
+        :param do_plot:         True to plot the data in real-time
+        :param window_sec:      Floating value with window length [in seconds] for live plotting
+        :param track_util:      If true, the utilization of the host computer (CPU / RAM), of this process and its threads and child processes,
+                                the disk writing, the serial input backlog and the backlog of the recording will be tracked during recording session
+        :param folder_name:     String with folder name to save data in project folder
+        :param name:            String with name of the LSL stream and the recording file of the DAQ data
+        :param track_metrics:   If true, the decoder metrics (e.g. lost frames), the parameters of the clock synchronization and of the read sizing are published and recorded in stream 'metrics' ('metrics_<name>')
+        :param latency_sec:     Float with target latency of one read, the read size is adapted to the arrival rate and backlog of the data [sec.]
+        :param use_processes:   If true, recording, utilization and plotting run in own processes and the acquisition keeps the interpreter of this process
+        :param use_ring:        If true, recording and plotting of the DAQ data read from a ring buffer in shared memory instead of LSL
+                                (the LSL stream is still published for external consumers)
+        :param util_rate:       Float with sampling rate of the utilization [Hz]
+        :param compression:     String with codec of the recording of the DAQ data (e.g. 'lzf', empty to disable, see lsl_record_stream())
+        :param segment_sec:     Float with duration after which all recordings continue in new segment files [sec.] (0 to disable)
+        :param segment_mb:      Float with file size after which a recording continues in a new segment file [MB] (0 to disable)
+        :param backend:         String with file format of the recording of the DAQ data ('h5' or 'raw' for a raw log with lowest overhead,
+                                see lsl_record_stream() and convert_raw_log())
+        :param single_file:     If true, the DAQ data, the utilization and the metrics are recorded by one stage into one HDF5 file
+                                with one group per stream (see lsl_record_streams(), without segments and raw log)
+        :param decimation:      Tuple with number of samples of one bin of each min/max/mean level of the recording of the DAQ data for
+                                overview plots (e.g. get_decimation_factors(), empty to disable, see DataAPI.read_data_overview())
         :return: None
         """
-        self.__num_batch_data = self.__num_bytes_data * (int(self.__sampling_rate / 50) if self.__sampling_rate > 50. else 10)
+        if single_file and (segment_sec > 0. or segment_mb > 0. or backend != "h5"):
+            raise ValueError("Recording into a single file supports neither segments nor the raw log backend")
         path2data = get_path_to_project(new_folder=folder_name)
+        name_metrics = 'metrics' if name == 'data' else f'metrics_{name}'
+        ring_name = self.__threads.create_ring(name, 3, self.__sampling_rate) if use_ring else ""
+        time_start = datetime.today().strftime('%Y%m%d_%H%M%S')
+        self.__path2latency = f"{path2data}/{time_start}_{name}_latency.json"
+        self.__recording = (path2data, name, time_start)
 
         func = self._thread_read_batch if self.__sampling_rate > 500. else self._thread_read_frame
-        self.__threads.register(func=self.__threads.lsl_stream_data, args=(0, 'data', func, 3, self.__sampling_rate))
-        self.__threads.register(func=self.__threads.lsl_record_stream, args=(1, 'data', path2data))
+        self.__threads.register(func=self.__threads.lsl_stream_data, args=(0, name, func, 3, self.__sampling_rate), kwargs=dict(ring_name=ring_name))
+        idx = 1
+        if not single_file:
+            self.__threads.register(func=self.__threads.lsl_record_stream, args=(idx, name, path2data), kwargs=dict(seq_channel=0, ring_name=ring_name, compression=compression, segment_sec=segment_sec, segment_mb=segment_mb, backend=backend, decimation=tuple(decimation), time_start=time_start), use_process=use_processes)
+            idx += 1
+        streams = list()
         if track_util:
-            self.__threads.register(func=self.__threads.lsl_stream_util, args=(2, 'util', 2.))
-            self.__threads.register(func=self.__threads.lsl_record_stream, args=(3, 'util', path2data))
+            # The utilization reads the serial port and the counters of this process, so it stays in a thread
+            sources = {'serial_backlog': lambda: self.__device.in_waiting, 'record_backlog': lambda: self.__threads.get_stream_backlog(name)}
+            self.__threads.register(func=self.__threads.lsl_stream_util, args=(idx, 'util', util_rate), kwargs=dict(channels=get_telemetry_names(), pid=os.getpid(), path2disk=path2data, sources=sources))
+            idx += 1
+            if single_file:
+                streams.append('util')
+            else:
+                self.__threads.register(func=self.__threads.lsl_record_stream, args=(idx, 'util', path2data), kwargs=dict(segment_sec=segment_sec, segment_mb=segment_mb), use_process=use_processes)
+                idx += 1
+        if track_metrics:
+            self.__threads.register(func=self.__threads.lsl_stream_metrics, args=(idx, name_metrics, self._get_daq_metrics, self._get_daq_metrics_names()), kwargs=dict(sampling_rate=10.))
+            idx += 1
+            if single_file:
+                streams.append(name_metrics)
+            else:
+                self.__threads.register(func=self.__threads.lsl_record_stream, args=(idx, name_metrics, path2data), kwargs=dict(segment_sec=segment_sec, segment_mb=segment_mb), use_process=use_processes)
+                idx += 1
+        if single_file:
+            self.__threads.register(func=self.__threads.lsl_record_streams, args=(idx, name, path2data), kwargs=dict(seq_channel=0, ring_name=ring_name, compression=compression, streams=tuple(streams), decimation=tuple(decimation), time_start=time_start), use_process=use_processes)
+            idx += 1
         if do_plot:
-            self.__threads.register(func=self.__threads.lsl_plot_stream, args=(4 if track_util else 2, 'data', window_sec))
+            pull_idx = self.__threads.register_subthread(f"lsl_plot_stream_pull({name})", use_process=use_processes)
+            self.__threads.register(func=self.__threads.lsl_plot_stream, args=(pull_idx + 1, name), kwargs=dict(window_length=window_sec, update_rate=12., ring_name=ring_name, pull_idx=pull_idx), use_process=use_processes)
 
-        self.__device.timeout = 2 / self.__sampling_rate
+        self._start_daq_transport(latency_sec)
         self.__threads.start()
-        self.__write_without_feedback(11, 0)
 
-    def stop_daq(self) -> None:
-        """Changing the state of the DAQ with stopping it
+    def _start_daq_transport(self, latency_sec: float=0.02) -> None:
+        """Starting the DAQ on the device and the receiving into the ring buffer without any LSL thread
+        (data is available with _thread_read_batch() or _thread_read_frame())
+        :param latency_sec: Float with target latency of one read [sec.]
         :return:            None
         """
-        self.__threads.stop()
+        self.__device.timeout = max(2 / self.__sampling_rate, latency_sec)
+        self.__read_policy = AdaptiveReadSize(frame_size=self.__num_bytes_data, latency_sec=latency_sec)
+        self.__read_policy.reset(rate=self.__sampling_rate * self.__num_bytes_data)
+        self.__decoder.reset()
+        self.sync_clock()
+        self.__device.start_reader()
+        self.__write_without_feedback(11, 0)
+
+    def _stop_daq_transport(self) -> None:
+        """Stopping the DAQ on the device and the receiving into the ring buffer (unread data and frames which are still
+        in flight after the stop command are discarded until the device is quiet for a few frame periods)"""
         self.__write_without_feedback(12, 0)
+        self.__device.stop_reader(quiet_sec=max(0.02, 8 / self.__sampling_rate), max_sec=2.)
         self.__device.timeout = self.__timeout_default
 
+    def stop_daq(self) -> None:
+        """Changing the state of the DAQ with stopping it, the final parameters of the clock synchronization are written
+        into the attributes of the recording of the DAQ data (clock_offset, clock_drift and clock_reference)
+        :return:            None
+        """
+        self.__threads.stop(self.__path2latency)
+        self.__path2latency = None
+        self._stop_daq_transport()
+        self._save_clock_parameters()
+
+    def _save_clock_parameters(self) -> None:
+        """Writing the parameters of the clock synchronization (see ClockSync.get_parameter_names()) into the attributes of
+        the HDF5 recordings of the DAQ data of the last session (all segments listed in the manifest, raw logs are not changed)"""
+        if self.__recording is None:
+            return
+        path2data, name, time_start = self.__recording
+        self.__recording = None
+        params = dict(zip(ClockSync.get_parameter_names(), self.__clock.get_parameters()))
+        path = Path(path2data)
+        path2manifest = path / f"{time_start}_{name}_manifest.json"
+        if path2manifest.exists():
+            with open(path2manifest, "r") as f:
+                files = [path / segment["file"] for segment in json.load(f)["segments"]]
+        else:
+            files = [path / f"{time_start}_{name}.h5"]
+        for file in files:
+            if file.suffix != ".h5" or not file.exists():
+                continue
+            with h5py.File(file, "a") as f:
+                group = f[name] if "time" not in f and name in f else f
+                group.attrs.update(params)
+
+    def check_daq(self) -> None:
+        """Raising possible thread errors of the DAQ and a RuntimeError if one thread is shutdown
+        :return:    None
+        """
+        self.__threads.check_exception()
+        if not self.__threads.is_running:
+            raise RuntimeError("One DAQ thread is shutdown")
+
     def wait_daq(self, time_sec: float) -> None:
         """Waiting Routine incl. returning possible thread errors
         :param time_sec:    Float with time value for waiting
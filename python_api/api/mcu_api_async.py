@@ -0,0 +1,176 @@
+import asyncio
+import numpy as np
+from collections.abc import AsyncIterator
+from logging import getLogger, Logger
+
+from api.interface import get_comport_name, InterfaceSerial
+from api.interface_async import AsyncInterfaceSerial
+from api.mcu_api import DeviceAPI, SystemState
+from api.mcu_frame import FrameDecoder, FrameStatistics, get_daq_frame_datatype
+
+
+class AsyncDeviceAPI:
+    __device: AsyncInterfaceSerial
+    __decoder: FrameDecoder
+    __logger: Logger
+    __stream: asyncio.Queue | None = None
+    __sampling_rate: float = 4.
+    __usb_vid: int = 0x2E8A
+
+    def __init__(self, com_name: str="AUTOCOM", timeout: float=1.) -> None:
+        """Init. of the device with name of the serial port for usage on an asyncio event loop (call await open() before usage)
+        :param com_name:    String with the serial port name of the used device
+        :param timeout:     Floating value with timeout for the communication
+        """
+        self.__logger = getLogger(__name__)
+        self.__decoder = FrameDecoder(dtype=get_daq_frame_datatype(), head=0xA0, tail=0xFF, sequence='index')
+        self.__device = AsyncInterfaceSerial(
+            com_name=com_name if com_name != "AUTOCOM" else get_comport_name(usb_vid=self.__usb_vid),
+            baud=230400,
+            num_bytes_head=1,
+            num_bytes_data=2,
+            timeout=timeout
+        )
+
+    async def __write_with_feedback(self, head: int, data: int, size: int=0) -> bytes:
+        return await self.__device.write_wfb(
+            data=self.__device.convert(head, data),
+            size=size
+        )
+
+    def __write_without_feedback(self, head: int, data: int) -> None:
+        self.__device.write(
+            data=self.__device.convert(head, data),
+        )
+
+    @property
+    def is_com_port_active(self) -> bool:
+        """Boolean for checking if serial communication is open and used"""
+        return self.__device.is_open()
+
+    @property
+    def is_daq_running(self) -> bool:
+        """Returning if the DAQ stream is received"""
+        return self.__stream is not None
+
+    @property
+    def daq_statistics(self) -> FrameStatistics:
+        """Returning the counters of the DAQ frame decoder (decoded frames, resynchronization events, discarded bytes)"""
+        return self.__decoder.statistics
+
+    async def open(self) -> None:
+        """Opening the serial communication between API and device on the running event loop"""
+        await self.__device.open()
+
+    def close(self) -> None:
+        """Closing the serial communication between API and device"""
+        self.__stream = None
+        self.__device.close()
+
+    async def execute_batch(self, commands: list[tuple[int, int]]) -> list[bytes]:
+        """Sending a batch of commands in one transmission and collecting all responses (pipelined RPC)
+        :param commands:    List with tuples of (head, data) for each command, see usb_cmd_t in firmware/callbacks/rpc_callbacks.c
+        :return:            List with raw response of each command (empty bytes for commands without response)
+        """
+        return await self.__device.write_wfb_batch(
+            data=[self.__device.convert(head, data) for head, data in commands],
+            sizes=[DeviceAPI._response_size.get(head, 0) for head, _ in commands]
+        )
+
+    async def do_reset(self) -> None:
+        """Performing a Software Reset on the Platform"""
+        if self.is_daq_running:
+            await self.stop_daq()
+        self.__write_without_feedback(1, 0)
+        await asyncio.sleep(4)
+
+    async def echo(self, data: str) -> str:
+        """Sending some characters to the device and returning the result
+        :param data:    String with the data to be sent
+        :return:        String with returned data from DAQ
+        """
+        do_padding = len(data) % self.__device.num_bytes == 1
+        chunks = InterfaceSerial.serialize_string(data, do_padding)
+        ret = await self.execute_batch([(0, chunk) for chunk in chunks])
+        return InterfaceSerial.deserialize_string(b''.join([val[1:] for val in ret]), do_padding)
+
+    async def _get_system_state(self) -> str:
+        """Retuning the System State"""
+        return DeviceAPI._decode_system_state(await self.__write_with_feedback(3, 0))
+
+    async def _get_pin_state(self) -> str:
+        """Retuning the Pin States"""
+        return DeviceAPI._decode_pin_state(await self.__write_with_feedback(4, 0))
+
+    async def _get_runtime_sec(self) -> float:
+        """Returning the execution runtime of the device after last reset"""
+        return DeviceAPI._decode_runtime_sec(await self.__write_with_feedback(5, 0, size=9))
+
+    async def get_state(self) -> SystemState:
+        """Returning the state of the system (all requests are pipelined in one transmission)
+        :return:    Class SystemState with information about pin state, system state and actual runtime of the system
+        """
+        ret = await self.execute_batch([(4, 0), (3, 0), (5, 0), (2, 0), (6, 0), (7, 0)])
+        return SystemState(
+            pins=DeviceAPI._decode_pin_state(ret[0]),
+            system=DeviceAPI._decode_system_state(ret[1]),
+            runtime=DeviceAPI._decode_runtime_sec(ret[2]),
+            clock=DeviceAPI._decode_system_clock_khz(ret[3]),
+            firmware=DeviceAPI._decode_firmware_version(ret[4]),
+            temp=DeviceAPI._decode_temp_mcu(ret[5])
+        )
+
+    def enable_led(self) -> None:
+        """Changing the state of the LED with enabling it"""
+        self.__write_without_feedback(8, 0)
+
+    def disable_led(self) -> None:
+        """Changing the state of the LED with disabling it"""
+        self.__write_without_feedback(9, 0)
+
+    def toggle_led(self) -> None:
+        """Changing the state of the LED with toggling it"""
+        self.__write_without_feedback(10, 0)
+
+    def update_daq_sampling_rate(self, sampling_rate: float) -> None:
+        """Updating the sampling rate of the DAQ
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :return:                None
+        """
+        if not 0 < sampling_rate <= 10e3:
+            raise ValueError(f"Sampling rate must be in range of (0, 10000] Hz")
+        self.__sampling_rate = sampling_rate
+        self.__write_without_feedback(13, int(sampling_rate))
+
+    async def start_daq(self) -> None:
+        """Changing the state of the DAQ with starting it, the decoded data is available with daq_chunks()
+        :return: None
+        """
+        self.__decoder.reset()
+        self.__stream = self.__device.start_stream()
+        self.__write_without_feedback(11, 0)
+        await asyncio.sleep(0)
+
+    async def stop_daq(self) -> None:
+        """Changing the state of the DAQ with stopping it, remaining data in the transport is discarded
+        :return: None
+        """
+        self.__write_without_feedback(12, 0)
+        await asyncio.sleep(max(0.05, 2 / self.__sampling_rate))
+        self.__stream = None
+        self.__device.stop_stream()
+
+    async def daq_chunks(self) -> AsyncIterator[np.ndarray]:
+        """Asynchronous iterator over all decoded DAQ frames until stop_daq() is called
+        :return:    Numpy structured arrays with decoded frames (datatype see get_daq_frame_datatype())
+        """
+        stream = self.__stream
+        if stream is None:
+            raise RuntimeError("DAQ is not started")
+        while True:
+            data = await stream.get()
+            if data is None:
+                break
+            frames = self.__decoder.decode(data)
+            if frames.size:
+                yield frames
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import pytest
+from api.mcu_api_async import AsyncDeviceAPI
+from api.mcu_sim import DeviceSimulator
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+
+
+@pytest.fixture(scope="module")
+def sim():
+    simulator = DeviceSimulator(seed=42)
+    simulator.start()
+    yield simulator
+    simulator.stop()
+
+
+def test_rpc(sim: DeviceSimulator):
+    async def run():
+        dut = AsyncDeviceAPI(com_name=sim.port_name)
+        await dut.open()
+        echo = await dut.echo("TESTS")
+        state = await dut.get_state()
+        dut.disable_led()
+        pins = await dut._get_pin_state()
+        dut.enable_led()
+        dut.close()
+        return echo, state, pins
+
+    echo, state, pins = asyncio.run(run())
+    assert echo == "TESTS"
+    assert state.system == "IDLE"
+    assert state.clock == 125000
+    assert pins == 'NONE'
+
+
+def test_multiple_devices_concurrent():
+    async def run(port_name: str) -> list:
+        dut = AsyncDeviceAPI(com_name=port_name)
+        await dut.open()
+        rslt = [await dut._get_runtime_sec() for _ in range(50)]
+        dut.close()
+        return rslt
+
+    async def run_all(ports: list[str]):
+        return await asyncio.gather(*[run(port) for port in ports])
+
+    sims = [DeviceSimulator(seed=idx) for idx in range(4)]
+    for sim in sims:
+        sim.start()
+    rslt = asyncio.run(run_all([sim.port_name for sim in sims]))
+    for sim in sims:
+        sim.stop()
+    for runtime in rslt:
+        assert len(runtime) == 50
+        assert all(t1 >= t0 for t0, t1 in zip(runtime[:-1], runtime[1:]))
+
+
+def test_daq_stream(sim: DeviceSimulator):
+    sampling_rate = 5000.
+
+    async def run() -> tuple[int, str]:
+        dut = AsyncDeviceAPI(com_name=sim.port_name)
+        await dut.open()
+        dut.update_daq_sampling_rate(sampling_rate)
+        await dut.start_daq()
+        num_frames = 0
+        async for frames in dut.daq_chunks():
+            num_frames += frames.size
+            if num_frames >= sampling_rate:
+                await dut.stop_daq()
+        state = await dut._get_system_state()
+        dut.close()
+        return num_frames, state
+
+    num_frames, state = asyncio.run(run())
+    assert num_frames >= sampling_rate
+    assert state == 'IDLE'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
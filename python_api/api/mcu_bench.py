@@ -0,0 +1,197 @@
+import json
+import numpy as np
+from dataclasses import dataclass, asdict, field
+from logging import getLogger, Logger
+from pathlib import Path
+from time import perf_counter
+
+from api.mcu_api import DeviceAPI
+
+
+def get_latency_percentiles(latency: np.ndarray, percentiles: tuple[float, ...]=(50., 90., 99., 99.9)) -> dict[str, float]:
+    """Calculating the percentiles of measured round-trip times
+    :param latency:     Numpy array with round-trip times [sec.]
+    :param percentiles: Tuple with percentiles to calculate [%]
+    :return:            Dictionary with percentile name (e.g. 'p50') and round-trip time [sec.]
+    """
+    values = np.percentile(latency, percentiles) if latency.size else np.full(len(percentiles), np.nan)
+    return {f"p{p:g}": float(val) for p, val in zip(percentiles, values)}
+
+
+@dataclass(frozen=True)
+class EchoReport:
+    """Dataclass with the results of the ECHO benchmark
+    Attributes:
+        num_requests:       Integer with number of round trips
+        num_batch:          Integer with number of pipelined ECHO commands in one round trip
+        latency_min:        Float with smallest round-trip time [sec.]
+        latency_mean:       Float with mean round-trip time [sec.]
+        latency_max:        Float with largest round-trip time [sec.]
+        percentiles:        Dictionary with percentiles of the round-trip time [sec.]
+        bytes_per_sec:      Float with transmitted payload (sent and received) per second
+    """
+    num_requests: int
+    num_batch: int
+    latency_min: float
+    latency_mean: float
+    latency_max: float
+    percentiles: dict[str, float]
+    bytes_per_sec: float
+
+
+@dataclass(frozen=True)
+class DaqReport:
+    """Dataclass with the results of the DAQ benchmark for one sampling rate
+    Attributes:
+        sampling_rate:      Float with configured sampling rate [Hz]
+        duration_sec:       Float with measured duration of the receiving [sec.]
+        num_frames:         Integer with number of decoded frames
+        num_lost:           Integer with number of lost frames detected from the sequence counter
+        num_resync:         Integer with number of resynchronization events of the decoder
+        frames_per_sec:     Float with sustained number of decoded frames per second
+        bytes_per_sec:      Float with sustained number of received bytes per second
+        loss_ratio:         Float with ratio of lost frames to all sent frames
+    """
+    sampling_rate: float
+    duration_sec: float
+    num_frames: int
+    num_lost: int
+    num_resync: int
+    frames_per_sec: float
+    bytes_per_sec: float
+    loss_ratio: float
+
+    @property
+    def is_lossless(self) -> bool:
+        """Returning True if no frame is lost and the sustained rate matches the sampling rate"""
+        return self.num_lost == 0 and self.num_resync == 0 and self.frames_per_sec >= 0.95 * self.sampling_rate
+
+
+@dataclass
+class LinkReport:
+    """Dataclass with the machine-readable report of the link benchmark
+    Attributes:
+        port:               String with name of the serial port
+        echo:               List with results of the ECHO benchmark
+        daq:                List with results of the DAQ benchmark for each sampling rate of the sweep
+        max_lossless_rate:  Float with the largest sampling rate without loss (0 if all rates have loss)
+    """
+    port: str
+    echo: list[EchoReport] = field(default_factory=list)
+    daq: list[DaqReport] = field(default_factory=list)
+    max_lossless_rate: float = 0.
+
+    def to_dict(self) -> dict:
+        """Returning the report as dictionary"""
+        return asdict(self)
+
+    def save(self, path: Path | str) -> None:
+        """Saving the report as JSON file
+        :param path:    Path to the JSON file
+        :return:        None
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class LinkBenchmark:
+    _logger: Logger
+    _device: DeviceAPI
+    _port: str
+    __frame_size: int = 15
+
+    def __init__(self, device: DeviceAPI, port: str="") -> None:
+        """Class for measuring the round-trip latency (ECHO command) and the sustained throughput (DAQ stream) of the link to one device
+        :param device:  Class DeviceAPI of the device (real or simulated port)
+        :param port:    String with name of the serial port for the report
+        :return:        None
+        """
+        self._logger = getLogger(__name__)
+        self._device = device
+        self._port = port
+
+    def run_echo(self, num_requests: int=200, num_batch: int=1) -> EchoReport:
+        """Measuring the round-trip time of ECHO commands
+        :param num_requests:    Integer with number of round trips
+        :param num_batch:       Integer with number of pipelined ECHO commands in one round trip (1 for single requests)
+        :return:                Class EchoReport with the results
+        """
+        commands = [(0, 0x4142 + idx % 16) for idx in range(num_batch)]
+        latency = np.zeros(num_requests)
+        for idx in range(num_requests):
+            time_start = perf_counter()
+            ret = self._device.execute_batch(commands)
+            latency[idx] = perf_counter() - time_start
+            if len(ret) != num_batch or any(len(val) != 3 for val in ret):
+                raise ValueError(f"Incomplete ECHO response: {ret}")
+
+        num_bytes = 2 * 3 * num_batch
+        return EchoReport(
+            num_requests=num_requests,
+            num_batch=num_batch,
+            latency_min=float(latency.min()),
+            latency_mean=float(latency.mean()),
+            latency_max=float(latency.max()),
+            percentiles=get_latency_percentiles(latency),
+            bytes_per_sec=float(num_requests * num_bytes / latency.sum())
+        )
+
+    def run_daq(self, sampling_rate: float, duration_sec: float=5.) -> DaqReport:
+        """Measuring the sustained throughput of the DAQ stream (incl. decoding on the host) for one sampling rate
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param duration_sec:    Float with duration of the receiving [sec.]
+        :return:                Class DaqReport with the results
+        """
+        self._device.update_daq_sampling_rate(sampling_rate)
+        self._device._start_daq_transport()
+        try:
+            num_frames = 0
+            time_start = perf_counter()
+            while perf_counter() - time_start < duration_sec:
+                data, _ = self._device._thread_read_batch()
+                num_frames += len(data)
+            duration = perf_counter() - time_start
+        finally:
+            self._device._stop_daq_transport()
+
+        stats = self._device.daq_statistics
+        return DaqReport(
+            sampling_rate=sampling_rate,
+            duration_sec=duration,
+            num_frames=num_frames,
+            num_lost=stats.num_lost,
+            num_resync=stats.num_resync,
+            frames_per_sec=num_frames / duration,
+            bytes_per_sec=(num_frames * self.__frame_size + stats.num_discarded) / duration,
+            loss_ratio=stats.num_lost / max(1, num_frames + stats.num_lost)
+        )
+
+    def sweep_daq(self, sampling_rates: list[float], duration_sec: float=5., stop_on_loss: bool=True) -> list[DaqReport]:
+        """Measuring the DAQ stream for increasing sampling rates up to the point of loss
+        :param sampling_rates:  List with sampling rates [Hz]
+        :param duration_sec:    Float with duration of each measurement [sec.]
+        :param stop_on_loss:    If true, the sweep is stopped after the first sampling rate with loss
+        :return:                List with class DaqReport for each measured sampling rate
+        """
+        reports = list()
+        for rate in sorted(sampling_rates):
+            reports.append(self.run_daq(rate, duration_sec))
+            self._logger.info(f"DAQ at {rate:.0f} Hz: {reports[-1].frames_per_sec:.1f} frames/s, {reports[-1].num_lost} lost")
+            if stop_on_loss and not reports[-1].is_lossless:
+                break
+        return reports
+
+    def run(self, sampling_rates: tuple[float, ...]=(500., 1000., 2000., 5000., 10000.), duration_sec: float=5., num_requests: int=200) -> LinkReport:
+        """Running the complete benchmark (single and pipelined ECHO, sweep of the DAQ sampling rate)
+        :param sampling_rates:  List with sampling rates of the DAQ sweep [Hz]
+        :param duration_sec:    Float with duration of each DAQ measurement [sec.]
+        :param num_requests:    Integer with number of round trips of the ECHO benchmark
+        :return:                Class LinkReport with all results
+        """
+        report = LinkReport(port=self._port)
+        report.echo = [self.run_echo(num_requests, num_batch) for num_batch in (1, 16)]
+        report.daq = self.sweep_daq(list(sampling_rates), duration_sec)
+        lossless = [rpt.sampling_rate for rpt in report.daq if rpt.is_lossless]
+        report.max_lossless_rate = max(lossless) if lossless else 0.
+        return report
@@ -0,0 +1,74 @@
+import os
+import json
+import numpy as np
+import pytest
+from api.mcu_api import DeviceAPI
+from api.mcu_bench import LinkBenchmark, get_latency_percentiles
+from api.mcu_sim import DeviceSimulator
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+
+
+@pytest.fixture
+def sim():
+    simulator = DeviceSimulator(seed=42)
+    simulator.start()
+    yield simulator
+    simulator.stop()
+
+
+@pytest.fixture
+def dut(sim: DeviceSimulator):
+    mcu_api = DeviceAPI(com_name=sim.port_name)
+    yield LinkBenchmark(mcu_api, port=sim.port_name)
+    mcu_api.close()
+
+
+def test_latency_percentiles():
+    rslt = get_latency_percentiles(np.arange(101) * 1e-3, percentiles=(50., 99.))
+    assert rslt == pytest.approx({'p50': 0.05, 'p99': 0.099})
+
+
+def test_echo(dut: LinkBenchmark):
+    single = dut.run_echo(num_requests=50)
+    batch = dut.run_echo(num_requests=50, num_batch=16)
+    assert 0 < single.latency_min <= single.percentiles['p50'] <= single.latency_max
+    assert batch.bytes_per_sec > single.bytes_per_sec
+
+
+def test_daq(dut: LinkBenchmark):
+    rslt = dut.run_daq(sampling_rate=2000., duration_sec=1.)
+    assert rslt.is_lossless
+    assert rslt.frames_per_sec == pytest.approx(2000., rel=0.05)
+    assert rslt.bytes_per_sec == pytest.approx(15 * rslt.frames_per_sec)
+
+
+def test_run_report(dut: LinkBenchmark, tmp_path):
+    rslt = dut.run(sampling_rates=(1000., 5000.), duration_sec=1., num_requests=20)
+    assert len(rslt.echo) == 2
+    assert [rpt.sampling_rate for rpt in rslt.daq] == [1000., 5000.]
+    assert rslt.max_lossless_rate == 5000.
+
+    rslt.save(tmp_path / "data" / "report.json")
+    with open(tmp_path / "data" / "report.json") as f:
+        report = json.load(f)
+    assert report["max_lossless_rate"] == 5000.
+    assert report["daq"][0]["sampling_rate"] == 1000.
+
+
+def test_sweep_stops_on_loss():
+    simulator = DeviceSimulator(drop_rate=1e-2, seed=1)
+    simulator.start()
+    mcu_api = DeviceAPI(com_name=simulator.port_name)
+    try:
+        rslt = LinkBenchmark(mcu_api).sweep_daq([1000., 2000., 5000.], duration_sec=1.)
+        assert len(rslt) == 1
+        assert rslt[0].num_lost > 0 and not rslt[0].is_lossless
+    finally:
+        mcu_api.close()
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
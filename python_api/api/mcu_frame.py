@@ -0,0 +1,224 @@
+import numpy as np
+from dataclasses import dataclass
+
+
+def get_daq_frame_datatype() -> np.dtype:
+    """Returning the structured datatype of one DAQ frame (see C-File: src/daq_sample.c in the firmware)"""
+    return np.dtype([
+        ('head', 'u1'),  # 1 Byte unsigned
+        ('index', 'u1'),  # 1 Byte unsigned
+        ('timestamp', '<u8'),  # 8 Byte unsigned
+        ('c0', '<u2'),  # 2 Byte signed short
+        ('c1', '<u2'),  # 2 Byte signed short
+        ('tail', 'u1'),  # 1 Byte unsigned
+    ])
+
+
+def get_sequence_deltas(index: np.ndarray, last: int=-1, modulo: int=256) -> np.ndarray:
+    """Calculating the wrap-aware difference between consecutive values of a sequence counter
+    :param index:   Numpy array with values of the sequence counter
+    :param last:    Integer with the last counter value before the array (negative if not available)
+    :param modulo:  Integer with the wrap-around value of the counter (256 for 8-bit)
+    :return:        Numpy array with differences in range [0, modulo), 1 for consecutive values (first value is 1 if last is not available)
+    """
+    index = index.astype(np.int64)
+    prev = np.empty_like(index)
+    if index.size:
+        prev[0] = last if last >= 0 else index[0] - 1
+        prev[1:] = index[:-1]
+    return (index - prev) % modulo
+
+
+def classify_sequence_deltas(deltas: np.ndarray, modulo: int=256) -> tuple[int, int, int]:
+    """Counting lost, duplicated and out-of-order frames from the deltas of get_sequence_deltas()
+    :param deltas:  Numpy array with wrap-aware differences of the sequence counter
+    :param modulo:  Integer with the wrap-around value of the counter (256 for 8-bit)
+    :return:        Tuple with number of lost frames, duplicated frames and out-of-order frames
+    """
+    forward = (deltas > 1) & (deltas < modulo // 2)
+    num_lost = int(np.sum(deltas[forward] - 1))
+    num_duplicated = int(np.count_nonzero(deltas == 0))
+    num_out_of_order = int(np.count_nonzero(deltas >= modulo // 2))
+    return num_lost, num_duplicated, num_out_of_order
+
+
+@dataclass(frozen=True)
+class FrameStatistics:
+    """Dataclass with the running counters of the DAQ frame decoder
+    Attributes:
+        num_frames:         Integer with number of successfully decoded frames
+        num_resync:         Integer with number of resynchronization events (sync lost and found again)
+        num_discarded:      Integer with number of bytes discarded while searching for the frame sync
+        num_lost:           Integer with number of lost frames detected from the sequence counter
+        num_duplicated:     Integer with number of duplicated frames detected from the sequence counter
+        num_out_of_order:   Integer with number of out-of-order frames detected from the sequence counter
+    """
+    num_frames: int
+    num_resync: int
+    num_discarded: int
+    num_lost: int = 0
+    num_duplicated: int = 0
+    num_out_of_order: int = 0
+
+    def to_list(self) -> list[int]:
+        """Returning all counters as list (e.g. for pushing them into a metrics stream)"""
+        return [self.num_frames, self.num_resync, self.num_discarded, self.num_lost, self.num_duplicated, self.num_out_of_order]
+
+    @staticmethod
+    def get_names() -> list[str]:
+        """Returning the names of all counters in the order of to_list()"""
+        return ['num_frames', 'num_resync', 'num_discarded', 'num_lost', 'num_duplicated', 'num_out_of_order']
+
+
+class FrameDecoder:
+    _dtype: np.dtype
+    _size: int
+    _head: int
+    _tail: int
+    _sequence: str | None
+    _last_index: int
+    _leftover: np.ndarray
+    _pending_discard: int
+    _num_frames: int
+    _num_resync: int
+    _num_discarded: int
+    _num_lost: int
+    _num_duplicated: int
+    _num_out_of_order: int
+
+    def __init__(self, dtype: np.dtype, head: int=0xA0, tail: int=0xFF, sequence: str | None=None) -> None:
+        """Stateful decoder for extracting fixed-size frames out of a continuous byte stream (see C-File: src/daq_sample.c in the firmware)
+        :param dtype:       Numpy structured datatype of one frame, the first byte is the head and the last byte is the tail
+        :param head:        Integer with the expected value of the head byte
+        :param tail:        Integer with the expected value of the tail byte
+        :param sequence:    String with name of the 8-bit sequence counter field for detecting lost frames (None to disable)
+        :return:            None
+        """
+        self._dtype = np.dtype(dtype)
+        self._size = self._dtype.itemsize
+        self._head = head
+        self._tail = tail
+        self._sequence = sequence
+        self.reset()
+
+    @property
+    def frame_size(self) -> int:
+        """Returning the number of bytes of one frame"""
+        return self._size
+
+    @property
+    def num_leftover(self) -> int:
+        """Returning the number of bytes which are kept for the next call"""
+        return self._leftover.size
+
+    @property
+    def statistics(self) -> FrameStatistics:
+        """Returning the running counters of the decoder"""
+        return FrameStatistics(
+            num_frames=self._num_frames,
+            num_resync=self._num_resync,
+            num_discarded=self._num_discarded,
+            num_lost=self._num_lost,
+            num_duplicated=self._num_duplicated,
+            num_out_of_order=self._num_out_of_order
+        )
+
+    def reset(self) -> None:
+        """Resetting the internal buffer and all counters
+        :return:    None
+        """
+        self._leftover = np.zeros(shape=(0,), dtype=np.uint8)
+        self._pending_discard = 0
+        self._num_frames = 0
+        self._num_resync = 0
+        self._num_discarded = 0
+        self._num_lost = 0
+        self._num_duplicated = 0
+        self._num_out_of_order = 0
+        self._last_index = -1
+
+    def _discard(self, num: int) -> None:
+        self._pending_discard += num
+        self._num_discarded += num
+
+    def _found_sync(self) -> None:
+        if self._pending_discard:
+            self._num_resync += 1
+            self._pending_discard = 0
+
+    def _update_sequence(self, frames: np.ndarray) -> None:
+        index = frames[self._sequence]
+        num_lost, num_duplicated, num_out_of_order = classify_sequence_deltas(get_sequence_deltas(index, self._last_index))
+        self._num_lost += num_lost
+        self._num_duplicated += num_duplicated
+        self._num_out_of_order += num_out_of_order
+        self._last_index = int(index[-1])
+
+    def _is_valid(self, raw: np.ndarray) -> np.ndarray:
+        """Returning a boolean mask with all positions in raw on which a complete frame with valid head and tail starts"""
+        if raw.size < self._size:
+            return np.zeros(shape=(0,), dtype=bool)
+        return (raw[:raw.size - self._size + 1] == self._head) & (raw[self._size - 1:] == self._tail)
+
+    def _decode_leftover(self, raw: np.ndarray) -> tuple[int, np.ndarray | None]:
+        """Decoding the frame which overlaps the leftover bytes of the last call and the new data
+        :param raw:     Numpy array with new data (at least frame size minus one byte)
+        :return:        Tuple with position in raw to continue the decoding and the overlapping frame (None if not available)
+        """
+        num_left = self._leftover.size
+        joint = np.concatenate((self._leftover, raw[:self._size - 1]))
+        valid = np.flatnonzero(self._is_valid(joint))
+        if valid.size:
+            pos = int(valid[0])
+            self._discard(pos)
+            self._found_sync()
+            frame = np.frombuffer(joint, dtype=self._dtype, count=1, offset=pos)
+            return pos + self._size - num_left, frame
+        else:
+            self._discard(num_left)
+            return 0, None
+
+    def decode(self, data: bytes | bytearray | memoryview) -> np.ndarray:
+        """Decoding all complete frames from new data in one pass, incomplete bytes at the end are kept for the next call
+        :param data:    Bytes-like object with new data from the device
+        :return:        Numpy structured array with all decoded frames (can be a view on data, copy it if data is reused)
+        """
+        raw = np.frombuffer(data, dtype=np.uint8)
+        if raw.size < self._size:
+            raw = np.concatenate((self._leftover, raw))
+            self._leftover = self._leftover[:0]
+
+        runs = list()
+        pos = 0
+        if self._leftover.size:
+            pos, frame = self._decode_leftover(raw)
+            if frame is not None:
+                runs.append(frame)
+        valid = self._is_valid(raw)
+        while pos < valid.size:
+            if not valid[pos]:
+                next_valid = np.flatnonzero(valid[pos:])
+                if not next_valid.size:
+                    break
+                self._discard(int(next_valid[0]))
+                pos += int(next_valid[0])
+            self._found_sync()
+            aligned = valid[pos::self._size]
+            num = aligned.size if aligned.all() else int(np.argmin(aligned))
+            runs.append(np.frombuffer(raw, dtype=self._dtype, count=num, offset=pos))
+            pos += num * self._size
+
+        keep = max(pos, raw.size - self._size + 1)
+        self._discard(keep - pos)
+        self._leftover = raw[keep:].copy()
+
+        if not runs:
+            frames = np.zeros(shape=(0,), dtype=self._dtype)
+        elif len(runs) == 1:
+            frames = runs[0]
+        else:
+            frames = np.concatenate(runs)
+        self._num_frames += frames.size
+        if self._sequence is not None and frames.size:
+            self._update_sequence(frames)
+        return frames
@@ -0,0 +1,99 @@
+import pytest
+import numpy as np
+from .mcu_frame import FrameDecoder, FrameStatistics, get_sequence_deltas, classify_sequence_deltas
+
+
+@pytest.fixture
+def dtype() -> np.dtype:
+    return np.dtype([
+        ('head', 'u1'),
+        ('index', 'u1'),
+        ('timestamp', '<u8'),
+        ('c0', '<u2'),
+        ('c1', '<u2'),
+        ('tail', 'u1'),
+    ])
+
+
+def build_stream(dtype: np.dtype, num: int) -> bytes:
+    frames = np.zeros(shape=(num,), dtype=dtype)
+    frames['head'] = 0xA0
+    frames['index'] = np.arange(num) % 256
+    frames['timestamp'] = 1000 * np.arange(num)
+    frames['c0'] = np.arange(num)
+    frames['c1'] = 2 * np.arange(num)
+    frames['tail'] = 0xFF
+    return frames.tobytes()
+
+
+def test_decode_aligned(dtype: np.dtype):
+    dut = FrameDecoder(dtype)
+    rslt = dut.decode(build_stream(dtype, 100))
+    assert rslt.size == 100
+    np.testing.assert_array_equal(rslt['c0'], np.arange(100))
+    assert dut.num_leftover == 0
+    assert dut.statistics == FrameStatistics(num_frames=100, num_resync=0, num_discarded=0)
+
+
+def test_decode_split_reads(dtype: np.dtype):
+    dut = FrameDecoder(dtype)
+    stream = build_stream(dtype, 100)
+    rslt = [dut.decode(stream[idx:idx + 7]) for idx in range(0, len(stream), 7)]
+    rslt = np.concatenate(rslt)
+    assert rslt.size == 100
+    np.testing.assert_array_equal(rslt['c0'], np.arange(100))
+    assert dut.statistics.num_resync == 0
+
+
+def test_decode_dropped_byte(dtype: np.dtype):
+    dut = FrameDecoder(dtype)
+    stream = bytearray(build_stream(dtype, 50))
+    del stream[20 * dtype.itemsize + 3]
+    rslt = np.concatenate([dut.decode(stream[idx:idx + 64]) for idx in range(0, len(stream), 64)])
+    assert rslt.size == 49
+    np.testing.assert_array_equal(rslt['c0'], np.delete(np.arange(50), 20))
+    assert dut.statistics.num_resync == 1
+    assert dut.statistics.num_discarded == dtype.itemsize - 1
+
+
+def test_decode_extra_bytes(dtype: np.dtype):
+    dut = FrameDecoder(dtype)
+    stream = bytearray(build_stream(dtype, 50))
+    stream[10 * dtype.itemsize:10 * dtype.itemsize] = b'\x01\x02\x03'
+    rslt = dut.decode(stream)
+    assert rslt.size == 50
+    np.testing.assert_array_equal(rslt['c0'], np.arange(50))
+    assert dut.statistics.num_resync == 1
+    assert dut.statistics.num_discarded == 3
+
+
+def test_sequence_deltas():
+    index = np.array([254, 255, 0, 1, 3, 3, 2, 4], dtype=np.uint8)
+    deltas = get_sequence_deltas(index, last=253)
+    np.testing.assert_array_equal(deltas, [1, 1, 1, 1, 2, 0, 255, 2])
+    assert classify_sequence_deltas(deltas) == (2, 1, 1)
+
+
+def test_decode_sequence_gaps(dtype: np.dtype):
+    dut = FrameDecoder(dtype, sequence='index')
+    stream = bytearray(build_stream(dtype, 600))
+    del stream[300 * dtype.itemsize:310 * dtype.itemsize]
+    del stream[20 * dtype.itemsize + 3]
+    rslt = np.concatenate([dut.decode(stream[idx:idx + 100]) for idx in range(0, len(stream), 100)])
+    assert rslt.size == 589
+    assert dut.statistics.num_lost == 11
+    assert dut.statistics.num_duplicated == 0
+    assert dut.statistics.num_out_of_order == 0
+
+
+def test_decode_reset(dtype: np.dtype):
+    dut = FrameDecoder(dtype)
+    dut.decode(build_stream(dtype, 10)[:-4])
+    assert dut.num_leftover == dtype.itemsize - 4
+    dut.reset()
+    assert dut.num_leftover == 0
+    assert dut.statistics.num_frames == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
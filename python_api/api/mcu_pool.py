@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger, Logger
+from time import sleep
+from tqdm import tqdm
+
+from api.interface import get_comport_names
+from api.mcu_api import DeviceAPI, SystemState
+
+
+class DevicePool:
+    _logger: Logger
+    _devices: dict[str, DeviceAPI]
+    _ports: dict[str, str]
+    __usb_vid: int = 0x2E8A
+
+    def __init__(self, com_names: list[str] | None=None, prefix: str="data", timeout: float=1.) -> None:
+        """Class for handling several devices on one host with own LSL stream and recorder for each device
+        :param com_names:   List with serial port names of the devices (None for discovering all connected devices)
+        :param prefix:      String with prefix of the LSL stream names (e.g. data_0, data_1, ...)
+        :param timeout:     Floating value with timeout for the communication [Default, not during DAQ]
+        :return:            None
+        """
+        self._logger = getLogger(__name__)
+        ports = com_names if com_names is not None else get_comport_names(usb_vid=self.__usb_vid)
+        if not len(ports):
+            raise ConnectionError("No device for the pool available")
+        self._ports = {f"{prefix}_{idx}": port for idx, port in enumerate(ports)}
+        self._devices = dict()
+        try:
+            for name, port in self._ports.items():
+                self._devices[name] = DeviceAPI(com_name=port, timeout=timeout)
+        except Exception:
+            for dev in self._devices.values():
+                dev.close()
+            raise
+
+    @property
+    def names(self) -> list[str]:
+        """Returning the stream names of all devices in the pool"""
+        return list(self._devices.keys())
+
+    @property
+    def ports(self) -> dict[str, str]:
+        """Returning a dictionary with the serial port of each stream name"""
+        return self._ports
+
+    @property
+    def devices(self) -> dict[str, DeviceAPI]:
+        """Returning a dictionary with the device handler of each stream name"""
+        return self._devices
+
+    @property
+    def is_daq_running(self) -> bool:
+        """Returning if DAQ is still running on all devices"""
+        return all(self._run_parallel(lambda name, dev: dev.is_daq_running).values())
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __getitem__(self, name: str) -> DeviceAPI:
+        return self._devices[name]
+
+    def _run_parallel(self, func) -> dict:
+        """Running a function with stream name and device as arguments in parallel and returning the results for each stream name"""
+        with ThreadPoolExecutor(max_workers=len(self._devices)) as executor:
+            futures = {name: executor.submit(func, name, dev) for name, dev in self._devices.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def close(self) -> None:
+        """Closing the serial communication to all devices"""
+        for dev in self._devices.values():
+            dev.close()
+
+    def do_reset(self) -> None:
+        """Performing a Software Reset on all devices in parallel"""
+        self._run_parallel(lambda name, dev: dev.do_reset())
+
+    def get_state(self) -> dict[str, SystemState]:
+        """Returning the state of all devices"""
+        return self._run_parallel(lambda name, dev: dev.get_state())
+
+    def sync_clock(self, num_probes: int=16) -> dict[str, float]:
+        """Aligning the runtime of all devices to the common host clock (pylsl.local_clock)
+        :param num_probes:  Integer with number of runtime requests for each device
+        :return:            Dictionary with offset between host and device clock [sec.] for each stream name
+        """
+        return self._run_parallel(lambda name, dev: dev.sync_clock(num_probes))
+
+    def update_daq_sampling_rate(self, sampling_rate: float) -> None:
+        """Updating the sampling rate of the DAQ on all devices
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :return:                None
+        """
+        for dev in self._devices.values():
+            dev.update_daq_sampling_rate(sampling_rate)
+
+    def start_daq(self, do_plot: bool=False, window_sec: float=30., track_util: bool=False, folder_name: str="data", use_processes: bool=False) -> None:
+        """Starting the DAQ on all devices in parallel with timestamps aligned to the host clock (see DeviceAPI.sync_clock)
+        :param do_plot:         True to plot the data of each device in real-time
+        :param window_sec:      Floating value with window length [in seconds] for live plotting
+        :param track_util:      If true, the utilization of the host computer will be tracked once (with the first device)
+        :param folder_name:     String with folder name to save data in project folder
+        :param use_processes:   If true, recording, utilization and plotting of each device run in own processes
+        :return:                None
+        """
+        first = self.names[0]
+        self._run_parallel(lambda name, dev: dev.start_daq(
+            do_plot=do_plot,
+            window_sec=window_sec,
+            track_util=track_util and name == first,
+            folder_name=folder_name,
+            name=name,
+            use_processes=use_processes
+        ))
+
+    def stop_daq(self) -> None:
+        """Stopping the DAQ on all devices in parallel"""
+        self._run_parallel(lambda name, dev: dev.stop_daq())
+
+    def wait_daq(self, time_sec: float) -> None:
+        """Waiting Routine incl. returning possible thread errors of all devices
+        :param time_sec:    Float with time value for waiting
+        :return:            None
+        """
+        sleep(1.)
+        for _ in tqdm(range(int(time_sec))):
+            for dev in self._devices.values():
+                dev.check_daq()
+            sleep(1.)
@@ -0,0 +1,79 @@
+import os
+import h5py
+import numpy as np
+import pytest
+from pathlib import Path
+from shutil import rmtree
+from pylsl import local_clock
+from api.mcu_api import DeviceAPI, get_path_to_project
+from api.mcu_pool import DevicePool
+from api.mcu_sim import DeviceSimulator
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+
+
+@pytest.fixture(scope="module")
+def sims():
+    simulators = [DeviceSimulator(seed=idx, boot_offset_sec=1000. * idx) for idx in range(2)]
+    for sim in simulators:
+        sim.start()
+    yield simulators
+    for sim in simulators:
+        sim.stop()
+    rmtree(get_path_to_project("temp_pool"), ignore_errors=True)
+
+
+def test_pool_init(sims: list[DeviceSimulator]):
+    dut = DevicePool(com_names=[sim.port_name for sim in sims])
+    assert len(dut) == 2
+    assert dut.names == ["data_0", "data_1"]
+    assert dut.ports["data_1"] == sims[1].port_name
+    states = dut.get_state()
+    assert all([state.system == "IDLE" for state in states.values()])
+    dut.close()
+
+
+def test_pool_init_error(sims: list[DeviceSimulator], monkeypatch: pytest.MonkeyPatch):
+    closed = list()
+    close = DeviceAPI.close
+    monkeypatch.setattr(DeviceAPI, "close", lambda self: closed.append(self) or close(self))
+    with pytest.raises(Exception):
+        DevicePool(com_names=[sims[0].port_name, "/dev/not_available"])
+    assert len(closed) == 1
+
+
+def test_pool_sync_clock(sims: list[DeviceSimulator]):
+    dut = DevicePool(com_names=[sim.port_name for sim in sims])
+    offsets = dut.sync_clock(num_probes=8)
+    assert set(offsets.keys()) == set(dut.names)
+    for dev in dut.devices.values():
+        assert dev.clock.is_synced
+        assert abs(dev.clock.to_host(dev._get_runtime_sec()) - local_clock()) < 5e-3
+    dut.close()
+
+
+def test_pool_daq(sims: list[DeviceSimulator]):
+    dut = DevicePool(com_names=[sim.port_name for sim in sims])
+    dut.update_daq_sampling_rate(1000.)
+    dut.start_daq(folder_name="temp_pool")
+    dut.wait_daq(3.)
+    dut.stop_daq()
+    dut.close()
+
+    files = list(Path(get_path_to_project("temp_pool")).glob("*.h5"))
+    assert len(files) == 2
+    for name, sim in zip(["data_0", "data_1"], sims):
+        file = [file for file in files if file.stem.endswith(name)]
+        assert len(file) == 1
+        with h5py.File(file[0], "r") as f:
+            assert f["time"].size > 2000
+            time = f["time"][:2000]
+            counter = f["data"][:2000, 2]
+        # Mapped timestamps of both devices (different boot times) agree with the host clock at sampling
+        iteration = sim.num_frames_start + (counter - sim.num_frames_start) % 4096
+        assert np.max(np.abs(time - sim.get_sample_time(iteration))) < 5e-3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
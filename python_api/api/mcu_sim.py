@@ -0,0 +1,272 @@
+import os
+import numpy as np
+from logging import getLogger, Logger
+from select import select
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep
+
+
+class DeviceSimulator:
+    _logger: Logger
+    _master: int
+    _slave: int
+    _port_name: str
+    _event: Event
+    _daq_event: Event
+    _lock: Lock
+    _threads: list[Thread]
+    _rng: np.random.Generator
+    _boot_time: float
+    _boot_offset: float
+    _daq_start: tuple[float, int, float]
+    _led_state: bool
+    _system_state: int
+    _sampling_rate: float
+    _jitter_sec: float
+    _drop_rate: float
+    _corrupt_rate: float
+    _clock_khz: int
+    _firmware: tuple[int, int]
+    _temp_raw: int
+    _num_frames: int
+    _num_overflow: int
+
+    def __init__(self, sampling_rate: float=4., jitter_sec: float=0., drop_rate: float=0., corrupt_rate: float=0.,
+                 clock_khz: int=125000, firmware: tuple[int, int]=(0, 1), temp_raw: int=880, seed: int | None=None,
+                 boot_offset_sec: float=0.) -> None:
+        """Class for simulating the firmware (RPC protocol and DAQ stream) on a Linux pseudo-terminal without any hardware
+        :param sampling_rate:   Floating value with initial sampling rate of the DAQ [Hz]
+        :param jitter_sec:      Floating value with standard deviation of the additional delay of each transmitted DAQ chunk [sec.]
+        :param drop_rate:       Floating value with probability that a byte of the DAQ stream is dropped
+        :param corrupt_rate:    Floating value with probability that a byte of the DAQ stream is corrupted
+        :param clock_khz:       Integer with simulated system clock [kHz]
+        :param firmware:        Tuple with simulated firmware version (major, minor)
+        :param temp_raw:        Integer with raw ADC value of the simulated temperature sensor
+        :param seed:            Seed of the random number generator (None for random)
+        :param boot_offset_sec: Floating value with runtime of the simulated device at the start of the simulator [sec.]
+        :return:                None
+        """
+        self._logger = getLogger(__name__)
+        self._sampling_rate = sampling_rate
+        self._jitter_sec = jitter_sec
+        self._drop_rate = drop_rate
+        self._corrupt_rate = corrupt_rate
+        self._clock_khz = clock_khz
+        self._firmware = firmware
+        self._temp_raw = temp_raw
+        self._rng = np.random.default_rng(seed)
+        self._boot_offset = boot_offset_sec
+        self._daq_start = (0., 0, 1.)
+        self._event = Event()
+        self._daq_event = Event()
+        self._lock = Lock()
+        self._threads = list()
+        self._master = -1
+        self._slave = -1
+        self._port_name = ''
+        self._num_overflow = 0
+        self._do_reset()
+
+    @property
+    def port_name(self) -> str:
+        """Returning the name of the serial port for the host (e.g. DeviceAPI(com_name=...))"""
+        return self._port_name
+
+    @property
+    def is_running(self) -> bool:
+        """Returning True if the simulator is running"""
+        return self._event.is_set()
+
+    @property
+    def is_daq_running(self) -> bool:
+        """Returning True if the simulated DAQ is sending frames"""
+        return self._daq_event.is_set()
+
+    @property
+    def sampling_rate(self) -> float:
+        """Returning the actual sampling rate of the simulated DAQ [Hz]"""
+        return self._sampling_rate
+
+    @property
+    def num_frames(self) -> int:
+        """Returning the number of DAQ frames generated since last start of the DAQ"""
+        return self._num_frames
+
+    @property
+    def num_frames_start(self) -> int:
+        """Returning the iteration counter of the first DAQ frame of the last DAQ start"""
+        return self._daq_start[1]
+
+    def get_sample_time(self, iteration: np.ndarray) -> np.ndarray:
+        """Returning the time of the host clock (perf_counter) at which DAQ frames of the last DAQ start were sampled
+        :param iteration:   Numpy array with iteration counter of the frames (not wrapped)
+        :return:            Numpy array with sampling time of each frame [sec.]
+        """
+        time_start, num_start, sampling_rate = self._daq_start
+        return time_start + (np.asarray(iteration) - num_start + 1) / sampling_rate
+
+    @property
+    def num_overflow(self) -> int:
+        """Returning the number of bytes which are lost because the host did not read the port"""
+        return self._num_overflow
+
+    def start(self) -> None:
+        """Opening the pseudo-terminal and starting the simulation threads
+        :return:    None
+        """
+        from tty import setraw
+        if self.is_running:
+            self.stop()
+        self._master, self._slave = os.openpty()
+        setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self._port_name = os.ttyname(self._slave)
+        self._do_reset()
+        self._event.set()
+        self._threads = [
+            Thread(target=self._thread_rpc, args=(), daemon=True),
+            Thread(target=self._thread_daq, args=(), daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stopping all simulation threads and closing the pseudo-terminal
+        :return:    None
+        """
+        self._daq_event.clear()
+        self._event.clear()
+        for thread in self._threads:
+            thread.join(timeout=1.)
+        self._threads = list()
+        for fd in (self._master, self._slave):
+            if fd >= 0:
+                os.close(fd)
+        self._master = -1
+        self._slave = -1
+
+    def _do_reset(self) -> None:
+        self._daq_event.clear()
+        self._boot_time = perf_counter() - self._boot_offset
+        self._led_state = True
+        self._system_state = 3
+        self._num_frames = 0
+
+    def _get_runtime_us(self, time: float) -> int:
+        return int(1e6 * (time - self._boot_time))
+
+    def _send(self, data: bytes, timeout: float=0.1) -> None:
+        with self._lock:
+            view = memoryview(data)
+            while view.nbytes and self._event.is_set():
+                if not select([], [self._master], [], timeout)[1]:
+                    self._num_overflow += view.nbytes
+                    return
+                try:
+                    num = os.write(self._master, view)
+                except BlockingIOError:
+                    num = 0
+                view = view[num:]
+
+    def _apply_command(self, buffer: bytes) -> None:
+        """Processing one command like apply_rpc_callback() in firmware/callbacks/rpc_callbacks.c
+        :param buffer:  Bytes with command in the order of the firmware buffer [head, data_high, data_low]
+        :return:        None
+        """
+        match buffer[0]:
+            case 0:     # ECHO
+                self._send(buffer)
+            case 1:     # RESET
+                self._do_reset()
+            case 2:     # CLOCK_SYS
+                self._send(bytes([2]) + (self._clock_khz // 10).to_bytes(2, 'little'))
+            case 3:     # STATE_SYS
+                self._send(bytes([3, 0, self._system_state]))
+            case 4:     # STATE_PIN
+                self._send(bytes([4, 2, int(self._led_state)]))
+            case 5:     # RUNTIME
+                self._send(bytes([5]) + self._get_runtime_us(perf_counter()).to_bytes(8, 'little'))
+            case 6:     # FIRMWARE
+                self._send(bytes([6, self._firmware[0], self._firmware[1]]))
+            case 7:     # TEMP_MCU
+                self._send(bytes([7]) + self._temp_raw.to_bytes(2, 'little'))
+            case 8:     # ENABLE_LED
+                self._led_state = True
+            case 9:     # DISABLE_LED
+                self._led_state = False
+            case 10:    # TOGGLE_LED
+                self._led_state = not self._led_state
+            case 11:    # START_DAQ
+                self._system_state = 5
+                self._num_frames = 0
+                self._daq_event.set()
+            case 12:    # STOP_DAQ
+                self._system_state = 3
+                self._daq_event.clear()
+            case 13:    # UPDATE_DAQ
+                rate = (buffer[1] << 8) | buffer[2]
+                if rate > 0:
+                    self._sampling_rate = float(rate)
+            case _:
+                self._system_state = 0
+
+    def _thread_rpc(self) -> None:
+        received = bytearray()
+        while self._event.is_set():
+            try:
+                if not select([self._master], [], [], 0.1)[0]:
+                    continue
+                received += os.read(self._master, 4096)
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError:
+                break
+            num = len(received) - len(received) % 3
+            for idx in range(0, num, 3):
+                self._apply_command(bytes(received[idx:idx + 3][::-1]))
+            del received[:num]
+
+    def _build_frames(self, iteration: np.ndarray, runtime: np.ndarray) -> np.ndarray:
+        frames = np.zeros(shape=(iteration.size, 15), dtype=np.uint8)
+        frames[:, 0] = 0xA0
+        frames[:, 1] = iteration % 256
+        frames[:, 2:10] = runtime.astype('<u8').view(np.uint8).reshape(-1, 8)
+        ch0 = (2048 + 2000 * np.sin(2 * np.pi * 10. * runtime * 1e-6)).astype('<u2')
+        ch1 = (iteration % 4096).astype('<u2')
+        frames[:, 10:12] = ch0.view(np.uint8).reshape(-1, 2)
+        frames[:, 12:14] = ch1.view(np.uint8).reshape(-1, 2)
+        frames[:, 14] = 0xFF
+        return frames.reshape(-1)
+
+    def _apply_link_errors(self, stream: np.ndarray) -> np.ndarray:
+        if self._corrupt_rate > 0.:
+            pos = np.flatnonzero(self._rng.random(stream.size) < self._corrupt_rate)
+            stream[pos] ^= self._rng.integers(1, 256, size=pos.size, dtype=np.uint8)
+        if self._drop_rate > 0.:
+            stream = stream[self._rng.random(stream.size) >= self._drop_rate]
+        return stream
+
+    def _thread_daq(self) -> None:
+        while self._event.is_set():
+            if not self._daq_event.wait(timeout=0.1):
+                continue
+            sampling_rate = self._sampling_rate
+            period = max(1e-3, 1 / sampling_rate)
+            time_start = perf_counter()
+            deadline = time_start
+            num_sent = self._num_frames
+            self._daq_start = (time_start, num_sent, sampling_rate)
+            while self._daq_event.is_set() and self._event.is_set() and sampling_rate == self._sampling_rate:
+                deadline += period
+                jitter = abs(self._rng.normal(0., self._jitter_sec)) if self._jitter_sec > 0. else 0.
+                sleep(max(0., deadline + jitter - perf_counter()))
+
+                num_due = int((perf_counter() - time_start) * sampling_rate) - (self._num_frames - num_sent)
+                if num_due <= 0:
+                    continue
+                iteration = np.arange(self._num_frames, self._num_frames + num_due, dtype=np.int64)
+                sample_time = time_start + (iteration - num_sent + 1) / sampling_rate
+                runtime = ((sample_time - self._boot_time) * 1e6).astype(np.int64)
+                stream = self._apply_link_errors(self._build_frames(iteration, runtime))
+                self._send(stream.tobytes())
+                self._num_frames += num_due
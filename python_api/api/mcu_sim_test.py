@@ -0,0 +1,189 @@
+import json
+import os
+import h5py
+import pytest
+from pathlib import Path
+from shutil import rmtree
+from time import sleep
+from api.mcu_api import (
+    get_path_to_project,
+    DeviceAPI
+)
+from api.clock_sync import ClockSync
+from api.data_api import DataAPI
+from api.host_telemetry import get_telemetry_names
+from api.mcu_sim import DeviceSimulator
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="Pseudo-terminal is not available")
+
+
+@pytest.fixture(scope="module")
+def sim():
+    simulator = DeviceSimulator(seed=42)
+    simulator.start()
+    yield simulator
+    simulator.stop()
+    rmtree(get_path_to_project("temp_data"), ignore_errors=True)
+
+
+@pytest.fixture
+def dut(sim: DeviceSimulator):
+    mcu_api = DeviceAPI(com_name=sim.port_name)
+    yield mcu_api
+    mcu_api.close()
+
+
+def test_check_echo(dut: DeviceAPI):
+    test_pattern = "TESTS"
+    ret = dut.echo(test_pattern)
+    assert ret == test_pattern
+
+
+def test_check_system_state_class(dut: DeviceAPI):
+    rslt = dut.get_state()
+    assert rslt.system == "IDLE"
+    assert rslt.pins == "LED_USER"
+    assert rslt.runtime > 0
+    assert rslt.clock == 125000
+    assert rslt.firmware == "0.1"
+    assert 20. < rslt.temp < 36.
+
+
+def test_execute_batch(dut: DeviceAPI):
+    rslt = dut.execute_batch([(9, 0), (4, 0), (8, 0), (4, 0), (5, 0), (0, 0x4142)])
+    assert rslt[0] == bytes()
+    assert dut._decode_pin_state(rslt[1]) == 'NONE'
+    assert rslt[2] == bytes()
+    assert dut._decode_pin_state(rslt[3]) == 'LED_USER'
+    assert dut._decode_runtime_sec(rslt[4]) > 0.
+    assert rslt[5] == bytes([0, 0x41, 0x42])
+
+
+def test_check_runtime(dut: DeviceAPI):
+    wait_time_sec = 0.25
+
+    time0 = dut._get_runtime_sec()
+    sleep(wait_time_sec)
+    time1 = dut._get_runtime_sec()
+    assert 0.8 * wait_time_sec < time1 - time0 < 1.25 * wait_time_sec
+
+
+def test_toggle_led(dut: DeviceAPI):
+    dut.disable_led()
+    assert dut._get_pin_state() == 'NONE'
+    dut.toggle_led()
+    assert 'LED' in dut._get_pin_state()
+    dut.enable_led()
+    assert 'LED' in dut._get_pin_state()
+
+
+def test_control_daq(sim: DeviceSimulator, dut: DeviceAPI):
+    sampling_rate = 10000.
+    dut.update_daq_sampling_rate(sampling_rate)
+    sleep(0.1)
+    assert sim.sampling_rate == sampling_rate
+
+    dut.start_daq(folder_name="temp_data")
+    dut.wait_daq(3.)
+    assert sim.is_daq_running
+    path = Path(get_path_to_project("temp_data"))
+    with h5py.File(path / "99991231_235959_data_0.h5", "w") as f:
+        f.create_dataset("time", data=[0.])
+    dut.stop_daq()
+    assert not sim.is_daq_running
+    assert dut._get_system_state() == 'IDLE'
+    with h5py.File(path / "99991231_235959_data_0.h5", "r") as f:
+        assert "clock_reference" not in f.attrs
+    (path / "99991231_235959_data_0.h5").unlink()
+    with h5py.File(sorted(path.glob("*[0-9]_data.h5"))[-1], "r") as f:
+        assert f.attrs["clock_reference"] > 0.
+
+    stats = dut.daq_statistics
+    assert stats.num_frames > 0.9 * 3. * sampling_rate
+    assert stats.num_frames <= sim.num_frames
+    assert stats.num_resync == 0
+
+
+def test_control_daq_restart(sim: DeviceSimulator, dut: DeviceAPI):
+    dut.update_daq_sampling_rate(10000.)
+    for _ in range(10):
+        dut._start_daq_transport()
+        sleep(0.2)
+        dut._stop_daq_transport()
+        assert dut._get_system_state() == 'IDLE'
+    assert not sim.is_daq_running
+
+
+def test_control_daq_processes(sim: DeviceSimulator, dut: DeviceAPI):
+    dut.update_daq_sampling_rate(10000.)
+    dut.start_daq(folder_name="temp_data", name="data_proc", track_metrics=True, use_processes=True)
+    dut.wait_daq(3.)
+    latency = dut.daq_latency
+    dut.stop_daq()
+    assert dut._get_system_state() == 'IDLE'
+    assert latency[0].name == 'lsl_stream_data(data_proc)'
+    assert latency[0].num_chunks > 0 and latency[1].num_chunks > 0
+    assert latency[0].p50_sec <= latency[1].p50_sec < 1.
+
+    path = Path(get_path_to_project("temp_data"))
+    with open(sorted(path.glob("*_data_proc_latency.json"))[-1]) as f:
+        assert [stage["name"] for stage in json.load(f)["stages"]][:2] == ['lsl_stream_data(data_proc)', 'lsl_record_stream(data_proc)']
+    with h5py.File(sorted(path.glob("*[0-9]_data_proc.h5"))[-1], "r") as f:
+        assert f["data"].shape[0] > 0.9 * 3. * 10000.
+        assert f.attrs["clock_reference"] > 0.
+    with h5py.File(sorted(path.glob("*_metrics_data_proc.h5"))[-1], "r") as f:
+        assert f["data"].shape[0] > 10
+
+
+def test_control_daq_single_file(sim: DeviceSimulator, dut: DeviceAPI):
+    dut.update_daq_sampling_rate(10000.)
+    dut.start_daq(folder_name="temp_data", name="data_single", track_util=True, track_metrics=True, single_file=True)
+    dut.wait_daq(3.)
+    dut.stop_daq()
+    assert dut._get_system_state() == 'IDLE'
+
+    path = Path(get_path_to_project("temp_data"))
+    file = sorted(path.glob("*[0-9]_data_single.h5"))[-1]
+    with h5py.File(file, "r") as f:
+        assert list(f.attrs["streams"]) == ['data_single', 'util', 'metrics_data_single']
+        assert f["data_single/data"].shape[0] > 0.9 * 3. * 10000.
+        assert f["data_single/gaps"].shape[0] == 0
+        assert f["util/data"].shape[0] >= 4
+        assert f["metrics_data_single/data"].shape[0] > 10
+        assert [key in f["data_single"].attrs for key in ClockSync.get_parameter_names()] == [True, True, True]
+    reader = DataAPI(path, data_prefix="data_single")
+    files = reader.get_overview_data()
+    idx = files.index(file.absolute())
+    assert reader.get_file_name_util(idx) == str(file.absolute())
+    assert reader.read_utilization_file(idx).num_channels == len(get_telemetry_names()) + 2
+    assert reader.read_data_file(idx).time.size > 0.9 * 3. * 10000.
+
+
+def test_control_daq_link_errors():
+    sim = DeviceSimulator(sampling_rate=2000., drop_rate=1e-4, corrupt_rate=1e-4, jitter_sec=1e-3, seed=1)
+    sim.start()
+    dut = DeviceAPI(com_name=sim.port_name)
+    dut.update_daq_sampling_rate(2000.)
+    dut.start_daq(folder_name="temp_data", name="data_err", track_metrics=True)
+    dut.wait_daq(3.)
+    dut.stop_daq()
+    dut.close()
+    sim.stop()
+
+    stats = dut.daq_statistics
+    assert stats.num_frames > 0.9 * 3. * 2000.
+    assert stats.num_resync > 0
+    assert stats.num_lost > 0
+
+    path = Path(get_path_to_project("temp_data"))
+    with h5py.File(sorted(path.glob("*[0-9]_data_err.h5"))[-1], "r") as f:
+        assert f["gaps"].shape[0] > 0
+        assert f["gaps"].attrs["num_lost"] > 0
+    with h5py.File(sorted(path.glob("*_metrics_data_err.h5"))[-1], "r") as f:
+        assert list(f.attrs["channel_names"]) == DeviceAPI._get_daq_metrics_names()
+        assert f["data"][-1, 3] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
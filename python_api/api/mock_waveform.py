@@ -0,0 +1,90 @@
+import numpy as np
+from api.mcu_frame import get_sequence_deltas, classify_sequence_deltas
+
+
+def get_waveform_names() -> list[str]:
+    """Returning the names of all available waveforms of generate_waveform()"""
+    return ['sinusoid', 'noise', 'ramp', 'counter']
+
+
+def generate_sinusoid(sample_index: np.ndarray, sampling_rate: float, channel_num: int, frequency: float=10., amplitude: float=2**14) -> np.ndarray:
+    """Generating sinusoidal signals with a frequency of (channel + 1) * frequency for each channel
+    :param sample_index:    Numpy array with index of each sample since start of the stream
+    :param sampling_rate:   Float with sampling rate [Hz]
+    :param channel_num:     Integer with number of channels
+    :param frequency:       Float with frequency of the first channel [Hz]
+    :param amplitude:       Float with amplitude of the signals
+    :return:                Numpy array with shape (num_samples, channel_num) and datatype np.int16
+    """
+    phase = (2 * np.pi * frequency / sampling_rate) * sample_index[:, None] * np.arange(1, channel_num + 1)[None, :]
+    return (amplitude * np.sin(phase)).astype(np.int16)
+
+
+def generate_noise(sample_index: np.ndarray, channel_num: int, rng: np.random.Generator, amplitude: float=2**12) -> np.ndarray:
+    """Generating gaussian white noise for each channel
+    :param sample_index:    Numpy array with index of each sample since start of the stream
+    :param channel_num:     Integer with number of channels
+    :param rng:             Numpy random generator
+    :param amplitude:       Float with standard deviation of the noise
+    :return:                Numpy array with shape (num_samples, channel_num) and datatype np.int16
+    """
+    noise = rng.normal(scale=amplitude, size=(sample_index.size, channel_num))
+    return np.clip(noise, -2**15, 2**15 - 1).astype(np.int16)
+
+
+def generate_ramp(sample_index: np.ndarray, sampling_rate: float, channel_num: int, period_sec: float=1.) -> np.ndarray:
+    """Generating sawtooth ramps over the full range of int16 with a phase shift for each channel
+    :param sample_index:    Numpy array with index of each sample since start of the stream
+    :param sampling_rate:   Float with sampling rate [Hz]
+    :param channel_num:     Integer with number of channels
+    :param period_sec:      Float with period of one ramp [sec.]
+    :return:                Numpy array with shape (num_samples, channel_num) and datatype np.int16
+    """
+    period = max(1, int(period_sec * sampling_rate))
+    shift = (np.arange(channel_num) * period) // max(1, channel_num)
+    phase = (sample_index[:, None] + shift[None, :]) % period
+    return (phase * (2**16 - 1) // period - 2**15).astype(np.int16)
+
+
+def generate_counter(sample_index: np.ndarray, channel_num: int) -> np.ndarray:
+    """Generating a wrapping 16-bit counter pattern for integrity checks (channel c holds the sample index + c)
+    :param sample_index:    Numpy array with index of each sample since start of the stream
+    :param channel_num:     Integer with number of channels
+    :return:                Numpy array with shape (num_samples, channel_num) and datatype np.int16
+    """
+    return ((sample_index[:, None] + np.arange(channel_num)[None, :]) % 2**16 - 2**15).astype(np.int16)
+
+
+def check_counter(data: np.ndarray, last: int=-1) -> tuple[int, int, int]:
+    """Checking received data of generate_counter() for lost, duplicated or corrupted samples
+    :param data:    Numpy array with shape (num_samples, channel_num) of the counter pattern
+    :param last:    Integer with the last counter value of the first channel before the data (offset by 2**15, negative if not available)
+    :return:        Tuple with number of lost samples, duplicated or out-of-order samples and samples with corrupted channels
+    """
+    index = data[:, 0].astype(np.int64) + 2**15
+    num_lost, num_duplicated, num_out_of_order = classify_sequence_deltas(get_sequence_deltas(index, last, modulo=2**16), modulo=2**16)
+    expected = (index[:, None] + np.arange(data.shape[1])[None, :]) % 2**16
+    num_corrupted = int(np.count_nonzero(np.any(data.astype(np.int64) + 2**15 != expected, axis=1)))
+    return num_lost, num_duplicated + num_out_of_order, num_corrupted
+
+
+def generate_waveform(waveform: str, sample_index: np.ndarray, sampling_rate: float, channel_num: int, rng: np.random.Generator | None=None) -> np.ndarray:
+    """Generating one chunk of a mock waveform (vectorized)
+    :param waveform:        String with name of the waveform (see get_waveform_names())
+    :param sample_index:    Numpy array with index of each sample since start of the stream
+    :param sampling_rate:   Float with sampling rate [Hz]
+    :param channel_num:     Integer with number of channels
+    :param rng:             Numpy random generator for the noise
+    :return:                Numpy array with shape (num_samples, channel_num) and datatype np.int16
+    """
+    match waveform:
+        case 'sinusoid':
+            return generate_sinusoid(sample_index, sampling_rate, channel_num)
+        case 'noise':
+            return generate_noise(sample_index, channel_num, rng if rng is not None else np.random.default_rng())
+        case 'ramp':
+            return generate_ramp(sample_index, sampling_rate, channel_num)
+        case 'counter':
+            return generate_counter(sample_index, channel_num)
+        case _:
+            raise ValueError(f"Unknown waveform {waveform} - Available: {get_waveform_names()}")
@@ -0,0 +1,59 @@
+import pytest
+import numpy as np
+from .mock_waveform import (
+    check_counter,
+    generate_counter,
+    generate_noise,
+    generate_ramp,
+    generate_sinusoid,
+    generate_waveform,
+    get_waveform_names
+)
+
+
+def test_sinusoid():
+    rslt = generate_sinusoid(np.arange(1000), sampling_rate=1000., channel_num=2, frequency=10.)
+    assert rslt.shape == (1000, 2)
+    assert rslt.dtype == np.int16
+    spectrum = np.abs(np.fft.rfft(rslt, axis=0))
+    np.testing.assert_array_equal(np.argmax(spectrum, axis=0), [10, 20])
+
+
+def test_noise():
+    rslt = generate_noise(np.arange(10000), channel_num=3, rng=np.random.default_rng(0), amplitude=100.)
+    assert rslt.shape == (10000, 3)
+    assert np.std(rslt) == pytest.approx(100., rel=0.05)
+
+
+def test_ramp():
+    rslt = generate_ramp(np.arange(200), sampling_rate=100., channel_num=2, period_sec=1.)
+    assert rslt[0, 0] == -2**15
+    assert rslt[99, 0] > 2**15 - 700
+    assert rslt[100, 0] == -2**15
+    assert rslt[50, 1] == -2**15
+
+
+def test_counter_integrity():
+    index = np.arange(2**16 - 5, 2**16 + 100)
+    data = generate_counter(index, channel_num=4)
+    assert check_counter(data) == (0, 0, 0)
+    assert check_counter(data, last=int(data[0, 0]) + 2**15 - 1) == (0, 0, 0)
+
+    data = np.delete(data, [10, 11, 50], axis=0)
+    data[20, 2] += 1
+    assert check_counter(data) == (3, 0, 1)
+
+
+def test_chunks_are_continuous():
+    for waveform in get_waveform_names():
+        if waveform == 'noise':
+            continue
+        full = generate_waveform(waveform, np.arange(1000), 1000., 2)
+        chunks = np.concatenate([generate_waveform(waveform, np.arange(idx, idx + 100), 1000., 2) for idx in range(0, 1000, 100)])
+        np.testing.assert_array_equal(full, chunks)
+    with pytest.raises(ValueError):
+        generate_waveform('square', np.arange(10), 1000., 2)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
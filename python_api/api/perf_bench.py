@@ -0,0 +1,352 @@
+import json
+import h5py
+import numpy as np
+from dataclasses import dataclass, asdict
+from logging import getLogger, Logger
+from pathlib import Path
+from time import perf_counter, sleep
+from pylsl import local_clock
+
+from api.clock_sync import ClockSync
+from api.data_api import DataAPI
+from api.h5_writer import BufferedH5Writer, get_chunk_size, read_time
+from api.lsl import RingBuffer, ThreadLSL
+from api.mcu_api import DeviceAPI
+from api.mcu_frame import FrameDecoder, get_daq_frame_datatype
+from api.mock_waveform import generate_counter
+from api.shm_ring import SharedRing
+
+
+def get_stage_names() -> list[str]:
+    """Returning the names of all stages of the StageBenchmark"""
+    return ['decode', 'ring_buffer', 'record', 'record_raw', 'read_file', 'stream_mock', 'stream_file']
+
+
+@dataclass(frozen=True)
+class StageResult:
+    """Dataclass with the result of one stage benchmark
+    Attributes:
+        stage:              String with name of the stage (see get_stage_names())
+        sampling_rate:      Float with sampling rate of the stream [Hz]
+        num_channels:       Integer with number of channels
+        samples_per_sec:    Float with processed samples per second (maximum throughput, or sustained rate for real-time streams)
+    """
+    stage: str
+    sampling_rate: float
+    num_channels: int
+    samples_per_sec: float
+
+    @property
+    def key(self) -> str:
+        """Returning the unique key of the benchmark case (e.g. 'record/10000Hz/16ch')"""
+        return f"{self.stage}/{self.sampling_rate:g}Hz/{self.num_channels}ch"
+
+    @property
+    def headroom(self) -> float:
+        """Returning the ratio between processed and required samples per second"""
+        return self.samples_per_sec / self.sampling_rate
+
+    @property
+    def is_sustainable(self) -> bool:
+        """Returning True if the stage keeps up with the sampling rate"""
+        return self.headroom >= 0.95
+
+
+@dataclass(frozen=True)
+class Regression:
+    """Dataclass with one benchmark case which is slower than its baseline
+    Attributes:
+        key:                String with key of the benchmark case
+        baseline:           Float with samples per second of the baseline
+        samples_per_sec:    Float with measured samples per second
+        ratio:              Float with ratio between measured and baseline value
+    """
+    key: str
+    baseline: float
+    samples_per_sec: float
+    ratio: float
+
+
+@dataclass(frozen=True)
+class CompressionResult:
+    """Dataclass with the result of one compression benchmark
+    Attributes:
+        file:               String with name of the recording
+        compression:        String with codec (empty for uncompressed)
+        mb_per_sec:         Float with written megabytes of raw data per second (appending until closing the writer)
+        ratio:              Float with ratio between raw size and stored size of the datasets 'time' and 'data'
+        append_max_sec:     Float with longest duration of one append() in the pull loop [sec.]
+    """
+    file: str
+    compression: str
+    mb_per_sec: float
+    ratio: float
+    append_max_sec: float
+
+
+def save_baseline(results: list[StageResult], path: Path | str) -> None:
+    """Saving benchmark results as baseline (JSON with samples per second of each key)
+    :param results: List with class StageResult
+    :param path:    Path to the JSON file
+    :return:        None
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"results": [asdict(rslt) for rslt in results]}, f, indent=2)
+
+
+def load_baseline(path: Path | str) -> dict[str, float]:
+    """Loading a baseline from save_baseline()
+    :param path:    Path to the JSON file
+    :return:        Dictionary with samples per second of each key
+    """
+    with open(path, "r") as f:
+        return {StageResult(**rslt).key: rslt["samples_per_sec"] for rslt in json.load(f)["results"]}
+
+
+def compare_baseline(results: list[StageResult], baseline: dict[str, float], tolerance: float=0.2) -> list[Regression]:
+    """Comparing benchmark results with a baseline, cases without baseline are ignored
+    :param results:     List with class StageResult
+    :param baseline:    Dictionary with samples per second of each key (see load_baseline())
+    :param tolerance:   Float with allowed relative slowdown (e.g. 0.2 for 20 %)
+    :return:            List with class Regression of all cases slower than the tolerance
+    """
+    regressions = list()
+    for rslt in results:
+        if rslt.key in baseline and baseline[rslt.key] > 0.:
+            ratio = rslt.samples_per_sec / baseline[rslt.key]
+            if ratio < 1. - tolerance:
+                regressions.append(Regression(key=rslt.key, baseline=baseline[rslt.key], samples_per_sec=rslt.samples_per_sec, ratio=ratio))
+    return regressions
+
+
+class StageBenchmark:
+    _logger: Logger
+    _path: Path
+    _duration_sec: float
+    __latency_sec: float = 0.02
+
+    def __init__(self, path2temp: Path | str, duration_sec: float=1.) -> None:
+        """Class for measuring the throughput of the host-side stages of the DAQ (decoding, plot buffer, recording,
+        reading of recordings, mock and file streams) without hardware
+        :param path2temp:       Path to a folder for temporary recordings
+        :param duration_sec:    Float with duration of the stream of each measurement [sec.]
+        :return:                None
+        """
+        self._logger = getLogger(__name__)
+        self._path = Path(path2temp)
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._duration_sec = duration_sec
+
+    def _get_num_samples(self, sampling_rate: float) -> int:
+        return max(1, int(self._duration_sec * sampling_rate))
+
+    def _write_recording(self, sampling_rate: float, num_channels: int) -> Path:
+        """Writing a recording with a counter pattern in the format of lsl_record_stream into an own folder
+        :return:    Path to the folder of the recording
+        """
+        path = self._path / f"{sampling_rate:g}Hz_{num_channels}ch"
+        path.mkdir(parents=True, exist_ok=True)
+        num = self._get_num_samples(sampling_rate)
+        with h5py.File(path / "20260101_000000_bench.h5", "w") as f:
+            f.attrs["sampling_rate"] = sampling_rate
+            f.attrs["channel_count"] = num_channels
+            f.attrs["type"] = "sensor_data"
+            f.attrs["data_format"] = 5
+            f.create_dataset("time", data=np.arange(num) / sampling_rate)
+            f.create_dataset("data", data=generate_counter(np.arange(num), num_channels))
+        return path
+
+    def bench_decode(self, sampling_rate: float, num_channels: int=2) -> StageResult:
+        """Measuring the decoding of DAQ frames like _thread_read_batch() (frame decoding, clock mapping and conversion),
+        the frame has a fixed number of channels (num_channels is only used for the report)
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param num_channels:    Integer with number of channels for the report
+        :return:                Class StageResult
+        """
+        num = self._get_num_samples(sampling_rate)
+        frames = np.zeros(shape=(num,), dtype=get_daq_frame_datatype())
+        frames['head'] = 0xA0
+        frames['index'] = np.arange(num) % 256
+        frames['timestamp'] = (np.arange(num) * 1e6 / sampling_rate).astype(np.uint64)
+        frames['c0'] = np.arange(num) % 4096
+        frames['tail'] = 0xFF
+        stream = memoryview(frames.tobytes())
+
+        decoder = FrameDecoder(dtype=get_daq_frame_datatype(), head=0xA0, tail=0xFF, sequence='index')
+        clock = ClockSync()
+        chunk = decoder.frame_size * max(1, int(sampling_rate * self.__latency_sec))
+        num_decoded = 0
+        time_start = perf_counter()
+        for pos in range(0, len(stream), chunk):
+            decoded = decoder.decode(stream[pos:pos + chunk])
+            runtime = decoded['timestamp'] * 1e-6
+            clock.add_receive(float(runtime[-1]), perf_counter())
+            DeviceAPI._get_batch_data(decoded)
+            clock.to_host(runtime)
+            num_decoded += decoded.size
+        return StageResult('decode', sampling_rate, num_channels, num_decoded / (perf_counter() - time_start))
+
+    def bench_ring_buffer(self, sampling_rate: float, num_channels: int) -> StageResult:
+        """Measuring the ingest of the plot buffer (RingBuffer of each channel) like lsl_plot_stream()
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param num_channels:    Integer with number of channels
+        :return:                Class StageResult
+        """
+        num = self._get_num_samples(sampling_rate)
+        data = generate_counter(np.arange(num), num_channels).astype(np.int32)
+        buffers = [RingBuffer(max(1, int(10. * sampling_rate))) for _ in range(num_channels)]
+        max_samples = int(sampling_rate / 50) if sampling_rate > 500. else 10
+
+        num_processed = 0
+        time_start = perf_counter()
+        for pos in range(0, num, max_samples):
+            for sample in data[pos:pos + max_samples]:
+                for ch, value in enumerate(sample):
+                    buffers[ch].append(value)
+            num_processed += data[pos:pos + max_samples].shape[0]
+            if perf_counter() - time_start > 2 * self._duration_sec:
+                break
+        return StageResult('ring_buffer', sampling_rate, num_channels, num_processed / (perf_counter() - time_start))
+
+    def _bench_record(self, stage: str, sampling_rate: float, num_channels: int, backend: str) -> StageResult:
+        """Measuring the writing of lsl_record_stream() from a ring buffer until all samples are written (as fast as possible)"""
+        num = self._get_num_samples(sampling_rate)
+        name = f"bench_{stage}_{sampling_rate:g}_{num_channels}"
+        dut = ThreadLSL()
+        data = generate_counter(np.arange(num), num_channels).astype(np.int32)
+        ring_name = dut.create_ring(name, num_channels, sampling_rate, buffer_sec=1.1 * num / sampling_rate)
+        dut.register(func=dut.lsl_record_stream, args=(0, name, self._path), kwargs=dict(ring_name=ring_name, backend=backend))
+        dut.start()
+
+        # All samples are available at once after the recorder is running, they are stamped with the time of
+        # writing into the ring so that the largest write latency of the recorder is the duration until all are on disk
+        writer = SharedRing.attach(ring_name)
+        latency = dut._latency[0]
+        writer.write(data, np.full(num, local_clock()))
+        time_end = perf_counter() + max(5., 10 * self._duration_sec)
+        while dut._counters[0].num_samples < num and perf_counter() < time_end:
+            sleep(1e-3)
+        num_processed = dut._counters[0].num_samples
+        writer.close()
+        dut.stop()
+        duration = latency.get_statistics('record').max_sec
+        for file in self._path.glob(f"*_{name}.*"):
+            file.unlink()
+        return StageResult(stage, sampling_rate, num_channels, num_processed / duration)
+
+    def bench_record(self, sampling_rate: float, num_channels: int) -> StageResult:
+        """Measuring the HDF5 writing of lsl_record_stream() from a ring buffer until all samples are written (as fast as possible)
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param num_channels:    Integer with number of channels
+        :return:                Class StageResult
+        """
+        return self._bench_record('record', sampling_rate, num_channels, 'h5')
+
+    def bench_record_raw(self, sampling_rate: float, num_channels: int) -> StageResult:
+        """Measuring the raw log of lsl_record_stream() (backend 'raw') from a ring buffer until all samples are appended
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param num_channels:    Integer with number of channels
+        :return:                Class StageResult
+        """
+        return self._bench_record('record_raw', sampling_rate, num_channels, 'raw')
+
+    def bench_read_file(self, sampling_rate: float, num_channels: int) -> StageResult:
+        """Measuring the loading of a complete recording with DataAPI._read_file()
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param num_channels:    Integer with number of channels
+        :return:                Class StageResult
+        """
+        path = self._write_recording(sampling_rate, num_channels)
+        reader = DataAPI(path2data=path, data_prefix='bench')
+        time_start = perf_counter()
+        rslt = reader.read_data_file(0)
+        return StageResult('read_file', sampling_rate, num_channels, rslt.time.size / (perf_counter() - time_start))
+
+    def bench_compression(self, path2file: Path | str, compression: str="lzf") -> CompressionResult:
+        """Measuring the recording of an existing recording with BufferedH5Writer like lsl_record_stream() (appending
+        in chunks of the pull loop as fast as possible) with and without compression
+        :param path2file:       Path to a recording from lsl_record_stream()
+        :param compression:     String with codec (see get_compression_names(), empty for uncompressed)
+        :return:                Class CompressionResult
+        """
+        with h5py.File(path2file, "r") as f:
+            sampling_rate = float(f.attrs["sampling_rate"])
+            time = read_time(f["time"])
+            data = f["data"][:]
+        max_samples = int(sampling_rate / 50) if sampling_rate > 500. else 10
+        path2temp = self._path / f"compression_{compression if compression else 'none'}.h5"
+
+        append_max = 0.
+        with h5py.File(path2temp, "w") as f:
+            time_start = perf_counter()
+            writer = BufferedH5Writer(f, data.shape[1], data.dtype, chunk_size=get_chunk_size(sampling_rate), compression=compression)
+            for pos in range(0, time.size, max_samples):
+                time_append = perf_counter()
+                writer.append(data[pos:pos + max_samples], time[pos:pos + max_samples])
+                append_max = max(append_max, perf_counter() - time_append)
+            writer.close()
+            duration = perf_counter() - time_start
+            num_stored = f["time"].id.get_storage_size() + f["data"].id.get_storage_size()
+        path2temp.unlink()
+        num_raw = time.nbytes + data.nbytes
+        return CompressionResult(file=Path(path2file).name, compression=compression, mb_per_sec=num_raw / duration / 1e6,
+                                 ratio=num_raw / max(num_stored, 1), append_max_sec=append_max)
+
+    def _bench_stream(self, stage: str, sampling_rate: float, num_channels: int, func_name: str, args: tuple) -> StageResult:
+        """Measuring the sustained rate of a real-time stream of ThreadLSL with one LSL consumer"""
+        dut = ThreadLSL()
+        dut.register(func=getattr(dut, func_name), args=args)
+        dut.start()
+        try:
+            inlet = dut._establish_lsl_inlet(args[1])
+            inlet.open_stream(timeout=5.)
+            sleep(0.2)
+            num_start, time_start = dut._counters[0].num_samples, perf_counter()
+            sleep(self._duration_sec)
+            num_processed, duration = dut._counters[0].num_samples - num_start, perf_counter() - time_start
+            dut.check_exception()
+        finally:
+            dut.stop()
+        return StageResult(stage, sampling_rate, num_channels, num_processed / duration)
+
+    def bench_stream_mock(self, sampling_rate: float, num_channels: int) -> StageResult:
+        """Measuring the sustained rate of lsl_stream_mock() (counter waveform)
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param num_channels:    Integer with number of channels
+        :return:                Class StageResult
+        """
+        name = f"bench_mock_{sampling_rate:g}_{num_channels}"
+        return self._bench_stream('stream_mock', sampling_rate, num_channels, 'lsl_stream_mock',
+                                  (0, name, num_channels, sampling_rate, 'counter'))
+
+    def bench_stream_file(self, sampling_rate: float, num_channels: int) -> StageResult:
+        """Measuring the sustained rate of lsl_stream_file() (replay in real time with loop)
+        :param sampling_rate:   Float with sampling rate [Hz]
+        :param num_channels:    Integer with number of channels
+        :return:                Class StageResult
+        """
+        path = self._write_recording(sampling_rate, num_channels)
+        name = f"bench_file_{sampling_rate:g}_{num_channels}"
+        return self._bench_stream('stream_file', sampling_rate, num_channels, 'lsl_stream_file',
+                                  (0, name, str(path), 0, 'bench'))
+
+    def run(self, sampling_rates: tuple[float, ...]=(1e3, 1e4, 5e4), channels: tuple[int, ...]=(2, 16, 64),
+            stages: tuple[str, ...] | None=None) -> list[StageResult]:
+        """Running the benchmark of all stages for all combinations of sampling rate and number of channels
+        :param sampling_rates:  Tuple with sampling rates [Hz]
+        :param channels:        Tuple with number of channels
+        :param stages:          Tuple with names of the stages (None for all, see get_stage_names())
+        :return:                List with class StageResult
+        """
+        results = list()
+        for stage in stages if stages is not None else get_stage_names():
+            if stage not in get_stage_names():
+                raise ValueError(f"Unknown stage {stage} - Available: {get_stage_names()}")
+            func = getattr(self, f"bench_{stage}")
+            for rate in sampling_rates:
+                # The DAQ frame has a fixed number of channels
+                for num_channels in channels if stage != 'decode' else channels[:1]:
+                    results.append(func(rate, num_channels))
+                    self._logger.info(f"{results[-1].key}: {results[-1].samples_per_sec:.0f} samples/s (x{results[-1].headroom:.2f})")
+        return results
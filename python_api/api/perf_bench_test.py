@@ -0,0 +1,68 @@
+import pytest
+from pathlib import Path
+from api.perf_bench import (
+    StageBenchmark,
+    StageResult,
+    compare_baseline,
+    get_stage_names,
+    load_baseline,
+    save_baseline
+)
+
+
+@pytest.fixture
+def dut(tmp_path: Path):
+    return StageBenchmark(tmp_path, duration_sec=0.5)
+
+
+def test_result():
+    rslt = StageResult('record', 10000., 16, 25000.)
+    assert rslt.key == 'record/10000Hz/16ch'
+    assert rslt.headroom == 2.5
+    assert rslt.is_sustainable
+    assert not StageResult('stream_mock', 10000., 16, 9000.).is_sustainable
+
+
+def test_baseline(tmp_path: Path):
+    baseline = [StageResult('decode', 1000., 2, 1e6), StageResult('record', 1000., 2, 1e5)]
+    save_baseline(baseline, tmp_path / "baseline.json")
+    loaded = load_baseline(tmp_path / "baseline.json")
+    assert loaded == {'decode/1000Hz/2ch': 1e6, 'record/1000Hz/2ch': 1e5}
+
+    results = [StageResult('decode', 1000., 2, 0.9e6), StageResult('record', 1000., 2, 0.5e5), StageResult('record', 1000., 8, 1.)]
+    regressions = compare_baseline(results, loaded, tolerance=0.2)
+    assert [rslt.key for rslt in regressions] == ['record/1000Hz/2ch']
+    assert regressions[0].ratio == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("stage", ['decode', 'ring_buffer', 'record', 'record_raw', 'read_file'])
+def test_throughput_stages(dut: StageBenchmark, stage: str):
+    rslt = dut.run(sampling_rates=(1000., ), channels=(2, ), stages=(stage, ))
+    assert len(rslt) == 1
+    assert rslt[0].key == f'{stage}/1000Hz/2ch'
+    assert rslt[0].is_sustainable
+
+
+@pytest.mark.parametrize("stage", ['stream_mock', 'stream_file'])
+def test_stream_stages(dut: StageBenchmark, stage: str):
+    rslt = dut.run(sampling_rates=(1000., ), channels=(4, ), stages=(stage, ))[0]
+    assert rslt.samples_per_sec == pytest.approx(1000., rel=0.1)
+
+
+@pytest.mark.parametrize("compression", ['', 'lzf'])
+def test_compression(dut: StageBenchmark, compression: str):
+    path = dut._write_recording(10000., 4)
+    rslt = dut.bench_compression(next(path.glob("*.h5")), compression)
+    assert rslt.compression == compression
+    assert rslt.mb_per_sec > 0.
+    assert rslt.ratio > 2. if compression else rslt.ratio <= 1.
+
+
+def test_unknown_stage(dut: StageBenchmark):
+    assert 'record' in get_stage_names()
+    with pytest.raises(ValueError):
+        dut.run(stages=('plot', ))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
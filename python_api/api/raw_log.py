@@ -0,0 +1,262 @@
+import json
+import os
+import numpy as np
+from h5py import File
+from pathlib import Path
+from threading import Event, Lock, Thread
+from time import time as time_now
+from api.h5_writer import BufferedH5Writer, get_chunk_size
+from api.mcu_frame import classify_sequence_deltas, get_sequence_deltas
+
+
+def get_raw_log_header_datatype() -> np.dtype:
+    """Returning the datatype of the header of 4096 bytes at the begin of a raw log (with meta information as JSON)"""
+    return np.dtype([
+        ('magic', 'S8'),
+        ('num_channels', '<u4'),
+        ('is_closed', '<u4'),
+        ('dtype', 'S8'),
+        ('capacity', '<u8'),
+        ('num_samples', '<u8'),
+        ('time_update', '<f8'),
+        ('meta', 'S4048'),
+    ])
+
+
+def get_raw_log_record_datatype(num_channels: int, dtype: np.dtype) -> np.dtype:
+    """Returning the datatype of one record of a raw log (timestamp and the samples of all channels)"""
+    return np.dtype([('time', '<f8'), ('data', np.dtype(dtype), (num_channels, ))])
+
+
+class RawLogWriter:
+    _path: Path
+    _attrs: dict
+    _record: np.dtype
+    _header: np.memmap
+    _records: np.memmap | None
+    _capacity: int
+    _num_samples: int
+    _on_write: object
+    _lock: Lock
+    _event: Event
+    _thread: Thread
+    _exception: Exception | None
+    _magic: bytes = b"DAQRLOG1"
+
+    def __init__(self, path2file: Path | str, num_channels: int, dtype: np.dtype, attrs: dict | None=None, capacity: int=2**16,
+                 sync_sec: float=1., on_write=None) -> None:
+        """Recording of a stream by appending fixed-size records (timestamp and channel block) to a preallocated and
+        memory-mapped file, an own thread writes the mapped pages to disk and updates the number of samples in the header
+        periodically, so that a crashed recording can be read up to the last update (see read_raw_log())
+        :param path2file:       Path to the raw log (e.g. <time>_<name>.rlog)
+        :param num_channels:    Integer with number of channels
+        :param dtype:           Numpy datatype of the data
+        :param attrs:           Dictionary with meta information (e.g. sampling_rate, channel_count and type of the HDF5 recording)
+        :param capacity:        Integer with number of preallocated records, the file grows geometrically
+        :param sync_sec:        Float with period of writing to disk and updating the header [sec.]
+        :param on_write:        Function called with the timestamp of the last appended sample after each append (None to disable)
+        :return:                None
+        """
+        self._path = Path(path2file)
+        self._record = get_raw_log_record_datatype(num_channels, dtype)
+        self._attrs = dict(attrs) if attrs is not None else dict()
+        header_dtype = get_raw_log_header_datatype()
+        with open(self._path, "wb") as f:
+            f.write(bytes(header_dtype.itemsize))
+        self._header = np.memmap(self._path, dtype=header_dtype, mode="r+", shape=(1, ))
+        self._header['magic'] = self._magic
+        self._header['num_channels'] = num_channels
+        self._header['dtype'] = np.dtype(dtype).str.encode()
+        self._write_meta()
+        self._num_samples = 0
+        self._on_write = on_write
+        self._exception = None
+        self._lock = Lock()
+        self._records = None
+        self._capacity = 0
+        self._allocate(capacity)
+
+        self._event = Event()
+        self._thread = Thread(target=self._thread_sync, args=(sync_sec, ), daemon=True)
+        self._thread.start()
+
+    @property
+    def _header_size(self) -> int:
+        return get_raw_log_header_datatype().itemsize
+
+    @property
+    def attrs(self) -> dict:
+        """Returning the meta information, changes are written into the header with the next sync"""
+        return self._attrs
+
+    @property
+    def path(self) -> Path:
+        """Returning the path to the raw log"""
+        return self._path
+
+    @property
+    def num_samples(self) -> int:
+        """Returning the number of appended samples"""
+        return self._num_samples
+
+    @property
+    def num_written(self) -> int:
+        """Returning the number of samples in the mapped file (written to disk by the operating system or the next sync)"""
+        return self._num_samples
+
+    @property
+    def num_bytes(self) -> int:
+        """Returning the size of the header and of all appended records [bytes]"""
+        return self._header_size + self._num_samples * self._record.itemsize
+
+    def _check_exception(self) -> None:
+        if self._exception is not None:
+            exc, self._exception = self._exception, None
+            raise exc
+
+    def _write_meta(self) -> None:
+        """Writing the meta information as JSON into the header"""
+        meta = json.dumps(self._attrs, default=lambda val: val.item() if isinstance(val, np.generic) else str(val)).encode()
+        if len(meta) > self._header.dtype['meta'].itemsize:
+            raise ValueError(f"Meta information of the raw log is too large ({len(meta)} bytes)")
+        self._header['meta'] = meta
+
+    def _allocate(self, capacity: int) -> None:
+        """Growing the file to a number of records and mapping them"""
+        with self._lock:
+            if self._records is not None:
+                self._records.flush()
+            size = self._header_size + capacity * self._record.itemsize
+            with open(self._path, "r+b") as f:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(f.fileno(), 0, size)
+                else:
+                    f.truncate(size)
+            self._records = np.memmap(self._path, dtype=self._record, mode="r+", offset=self._header_size, shape=(capacity, ))
+            self._capacity = capacity
+            self._header['capacity'] = capacity
+
+    def _sync(self, is_closed: bool=False) -> None:
+        """Writing the mapped records to disk before the number of samples in the header"""
+        with self._lock:
+            num = self._num_samples
+            self._records.flush()
+            self._header['num_samples'] = num
+            self._header['time_update'] = time_now()
+            self._header['is_closed'] = int(is_closed)
+            self._write_meta()
+            self._header.flush()
+
+    def _thread_sync(self, sync_sec: float) -> None:
+        while not self._event.wait(sync_sec):
+            try:
+                self._sync()
+            except Exception as e:
+                self._exception = e
+
+    def append(self, data: np.ndarray, timestamps: np.ndarray) -> None:
+        """Appending samples (copy into the mapped file)
+        :param data:        Numpy array with shape (num_samples, num_channels)
+        :param timestamps:  Numpy array with timestamp of each sample [sec.]
+        :return:            None
+        """
+        self._check_exception()
+        num = len(timestamps)
+        if not num:
+            return
+        end = self._num_samples + num
+        if end > self._capacity:
+            self._allocate(max(end, 2 * self._capacity))
+        records = self._records[self._num_samples:end]
+        records['time'] = timestamps
+        records['data'] = data
+        self._num_samples = end
+        if self._on_write is not None:
+            self._on_write(timestamps[-1])
+
+    def poll(self) -> None:
+        """Checking the sync thread (writing to disk does not depend on calls of poll(), same interface as BufferedH5Writer)"""
+        self._check_exception()
+
+    def close(self) -> None:
+        """Writing all samples to disk, marking the raw log as closed and trimming the file to the number of samples"""
+        self._event.set()
+        self._thread.join()
+        self._sync(is_closed=True)
+        with self._lock:
+            self._records = None
+            self._header = None
+        with open(self._path, "r+b") as f:
+            f.truncate(self.num_bytes)
+        self._check_exception()
+
+
+def read_raw_log(path2file: Path | str) -> tuple[dict, np.ndarray]:
+    """Opening a raw log from RawLogWriter with np.memmap (read-only, without loading the data), the records of an unclosed
+    raw log are read until the first record after the last header update which was not written (zero timestamp)
+    :param path2file:   Path to the raw log
+    :return:            Tuple with dictionary of the meta information and numpy array of the records with fields 'time' and 'data'
+    """
+    header_dtype = get_raw_log_header_datatype()
+    header = np.fromfile(path2file, dtype=header_dtype, count=1)
+    if not header.size or header['magic'][0] != RawLogWriter._magic:
+        raise ValueError(f"File {path2file} is not a raw log")
+    header = header[0]
+    attrs = json.loads(header['meta'].decode()) if header['meta'] else dict()
+    record = get_raw_log_record_datatype(int(header['num_channels']), np.dtype(header['dtype'].decode()))
+    capacity = (os.path.getsize(path2file) - header_dtype.itemsize) // record.itemsize
+    num = min(int(header['num_samples']), capacity)
+    if not header['is_closed'] and num < capacity:
+        tail = np.memmap(path2file, dtype=record, mode="r", offset=header_dtype.itemsize + num * record.itemsize, shape=(capacity - num, ))['time']
+        empty = np.flatnonzero(tail == 0.)
+        num += int(empty[0]) if empty.size else tail.size
+    if not num:
+        return attrs, np.zeros(0, dtype=record)
+    return attrs, np.memmap(path2file, dtype=record, mode="r", offset=header_dtype.itemsize, shape=(num, ))
+
+
+def convert_raw_log(path2log: Path | str, path2h5: Path | str="", compression: str="", seq_channel: int | None=None,
+                    block_size: int=2**16, decimation: tuple[int, ...]=()) -> Path:
+    """Converting a raw log into the HDF5 layout of lsl_record_stream() (datasets 'time', 'data' and 'gaps', attributes
+    of the meta information)
+    :param path2log:    Path to the raw log
+    :param path2h5:     Path to the HDF5 file (empty for the path of the raw log with suffix .h5)
+    :param compression: String with codec of the datasets (see get_compression_names(), empty to disable)
+    :param seq_channel: Integer with channel of an 8-bit sequence counter for the dataset 'gaps' (None for the channel of
+                        the meta information 'seq_channel', -1 to disable)
+    :param block_size:  Integer with number of records which are converted at once
+    :param decimation:  Tuple with number of samples of one bin of each min/max/mean level (see DecimationPyramid, empty to disable)
+    :return:            Path to the HDF5 file
+    """
+    attrs, records = read_raw_log(path2log)
+    path2h5 = Path(path2h5) if path2h5 else Path(path2log).with_suffix(".h5")
+    seq_meta = int(attrs.pop("seq_channel", -1))
+    seq_channel = seq_meta if seq_channel is None else seq_channel
+    num_channels = records.dtype['data'].shape[0]
+
+    with File(path2h5, "w") as f:
+        for key, value in attrs.items():
+            f.attrs[key] = value
+        writer = BufferedH5Writer(f, num_channels, records.dtype['data'].base, chunk_size=get_chunk_size(float(attrs.get("sampling_rate", 0.))),
+                                  compression=compression, decimation=decimation)
+        writer.time.attrs["unit"] = "s"
+        writer.data.attrs["unit"] = ""
+        gaps = list()
+        num_lost = 0
+        last_index = -1
+        for idx in range(0, records.size, block_size):
+            block = records[idx:idx + block_size]
+            writer.append(block['data'], block['time'])
+            if seq_channel >= 0:
+                deltas = get_sequence_deltas(block['data'][:, seq_channel], last_index)
+                last_index = int(block['data'][-1, seq_channel])
+                pos = np.flatnonzero(deltas != 1)
+                if pos.size:
+                    gaps.append(np.stack([idx + pos, block['time'][pos], deltas[pos]], axis=1))
+                    num_lost += classify_sequence_deltas(deltas[pos])[0]
+        writer.close()
+        if seq_channel >= 0:
+            gap_dset = f.create_dataset("gaps", data=np.concatenate(gaps) if gaps else np.zeros((0, 3)), maxshape=(None, 3), dtype=float)
+            gap_dset.attrs["columns"] = ["sample", "time", "delta"]
+            gap_dset.attrs["num_lost"] = num_lost
+    return path2h5
@@ -0,0 +1,74 @@
+import h5py
+import pytest
+import numpy as np
+from pathlib import Path
+from api.raw_log import RawLogWriter, convert_raw_log, get_raw_log_header_datatype, read_raw_log
+
+
+def write_counter(dut: RawLogWriter, num: int, chunk: int=100, offset: int=0) -> None:
+    for pos in range(offset, offset + num, chunk):
+        index = np.arange(pos, pos + chunk)
+        dut.append(np.stack([index % 256, index, -index], axis=1).astype(np.int32), 10. + index / 1000.)
+
+
+def test_header_size():
+    assert get_raw_log_header_datatype().itemsize == 4096
+
+
+def test_write_and_read(tmp_path: Path):
+    written = list()
+    dut = RawLogWriter(tmp_path / "test.rlog", 3, np.int32, attrs={"sampling_rate": np.float64(1000.), "channel_count": 3},
+                       capacity=256, on_write=written.append)
+    write_counter(dut, 5000)
+    assert dut.num_samples == 5000
+    dut.close()
+    assert written[-1] == pytest.approx(14.999)
+    assert (tmp_path / "test.rlog").stat().st_size == dut.num_bytes == 4096 + 5000 * 20
+
+    attrs, records = read_raw_log(tmp_path / "test.rlog")
+    assert attrs == {"sampling_rate": 1000., "channel_count": 3}
+    assert isinstance(records, np.memmap)
+    np.testing.assert_array_equal(records['data'][:, 1], np.arange(5000))
+    np.testing.assert_allclose(records['time'], 10. + np.arange(5000) / 1000.)
+
+
+def test_crash_recovery(tmp_path: Path):
+    dut = RawLogWriter(tmp_path / "test.rlog", 3, np.int32, capacity=4096, sync_sec=0.05)
+    write_counter(dut, 1000)
+    dut._sync()
+    write_counter(dut, 500, offset=1000)
+    # Abandoned without close(): the header contains 1000 samples, the appended records are recovered
+    attrs, records = read_raw_log(tmp_path / "test.rlog")
+    assert records.size == 1500
+    np.testing.assert_array_equal(records['data'][:, 1], np.arange(1500))
+    dut.close()
+
+
+def test_no_raw_log(tmp_path: Path):
+    (tmp_path / "test.rlog").write_bytes(bytes(5000))
+    with pytest.raises(ValueError):
+        read_raw_log(tmp_path / "test.rlog")
+
+
+@pytest.mark.parametrize("compression", ['', 'lzf'])
+def test_convert(tmp_path: Path, compression: str):
+    attrs = {"sampling_rate": 1000., "channel_count": 3, "type": "sensor_data", "data_format": 4, "seq_channel": 0}
+    dut = RawLogWriter(tmp_path / "test.rlog", 3, np.int32, attrs=attrs)
+    write_counter(dut, 1000)
+    write_counter(dut, 1000, offset=1010)
+    dut.close()
+
+    path = convert_raw_log(tmp_path / "test.rlog", compression=compression, block_size=300)
+    assert path == tmp_path / "test.h5"
+    with h5py.File(path, "r") as f:
+        assert f.attrs["sampling_rate"] == 1000.
+        assert f.attrs["channel_count"] == 3
+        assert "seq_channel" not in f.attrs
+        assert f["data"].shape == (2000, 3)
+        assert f["data"].dtype == np.int32
+        np.testing.assert_array_equal(f["gaps"][:], [[1000, 10. + 1010 / 1000., 11.]])
+        assert f["gaps"].attrs["num_lost"] == 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
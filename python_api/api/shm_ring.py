@@ -0,0 +1,238 @@
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter, sleep
+
+
+class SharedRing:
+    _shm: SharedMemory
+    _is_owner: bool
+    _header: np.ndarray
+    _meta: np.ndarray
+    _type: np.ndarray
+    _time: np.ndarray
+    _data: np.ndarray
+    __size_header: int = 8
+    __size_type: int = 32
+    # Header: [write_count, capacity, num_channels, dtype_char, channel_format, is_closed, pending_count, 0]
+
+    def __init__(self, shm: SharedMemory, is_owner: bool) -> None:
+        """Ring buffer in shared memory with one writer and many readers (see SharedRingReader) for passing a data stream
+        to other threads or processes on the same host, use SharedRing.create() or SharedRing.attach()
+        :param shm:         Shared memory block of the ring buffer
+        :param is_owner:    True if the ring buffer is created by this instance (it is removed by close())
+        :return:            None
+        """
+        self._shm = shm
+        self._is_owner = is_owner
+        self._header = np.ndarray((self.__size_header, ), dtype=np.int64, buffer=shm.buf)
+        offset = self._header.nbytes
+        self._meta = np.ndarray((1, ), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += self._meta.nbytes
+        self._type = np.ndarray((self.__size_type, ), dtype=np.uint8, buffer=shm.buf, offset=offset)
+        offset += self._type.nbytes
+        capacity, num_channels = int(self._header[1]), int(self._header[2])
+        self._time = np.ndarray((capacity, ), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += self._time.nbytes
+        self._data = np.ndarray((capacity, num_channels), dtype=np.dtype(chr(self._header[3])), buffer=shm.buf, offset=offset)
+
+    @staticmethod
+    def get_size(capacity: int, num_channels: int, dtype: np.dtype) -> int:
+        """Returning the number of bytes of the shared memory for a ring buffer"""
+        return 8 * (SharedRing.__size_header + 1) + SharedRing.__size_type + capacity * (8 + num_channels * np.dtype(dtype).itemsize)
+
+    @classmethod
+    def create(cls, name: str, num_channels: int, capacity: int, dtype: np.dtype=np.int32, sampling_rate: float=0.,
+               channel_format: int=0, stream_type: str="") -> 'SharedRing':
+        """Creating a new ring buffer in shared memory
+        :param name:            String with unique name of the shared memory block
+        :param num_channels:    Integer with number of channels of each sample
+        :param capacity:        Integer with number of samples in the ring buffer
+        :param dtype:           Numpy datatype of the data
+        :param sampling_rate:   Float with nominal sampling rate of the stream [Hz]
+        :param channel_format:  Integer with LSL channel format of the stream (e.g. cf_int32)
+        :param stream_type:     String with type of the stream (max. 32 characters)
+        :return:                Class SharedRing as owner of the shared memory
+        """
+        dtype = np.dtype(dtype)
+        shm = SharedMemory(name=name, create=True, size=cls.get_size(capacity, num_channels, dtype))
+        header = np.ndarray((cls.__size_header, ), dtype=np.int64, buffer=shm.buf)
+        header[:] = [0, capacity, num_channels, ord(dtype.char), channel_format, 0, 0, 0]
+        del header
+        ring = cls(shm, is_owner=True)
+        ring._meta[0] = sampling_rate
+        encoded = stream_type.encode('utf-8')[:cls.__size_type]
+        ring._type[:len(encoded)] = np.frombuffer(encoded, dtype=np.uint8)
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, timeout: float=1.) -> 'SharedRing':
+        """Attaching to an existing ring buffer in shared memory (e.g. in another process)
+        :param name:    String with name of the shared memory block
+        :param timeout: Float with maximum waiting time for the creation of the ring buffer [sec.]
+        :return:        Class SharedRing without ownership of the shared memory
+        """
+        time_end = perf_counter() + timeout
+        while True:
+            try:
+                shm = SharedMemory(name=name, create=False)
+                break
+            except FileNotFoundError:
+                if perf_counter() > time_end:
+                    raise ValueError(f"Shared ring {name} not found")
+                sleep(0.01)
+        return cls(shm, is_owner=False)
+
+    @property
+    def name(self) -> str:
+        """Returning the name of the shared memory block"""
+        return self._shm.name
+
+    @property
+    def capacity(self) -> int:
+        """Returning the number of samples in the ring buffer"""
+        return self._time.size
+
+    @property
+    def num_channels(self) -> int:
+        """Returning the number of channels of each sample"""
+        return self._data.shape[1]
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Returning the datatype of the data"""
+        return self._data.dtype
+
+    @property
+    def sampling_rate(self) -> float:
+        """Returning the nominal sampling rate of the stream [Hz]"""
+        return float(self._meta[0])
+
+    @property
+    def channel_format(self) -> int:
+        """Returning the LSL channel format of the stream"""
+        return int(self._header[4])
+
+    @property
+    def stream_type(self) -> str:
+        """Returning the type of the stream"""
+        return bytes(self._type).rstrip(b'\x00').decode('utf-8')
+
+    @property
+    def num_written(self) -> int:
+        """Returning the total number of samples written into the ring buffer"""
+        return int(self._header[0])
+
+    @property
+    def num_pending(self) -> int:
+        """Returning the total number of samples including the samples of a write in progress"""
+        return int(self._header[6])
+
+    @property
+    def is_closed(self) -> bool:
+        """Returning True if the writer has marked the stream as finished"""
+        return bool(self._header[5])
+
+    def write(self, data: np.ndarray, timestamps: np.ndarray) -> None:
+        """Writing samples into the ring buffer (only one writer is allowed), the oldest samples are overwritten
+        :param data:        Numpy array with shape (num_samples, num_channels)
+        :param timestamps:  Numpy array with timestamp of each sample [sec.]
+        :return:            None
+        """
+        num = timestamps.size
+        # Announcing the write before copying, readers discard slots which are overwritten by the write in progress
+        self._header[6] = self._header[0] + num
+        if num > self.capacity:
+            data, timestamps = data[-self.capacity:], timestamps[-self.capacity:]
+            self._header[0] += num - self.capacity
+            num = self.capacity
+        start = int(self._header[0]) % self.capacity
+        first = min(num, self.capacity - start)
+        self._time[start:start + first] = timestamps[:first]
+        self._data[start:start + first] = data[:first]
+        if first < num:
+            self._time[:num - first] = timestamps[first:]
+            self._data[:num - first] = data[first:]
+        # Publishing after copying, readers only access samples below the write counter
+        self._header[0] += num
+
+    def mark_closed(self) -> None:
+        """Marking the stream as finished for all readers"""
+        self._header[5] = 1
+
+    def close(self) -> None:
+        """Releasing the shared memory (and removing it if this instance is the owner)"""
+        self._header = self._meta = self._type = self._time = self._data = None
+        self._shm.close()
+        if self._is_owner:
+            self._shm.unlink()
+
+
+class SharedRingReader:
+    _ring: SharedRing
+    _cursor: int
+    _num_overrun: int
+    _num_read: int
+
+    def __init__(self, ring: SharedRing, from_start: bool=False) -> None:
+        """Reader of a SharedRing with own read position, samples which are overwritten before reading are counted as overrun
+        :param ring:        Class SharedRing to read from
+        :param from_start:  If true, reading starts with the oldest available sample, otherwise with the next written sample
+        :return:            None
+        """
+        self._ring = ring
+        self._cursor = max(0, ring.num_written - ring.capacity) if from_start else ring.num_written
+        self._num_overrun = 0
+        self._num_read = 0
+
+    @property
+    def ring(self) -> SharedRing:
+        """Returning the ring buffer of the reader"""
+        return self._ring
+
+    @property
+    def num_overrun(self) -> int:
+        """Returning the number of samples which are overwritten before reading"""
+        return self._num_overrun
+
+    @property
+    def num_read(self) -> int:
+        """Returning the number of read samples"""
+        return self._num_read
+
+    @property
+    def num_available(self) -> int:
+        """Returning the number of samples which are ready for reading"""
+        return min(self._ring.num_written - self._cursor, self._ring.capacity)
+
+    def pull_chunk(self, max_samples: int, timeout: float=0.) -> tuple[np.ndarray, np.ndarray]:
+        """Reading the next samples from the ring buffer (copy)
+        :param max_samples: Integer with maximum number of samples
+        :param timeout:     Float with maximum waiting time for new samples [sec.]
+        :return:            Tuple with numpy array of data (num_samples, num_channels) and numpy array with timestamps (empty if no sample is available)
+        """
+        ring = self._ring
+        written = ring.num_written
+        if written == self._cursor and timeout > 0:
+            time_end = perf_counter() + timeout
+            while written == self._cursor and perf_counter() < time_end:
+                sleep(min(1e-3, timeout))
+                written = ring.num_written
+        if written - self._cursor > ring.capacity:
+            self._num_overrun += written - self._cursor - ring.capacity
+            self._cursor = written - ring.capacity
+
+        num = min(written - self._cursor, max_samples)
+        start = self._cursor % ring.capacity
+        index = (start + np.arange(num)) % ring.capacity if start + num > ring.capacity else slice(start, start + num)
+        data = ring._data[index].copy()
+        timestamps = ring._time[index].copy()
+
+        # Samples overwritten by the writer during copying (finished or in progress) are discarded
+        num_lost = ring.num_pending - ring.capacity - self._cursor
+        if num_lost > 0:
+            num_lost = min(num_lost, num)
+            self._num_overrun += num_lost
+            data, timestamps = data[num_lost:], timestamps[num_lost:]
+        self._cursor += num
+        self._num_read += timestamps.size
+        return data, timestamps
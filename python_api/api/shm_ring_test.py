@@ -0,0 +1,130 @@
+import os
+import pytest
+import numpy as np
+from multiprocessing import get_context
+from .shm_ring import SharedRing, SharedRingReader
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing.create(f"test_ring_{os.getpid()}", num_channels=3, capacity=100, dtype=np.int32,
+                             sampling_rate=1000., channel_format=4, stream_type='sensor_data')
+    yield ring
+    ring.close()
+
+
+def write_samples(ring: SharedRing, start: int, num: int) -> None:
+    index = np.arange(start, start + num)
+    ring.write(np.stack([index, index + 1, index + 2], axis=1).astype(np.int32), index / 1000.)
+
+
+def read_in_process(name: str, queue) -> None:
+    ring = SharedRing.attach(name)
+    reader = SharedRingReader(ring, from_start=True)
+    data, timestamps = reader.pull_chunk(1000, timeout=1.)
+    queue.put((data, timestamps, ring.sampling_rate, ring.stream_type))
+    ring.close()
+
+
+def test_meta(ring):
+    attached = SharedRing.attach(ring.name)
+    assert attached.capacity == 100
+    assert attached.num_channels == 3
+    assert attached.dtype == np.int32
+    assert attached.sampling_rate == 1000.
+    assert attached.channel_format == 4
+    assert attached.stream_type == 'sensor_data'
+    attached.close()
+
+
+def test_attach_missing():
+    with pytest.raises(ValueError):
+        SharedRing.attach("test_ring_missing", timeout=0.05)
+
+
+def test_read_wrap(ring):
+    reader = SharedRingReader(ring)
+    for start in range(0, 250, 50):
+        write_samples(ring, start, 50)
+        data, timestamps = reader.pull_chunk(60)
+        np.testing.assert_array_equal(data[:, 0], np.arange(start, start + 50))
+        np.testing.assert_array_equal(data[:, 2], np.arange(start, start + 50) + 2)
+        np.testing.assert_allclose(timestamps, np.arange(start, start + 50) / 1000.)
+    assert reader.num_read == 250
+    assert reader.num_overrun == 0
+    assert reader.pull_chunk(10)[1].size == 0
+
+
+def test_independent_readers(ring):
+    fast = SharedRingReader(ring)
+    write_samples(ring, 0, 30)
+    slow = SharedRingReader(ring, from_start=True)
+    late = SharedRingReader(ring)
+    write_samples(ring, 30, 30)
+    assert fast.pull_chunk(100)[0][0, 0] == 0
+    assert slow.pull_chunk(10)[0][0, 0] == 0
+    assert slow.pull_chunk(100)[0][0, 0] == 10
+    assert late.pull_chunk(100)[0][0, 0] == 30
+
+
+def test_overrun(ring):
+    reader = SharedRingReader(ring)
+    write_samples(ring, 0, 80)
+    write_samples(ring, 80, 70)
+    data = reader.pull_chunk(200)[0]
+    assert reader.num_overrun == 50
+    np.testing.assert_array_equal(data[:, 0], np.arange(50, 150))
+
+
+class ReadDuringWrite(np.ndarray):
+    """Data array of the writer which pulls the reader after the timestamps and before the data are copied"""
+    reader: SharedRingReader
+    result: tuple[np.ndarray, np.ndarray]
+
+    def __setitem__(self, key, value) -> None:
+        self.result = ReadDuringWrite.reader.pull_chunk(200)
+        super().__setitem__(key, value)
+
+
+def test_lapped_during_write(ring):
+    reader = SharedRingReader(SharedRing.attach(ring.name), from_start=True)
+    write_samples(ring, 0, 100)
+    ReadDuringWrite.reader = reader
+    ring._data = ring._data.view(ReadDuringWrite)
+    write_samples(ring, 100, 30)
+    data, timestamps = ring._data.result
+    assert reader.num_overrun == 30
+    np.testing.assert_array_equal(data[:, 0], np.arange(30, 100))
+    np.testing.assert_allclose(timestamps, np.arange(30, 100) / 1000.)
+    reader.ring.close()
+
+
+def test_write_larger_than_capacity(ring):
+    reader = SharedRingReader(ring)
+    write_samples(ring, 0, 130)
+    data = reader.pull_chunk(200)[0]
+    assert ring.num_written == 130
+    assert reader.num_overrun == 30
+    np.testing.assert_array_equal(data[:, 0], np.arange(30, 130))
+
+
+def test_closed(ring):
+    assert not ring.is_closed
+    ring.mark_closed()
+    assert SharedRingReader(ring).ring.is_closed
+
+
+def test_read_process(ring):
+    write_samples(ring, 0, 20)
+    queue = get_context('spawn').Queue()
+    p = get_context('spawn').Process(target=read_in_process, args=(ring.name, queue))
+    p.start()
+    data, timestamps, sampling_rate, stream_type = queue.get(timeout=30.)
+    p.join(timeout=10.)
+    np.testing.assert_array_equal(data[:, 0], np.arange(20))
+    assert sampling_rate == 1000.
+    assert stream_type == 'sensor_data'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
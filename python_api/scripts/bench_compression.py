@@ -0,0 +1,22 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from api import get_path_to_project
+from api.h5_writer import get_compression_names
+from api.perf_bench import StageBenchmark
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Benchmark of the compression of the recorder on existing recordings")
+    parser.add_argument("--files", type=str, nargs="+", default=[], help="Recordings (default: all files in test_data)")
+    parser.add_argument("--codecs", type=str, nargs="+", default=[''] + get_compression_names(), help="Codecs ('' for uncompressed)")
+    args = parser.parse_args()
+
+    files = args.files if args.files else sorted(Path(get_path_to_project("test_data")).glob("*.h5"))
+    with TemporaryDirectory() as path2temp:
+        dut = StageBenchmark(path2temp)
+        for file in files:
+            for codec in args.codecs:
+                rslt = dut.bench_compression(file, codec)
+                print(f"{rslt.file:32s} {rslt.compression if rslt.compression else 'none':6s}: {rslt.mb_per_sec:8.1f} MB/s, "
+                      f"ratio {rslt.ratio:5.2f}, longest append {1e3 * rslt.append_max_sec:.2f} ms")
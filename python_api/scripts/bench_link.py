@@ -0,0 +1,37 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from api import DeviceAPI, get_path_to_project
+from api.mcu_bench import LinkBenchmark
+from api.mcu_sim import DeviceSimulator
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Benchmark of the link latency (ECHO) and the DAQ throughput of one device")
+    parser.add_argument("--port", type=str, default="AUTOCOM", help="Serial port of the device")
+    parser.add_argument("--sim", action="store_true", help="Using the firmware simulator on a local pseudo-terminal")
+    parser.add_argument("--rates", type=float, nargs="+", default=[500., 1000., 2000., 5000., 10000.], help="Sampling rates of the DAQ sweep [Hz]")
+    parser.add_argument("--duration", type=float, default=5., help="Duration of each DAQ measurement [sec.]")
+    parser.add_argument("--out", type=str, default="", help="Path of the JSON report (default: data/link_report.json)")
+    args = parser.parse_args()
+
+    sim = DeviceSimulator() if args.sim else None
+    if sim is not None:
+        sim.start()
+    dut = DeviceAPI(com_name=sim.port_name if sim is not None else args.port)
+    try:
+        report = LinkBenchmark(dut, port=sim.port_name if sim is not None else args.port).run(
+            sampling_rates=tuple(args.rates),
+            duration_sec=args.duration
+        )
+    finally:
+        dut.close()
+        if sim is not None:
+            sim.stop()
+
+    path2report = Path(args.out) if args.out else Path(get_path_to_project("data")) / "link_report.json"
+    report.save(path2report)
+    for echo in report.echo:
+        print(f"ECHO x{echo.num_batch}: p50={1e3 * echo.percentiles['p50']:.3f} ms, p99={1e3 * echo.percentiles['p99']:.3f} ms, {echo.bytes_per_sec:.0f} B/s")
+    for daq in report.daq:
+        print(f"DAQ {daq.sampling_rate:.0f} Hz: {daq.frames_per_sec:.1f} frames/s, {daq.bytes_per_sec:.0f} B/s, {daq.num_lost} lost")
+    print(f"Max. lossless rate: {report.max_lossless_rate:.0f} Hz - Report: {path2report}")
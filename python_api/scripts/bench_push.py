@@ -0,0 +1,49 @@
+import numpy as np
+from time import process_time
+from pylsl import StreamInfo, StreamOutlet, cf_int32
+from api.lsl import ThreadLSL
+from api.mcu_frame import get_daq_frame_datatype
+
+
+def build_frames(num: int) -> np.ndarray:
+    frames = np.zeros(shape=(num,), dtype=get_daq_frame_datatype())
+    frames['head'] = 0xA0
+    frames['index'] = np.arange(num) % 256
+    frames['timestamp'] = 100 * np.arange(num)
+    frames['c0'] = np.arange(num) % 4096
+    frames['c1'] = (2 * np.arange(num)) % 4096
+    frames['tail'] = 0xFF
+    return frames
+
+
+def push_lists(outlet: StreamOutlet, frames: np.ndarray) -> None:
+    data = np.stack([frames['index'], frames['c0'], frames['c1']], axis=1).tolist()
+    timestamps = (frames['timestamp'] * 1e-6).tolist()
+    outlet.push_chunk(x=data, timestamp=timestamps, pushthrough=True)
+
+
+def push_numpy(outlet: StreamOutlet, frames: np.ndarray) -> None:
+    data = np.empty((frames.size, 3), dtype=np.int32)
+    data[:, 0] = frames['index']
+    data[:, 1] = frames['c0']
+    data[:, 2] = frames['c1']
+    ThreadLSL._push_chunk_numpy(outlet, data, frames['timestamp'] * 1e-6)
+
+
+def measure_cpu_per_sample(func, outlet: StreamOutlet, frames: np.ndarray, num_repeats: int) -> float:
+    time_start = process_time()
+    for _ in range(num_repeats):
+        func(outlet, frames)
+    return (process_time() - time_start) / (num_repeats * frames.size)
+
+
+if __name__ == '__main__':
+    sampling_rate = 10e3
+    outlet = StreamOutlet(StreamInfo('bench_push', 'sensor_data', 3, sampling_rate, cf_int32, 'bench_push'))
+    for batch in [20, 200, 2000]:
+        frames = build_frames(batch)
+        num_repeats = int(20 * sampling_rate / batch)
+        cpu_lists = measure_cpu_per_sample(push_lists, outlet, frames, num_repeats)
+        cpu_numpy = measure_cpu_per_sample(push_numpy, outlet, frames, num_repeats)
+        print(f"Batch {batch:5d}: lists {1e6 * cpu_lists:.3f} us/sample, numpy {1e6 * cpu_numpy:.3f} us/sample "
+              f"(x{cpu_lists / cpu_numpy:.1f}, {100 * cpu_numpy * sampling_rate:.2f} % CPU at {sampling_rate:.0f} Hz)")
@@ -0,0 +1,34 @@
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from api import get_path_to_project
+from api.perf_bench import StageBenchmark, compare_baseline, get_stage_names, load_baseline, save_baseline
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Benchmark of the host-side DAQ stages with comparison against a saved baseline")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1000., 10000., 50000.], help="Sampling rates [Hz]")
+    parser.add_argument("--channels", type=int, nargs="+", default=[2, 16, 64], help="Number of channels")
+    parser.add_argument("--stages", type=str, nargs="+", default=get_stage_names(), help="Stages to measure")
+    parser.add_argument("--duration", type=float, default=1., help="Duration of the stream of each measurement [sec.]")
+    parser.add_argument("--baseline", type=str, default="", help="Path of the baseline (default: data/bench_baseline.json)")
+    parser.add_argument("--save", action="store_true", help="Saving the results as new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown against the baseline")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as path2temp:
+        results = StageBenchmark(path2temp, args.duration).run(tuple(args.rates), tuple(args.channels), tuple(args.stages))
+    for rslt in results:
+        print(f"{rslt.key:28s}: {rslt.samples_per_sec:12.0f} samples/s (x{rslt.headroom:.2f}){'' if rslt.is_sustainable else ' NOT SUSTAINABLE'}")
+
+    path2baseline = Path(args.baseline) if args.baseline else Path(get_path_to_project("data")) / "bench_baseline.json"
+    if args.save or not path2baseline.exists():
+        save_baseline(results, path2baseline)
+        print(f"Baseline saved: {path2baseline}")
+    else:
+        regressions = compare_baseline(results, load_baseline(path2baseline), args.tolerance)
+        for reg in regressions:
+            print(f"REGRESSION {reg.key}: {reg.samples_per_sec:.0f} samples/s vs. baseline {reg.baseline:.0f} ({100 * reg.ratio:.0f} %)")
+        print(f"{len(regressions)} regressions against {path2baseline} (tolerance {100 * args.tolerance:.0f} %)")
+        sys.exit(1 if regressions else 0)
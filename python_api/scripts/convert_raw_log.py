@@ -0,0 +1,21 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from api import get_path_to_project
+from api.h5_writer import get_decimation_factors
+from api.raw_log import convert_raw_log
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Converting raw logs of the recorder into HDF5 files for DataAPI")
+    parser.add_argument("--files", type=str, nargs="+", default=[], help="Raw logs (default: all files in data)")
+    parser.add_argument("--compression", type=str, default="", help="Codec of the HDF5 datasets (e.g. lzf, empty to disable)")
+    parser.add_argument("--decimation", action="store_true", help="Building the min/max/mean levels for overview plots")
+    parser.add_argument("--remove", action="store_true", help="Removing each raw log after its conversion")
+    args = parser.parse_args()
+
+    files = args.files if args.files else sorted(Path(get_path_to_project("data")).glob("*.rlog"))
+    for file in files:
+        path = convert_raw_log(file, compression=args.compression, decimation=get_decimation_factors() if args.decimation else ())
+        print(f"{file} -> {path}")
+        if args.remove:
+            Path(file).unlink()
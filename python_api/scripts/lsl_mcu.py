@@ -1,4 +1,5 @@
 from api import DeviceAPI
+from api.h5_writer import get_decimation_factors
 
 
 if __name__ == '__main__':
@@ -9,7 +10,10 @@ if __name__ == '__main__':
     dut.start_daq(
         do_plot=True,
         window_sec=20.,
-        track_util=True
+        track_util=True,
+        compression='lzf',
+        segment_sec=30*60.,
+        decimation=get_decimation_factors()
     )
     dut.wait_daq(6*60*60)
     #dut.wait_daq(30.)
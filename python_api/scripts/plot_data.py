@@ -2,7 +2,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
 from logging import basicConfig, DEBUG, INFO
-from api import DataAPI, RawRecording, get_path_to_project
+from api import DataAPI, DecimatedRecording, RawRecording, get_path_to_project
 
 
 def plot_histogram_time(packet: RawRecording, show_density: bool=False, show_plot: bool=True) -> None:
@@ -65,6 +65,21 @@ def plot_transient_data(packet: RawRecording, show_plot: bool=True) -> None:
         plt.show()
 
 
+def plot_overview_data(packet: DecimatedRecording, show_plot: bool=True) -> None:
+    plt.figure()
+    for idx in range(packet.num_channels):
+        line = plt.plot(packet.time, packet.mean[idx], linewidth=1)[0]
+        plt.fill_between(packet.time, packet.min[idx], packet.max[idx], color=line.get_color(), alpha=0.3, linewidth=0)
+    plt.xlabel('Time (s)')
+    plt.ylabel('Amplitude')
+    plt.title(f'Min/max/mean of {packet.factor} samples per point')
+    plt.xlim(packet.time[0], packet.time[-1])
+    plt.grid(True)
+    plt.tight_layout()
+    if show_plot:
+        plt.show()
+
+
 def plot_transient_util(packet: RawRecording, show_plot: bool=True) -> None:
     min_size = np.min([packet.time.size, packet.data.shape[1]])-1
 
@@ -84,18 +99,22 @@ def plot_transient_util(packet: RawRecording, show_plot: bool=True) -> None:
 if __name__ == "__main__":
     basicConfig(level=INFO)
     read_util = False
+    read_overview = True
 
     path2data = Path(get_path_to_project()) / "data"
     use_case = -1
 
     dut = DataAPI(path2data, data_prefix='data')
-    data = dut.read_data_file(use_case)
-
     if read_util:
         util = dut.read_utilization_file(use_case)
         plot_transient_util(util, show_plot=False)
 
-    plot_transient_data(data, show_plot=False)
-    plot_histogram_time(data, show_plot=False)
-    plot_transient_time(data, do_logy=False, show_plot=False)
-    plot_transient_drift(data, do_logy=False, show_plot=True)
+    if read_overview:
+        # Overview of the whole session from the decimation levels without loading all samples
+        plot_overview_data(dut.read_data_overview(use_case, num_points=2000), show_plot=True)
+    else:
+        data = dut.read_data_file(use_case)
+        plot_transient_data(data, show_plot=False)
+        plot_histogram_time(data, show_plot=False)
+        plot_transient_time(data, do_logy=False, show_plot=False)
+        plot_transient_drift(data, do_logy=False, show_plot=True)